@@ -0,0 +1,502 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from config.settings import load_env
+from agents.http_client import get_http_client
+from agents.scheduler import report_backpressure
+from agents.json_stream import ViolationStreamParser, InvalidStreamError
+from agents.json_repair import validate_violation
+from agents.llm_errors import (
+    LLMError, LLMTimeoutError, LLMConnectionError, LLMServerError, LLMEmptyResponseError, LLMProtocolError,
+    LLMCircuitOpenError,
+    error_for_status,
+)
+from agents import tracing
+
+load_env()
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", 60))
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "1") == "1"
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4))
+# How the stable system prompt is reused across requests:
+#   chat    - /api/chat with a fixed system message (server-side KV prefix cache)
+#   context - evaluate the system prompt once and pass its `context` tokens to /api/generate
+#   off     - send system + user prompt as one string every time
+OLLAMA_PROMPT_CACHE = os.getenv("OLLAMA_PROMPT_CACHE", "chat")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Circuit breaker: open after this many consecutive failures, probe again after the cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 30))
+
+# Number of recent latencies kept per backend
+LATENCY_WINDOW = 200
+# After a failed system prompt context fetch, wait this long before trying
+# again, doubling per consecutive failure up to the maximum
+CONTEXT_RETRY_MIN = 5.0
+CONTEXT_RETRY_MAX = 300.0
+# Once the violation array is closed, read at most this many more stream
+# lines looking for the final chunk, which carries the prompt-eval counts
+STREAM_DRAIN_LINES = 64
+
+
+def combine_prompt(prompt: str, system: str | None) -> str:
+    return f"{system}\n{prompt}" if system else prompt
+
+
+class PromptEvalStats:
+    """
+    Prompt tokens the server actually evaluated, from Ollama's
+    prompt_eval_count/prompt_eval_duration. A request that passes a cached
+    system prompt context saves that context's own reported evaluation; in
+    chat mode a request saves the tokens it evaluated fewer than the first
+    request with the same system prompt, at that request's time per token.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.evaluated_tokens = 0
+        self.eval_ns = 0
+        self.reused_tokens = 0
+        self.saved_ns = 0
+
+    def record(self, evaluated_tokens: int, eval_ns: int, reused_tokens: int = 0, saved_ns: int = 0):
+        self.requests += 1
+        self.evaluated_tokens += evaluated_tokens
+        self.eval_ns += eval_ns
+        self.reused_tokens += reused_tokens
+        self.saved_ns += saved_ns
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "evaluated_tokens": self.evaluated_tokens,
+            "reused_tokens": self.reused_tokens,
+            "prompt_eval_seconds": round(self.eval_ns / 1e9, 3),
+            "prompt_eval_seconds_saved": round(self.saved_ns / 1e9, 3),
+        }
+
+
+def classify_exception(e: Exception, backend: str | None = None) -> LLMError | None:
+    """
+    Maps transport and decoding exceptions onto the LLMError hierarchy;
+    None for anything else (a bug, which should surface as-is).
+    """
+    import httpx
+    if isinstance(e, httpx.TimeoutException):
+        return LLMTimeoutError(type(e).__name__, backend)
+    if isinstance(e, (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)):
+        return LLMConnectionError(type(e).__name__, backend)
+    if isinstance(e, (ValueError, KeyError, httpx.HTTPError)):
+        return LLMProtocolError(f"{type(e).__name__}: {e}", backend)
+    return None
+
+
+class LLMBackend:
+    """
+    One model server. Subclasses implement _generate(); the base class keeps
+    the per-backend concurrency cap, latency samples and circuit breaker.
+    """
+
+    kind = "base"
+
+    def __init__(self, name: str, model: str, max_concurrency: int = 4):
+        self.name = name
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.successes = 0
+        self.failures = 0
+
+    def is_available(self) -> bool:
+        # Closed, or past the cooldown (half-open) with no probe in flight yet
+        if not self.open_until:
+            return True
+        return time.monotonic() >= self.open_until and not self.probing
+
+    def load(self) -> float:
+        return self.in_flight / self.max_concurrency
+
+    def record(self, latency: float, ok: bool):
+        self.latencies.append(latency)
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + BREAKER_COOLDOWN
+            logging.warning(f"Backend {self.name} circuit opened for {BREAKER_COOLDOWN}s "
+                            f"after {self.consecutive_failures} consecutive failures")
+
+    async def generate(self, prompt: str, on_violation=None, filename: str = "unknown",
+                       system: str | None = None) -> str:
+        """
+        Returns the raw completion or raises an LLMError subclass describing
+        the failure. system is the stable instruction prefix, kept separate
+        so backends can cache it. While the circuit is half-open only one
+        request (the probe) is let through; its failure reopens the circuit.
+        """
+        # Claimed before the first await, so concurrent callers cannot both probe
+        probe = bool(self.open_until)
+        if probe:
+            if not self.is_available():
+                raise LLMCircuitOpenError(backend=self.name)
+            self.probing = True
+        try:
+            return await self._generate_guarded(prompt, on_violation, filename, system)
+        finally:
+            if probe:
+                self.probing = False
+
+    async def _generate_guarded(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        async with self.semaphore:
+            self.in_flight += 1
+            start = time.monotonic()
+            try:
+                with tracing.labels(backend=self.name):
+                    result = await self._generate(prompt, on_violation, filename, system)
+                if not result:
+                    raise LLMEmptyResponseError(backend=self.name)
+            except asyncio.CancelledError:
+                # Lost a hedge race; not a backend failure
+                raise
+            except LLMError as e:
+                self._on_error(e, time.monotonic() - start, filename)
+                raise
+            except Exception as e:
+                error = classify_exception(e, self.name)
+                if error is None:
+                    raise
+                self._on_error(error, time.monotonic() - start, filename)
+                raise error from e
+            finally:
+                self.in_flight -= 1
+            self.record(time.monotonic() - start, True)
+            return result
+
+    def _on_error(self, error: LLMError, latency: float, filename: str):
+        error.backend = error.backend or self.name
+        logging.warning(f"{filename} {self.name} failed: {error.reason}")
+        if error.trips_breaker:
+            self.record(latency, False)
+        if error.overload:
+            report_backpressure(error.reason)
+
+    async def _generate(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "model": self.model,
+            "in_flight": self.in_flight,
+            "successes": self.successes,
+            "failures": self.failures,
+            "circuit_open": time.monotonic() < self.open_until,
+        }
+
+
+class OllamaBackend(LLMBackend):
+    kind = "ollama"
+
+    def __init__(self, url: str = OLLAMA_URL, model: str = OLLAMA_MODEL,
+                 max_concurrency: int = OLLAMA_MAX_CONCURRENCY, stream: bool = OLLAMA_STREAM,
+                 prompt_cache: str = OLLAMA_PROMPT_CACHE, keep_alive: str = OLLAMA_KEEP_ALIVE):
+        super().__init__(f"ollama:{url}", model, max_concurrency)
+        self.url = url.rstrip("/")
+        self.stream = stream
+        self.prompt_cache = prompt_cache
+        self.keep_alive = keep_alive
+        self.prompt_stats = PromptEvalStats()
+        self._contexts = {}
+        self._context_failures = {}
+        self._chat_baselines = {}
+        self._context_lock = asyncio.Lock()
+
+    async def _system_context(self, system: str) -> dict | None:
+        """
+        Evaluates the system prompt once and returns {"context", "tokens",
+        "ns"}: its context tokens, reused as the prefix of every later
+        /api/generate call, and what evaluating it cost. A failed fetch is
+        not retried until its backoff has passed.
+        """
+        if system in self._contexts:
+            return self._contexts[system]
+        async with self._context_lock:
+            if system in self._contexts:
+                return self._contexts[system]
+            failure = self._context_failures.get(system)
+            if failure is not None and time.monotonic() < failure[0]:
+                return None
+            import httpx
+            client = get_http_client()
+            try:
+                response = await client.post(
+                    f"{self.url}/api/generate",
+                    json={
+                        "model": self.model,
+                        "prompt": system,
+                        "stream": False,
+                        "keep_alive": self.keep_alive,
+                        "options": {"num_predict": 1},
+                    },
+                    timeout=OLLAMA_TIMEOUT,
+                )
+                body = response.json() if response.status_code == 200 else {}
+                problem = f"HTTP {response.status_code}"
+            except (httpx.HTTPError, ValueError) as e:
+                # Only an optimisation: never fail (or retry) the review over it
+                body, problem = {}, f"{type(e).__name__}: {e}"
+            if not isinstance(body, dict) or not body.get("context"):
+                delay = min(CONTEXT_RETRY_MAX, failure[1] * 2) if failure else CONTEXT_RETRY_MIN
+                self._context_failures[system] = (time.monotonic() + delay, delay)
+                logging.warning(f"{self.name} could not cache the system prompt context "
+                                f"({problem}); retrying in {delay:.0f}s")
+                return None
+            self._context_failures.pop(system, None)
+            cached = self._contexts[system] = {
+                "context": body["context"],
+                "tokens": body.get("prompt_eval_count", len(body["context"])),
+                "ns": body.get("prompt_eval_duration", 0),
+            }
+            logging.info(f"{self.name} cached {len(body['context'])} system prompt context tokens")
+            return cached
+
+    async def _request(self, prompt: str, system: str | None, stream: bool) -> tuple:
+        """
+        Returns (path, payload, reused) for the configured prompt-cache
+        mode; reused is the cached system context passed, if any.
+        """
+        if system and self.prompt_cache == "chat":
+            return "/api/chat", {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                "stream": stream,
+                "keep_alive": self.keep_alive,
+            }, None
+        payload = {"model": self.model, "stream": stream, "keep_alive": self.keep_alive}
+        context = None
+        if system and self.prompt_cache == "context":
+            context = await self._system_context(system)
+        if context:
+            payload.update(prompt=prompt, context=context["context"])
+        else:
+            payload["prompt"] = combine_prompt(prompt, system)
+        return "/api/generate", payload, context
+
+    @staticmethod
+    def _fragment(body: dict) -> str:
+        if "message" in body:
+            return body["message"].get("content", "")
+        return body.get("response", "")
+
+    def _record_prompt_eval(self, body: dict, reused: dict | None, path: str, system: str | None):
+        if "prompt_eval_count" not in body:
+            return
+        count, ns = body.get("prompt_eval_count", 0), body.get("prompt_eval_duration", 0)
+        if reused is None and system and path == "/api/chat":
+            # The first request evaluates the whole system prompt; later ones
+            # evaluate less when the server reused its KV prefix
+            baseline = self._chat_baselines.setdefault(system, (count, ns))
+            if baseline[0] > count:
+                gap = baseline[0] - count
+                reused = {"tokens": gap, "ns": round(gap * baseline[1] / baseline[0])}
+        self.prompt_stats.record(count, ns, reused["tokens"] if reused else 0, reused["ns"] if reused else 0)
+
+    async def _generate(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        if self.stream:
+            return await self._generate_stream(prompt, on_violation, filename, system)
+        client = get_http_client()
+        path, payload, reused = await self._request(prompt, system, stream=False)
+        with tracing.span("generation"):
+            response = await client.post(f"{self.url}{path}", json=payload, timeout=OLLAMA_TIMEOUT)
+        if response.status_code != 200:
+            raise error_for_status(response.status_code, self.name, response.headers.get("retry-after"))
+        body = response.json()
+        self._record_prompt_eval(body, reused, path, system)
+        return self._fragment(body).strip()
+
+    async def _generate_stream(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        """
+        Streams a generation and parses the violation array as tokens arrive.
+        Each completed violation is passed to on_violation immediately. The
+        request is aborted as soon as the output cannot be a JSON array (the
+        partial text is returned so the caller takes the repair path), or
+        once the array is closed and the final chunk's prompt-eval counts
+        have been read (within STREAM_DRAIN_LINES).
+        """
+        client = get_http_client()
+        parser = ViolationStreamParser()
+        received = []
+        first_byte = None
+        path, payload, reused = await self._request(prompt, system, stream=True)
+        sent = time.perf_counter()
+        try:
+            async with client.stream("POST", f"{self.url}{path}", json=payload, timeout=OLLAMA_TIMEOUT) as response:
+                if response.status_code != 200:
+                    tracing.record("ttfb", time.perf_counter() - sent, status=str(response.status_code))
+                    raise error_for_status(response.status_code, self.name, response.headers.get("retry-after"))
+                lines = response.aiter_lines()
+                async for line in lines:
+                    if not line.strip():
+                        continue
+                    if first_byte is None:
+                        # Time to first token is dominated by queueing and prompt evaluation
+                        first_byte = time.perf_counter()
+                        tracing.record("ttfb", first_byte - sent)
+                    chunk = json.loads(line)
+                    fragment = self._fragment(chunk)
+                    received.append(fragment)
+                    if chunk.get("done"):
+                        self._record_prompt_eval(chunk, reused, path, system)
+                    try:
+                        for violation in parser.feed(fragment):
+                            violation = validate_violation(violation, filename)
+                            if violation is not None and on_violation is not None:
+                                on_violation(violation)
+                    except InvalidStreamError as e:
+                        logging.warning(f"{filename} aborting stream early: {e}")
+                        return "".join(received).strip()
+                    if parser.done:
+                        if not chunk.get("done"):
+                            await self._drain_stream(lines, reused, path, system)
+                        return parser.result()
+                    if chunk.get("done"):
+                        break
+        finally:
+            if first_byte is not None:
+                tracing.record("generation", time.perf_counter() - first_byte)
+        return "".join(received).strip()
+
+    async def _drain_stream(self, lines, reused: dict | None, path: str, system: str | None):
+        """
+        Reads up to STREAM_DRAIN_LINES more lines of a stream whose array is
+        complete, recording the prompt-eval counts of the final chunk. A
+        model still generating after that is cut off by closing the stream.
+        """
+        for _ in range(STREAM_DRAIN_LINES):
+            try:
+                line = await anext(lines)
+            except StopAsyncIteration:
+                return
+            if not line.strip():
+                continue
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            if chunk.get("done"):
+                self._record_prompt_eval(chunk, reused, path, system)
+                return
+
+    def stats(self) -> dict:
+        return dict(super().stats(), prompt_eval=self.prompt_stats.summary())
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server exposing the OpenAI /chat/completions API (OpenAI, vLLM,
+    llama.cpp server, LM Studio, ...). url is the base ending in /v1.
+    """
+
+    kind = "openai"
+
+    def __init__(self, url: str, model: str, api_key: str | None = OPENAI_API_KEY, max_concurrency: int = 8):
+        super().__init__(f"openai:{url}", model, max_concurrency)
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+
+    async def _generate(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        client = get_http_client()
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        # A stable leading system message lets providers apply automatic prefix caching
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        with tracing.span("generation"):
+            response = await client.post(
+                f"{self.url}/chat/completions",
+                headers=headers,
+                json={
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": 0,
+                },
+                timeout=OLLAMA_TIMEOUT,
+            )
+        if response.status_code != 200:
+            raise error_for_status(response.status_code, self.name, response.headers.get("retry-after"))
+        choices = response.json().get("choices") or [{}]
+        return (choices[0].get("message", {}).get("content") or "").strip()
+
+
+class MockBackend(LLMBackend):
+    """
+    In-process backend for tests and benchmarks. responder(prompt) returns
+    the raw model text, None to simulate a server error, or raises an
+    LLMError of its own.
+    """
+
+    kind = "mock"
+
+    def __init__(self, name: str = "mock", responder=None, latency: float = 0.0,
+                 failure_rate: float = 0.0, max_concurrency: int = 4, seed: int = 0):
+        super().__init__(name, "mock", max_concurrency)
+        self.responder = responder or (lambda prompt: "[]")
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+
+    async def _generate(self, prompt: str, on_violation, filename: str, system: str | None) -> str:
+        if self.latency:
+            with tracing.span("generation"):
+                await asyncio.sleep(self.latency)
+        if self._rng.random() < self.failure_rate:
+            raise LLMServerError(500, "simulated failure", self.name)
+        result = self.responder(prompt)
+        if result is None:
+            raise LLMServerError(500, "responder returned None", self.name)
+        return result
+
+
+def backends_from_spec(spec: str) -> list:
+    """
+    Parses LLM_BACKENDS: comma-separated `kind|url|model|max_concurrency`
+    entries, e.g. `ollama|http://gpu1:11434|llama3|2,openai|https://api.openai.com/v1|gpt-4o-mini|8`.
+    `mock` entries take a fifth field, the simulated latency in seconds
+    (`mock|||4|0.5`).
+    """
+    backends = []
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        fields = [f.strip() for f in entry.split("|")] + ["", "", "", ""]
+        kind, url, model, concurrency, latency = fields[:5]
+        concurrency = int(concurrency) if concurrency else None
+        if kind == "ollama":
+            backends.append(OllamaBackend(url or OLLAMA_URL, model or OLLAMA_MODEL,
+                                          concurrency or OLLAMA_MAX_CONCURRENCY))
+        elif kind == "openai":
+            backends.append(OpenAICompatibleBackend(url, model, max_concurrency=concurrency or 8))
+        elif kind == "mock":
+            backends.append(MockBackend(f"mock:{len(backends)}", latency=float(latency or 0),
+                                        max_concurrency=concurrency or 4))
+        else:
+            raise ValueError(f"Unknown LLM backend kind: {kind!r}")
+    return backends
@@ -0,0 +1,87 @@
+import os
+from config.settings import load_env
+from agents.chunker import estimate_tokens
+
+load_env()
+
+# Files estimated at or below SMALL_FILE_TOKENS are packed together into
+# prompts of at most BATCH_TOKEN_BUDGET tokens and BATCH_MAX_FILES files
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "1") == "1"
+SMALL_FILE_TOKENS = int(os.getenv("SMALL_FILE_TOKENS", 500))
+BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", 2500))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 8))
+
+
+def is_small(code_or_size) -> bool:
+    if isinstance(code_or_size, int):
+        return code_or_size // 4 + 1 <= SMALL_FILE_TOKENS
+    return estimate_tokens(code_or_size) <= SMALL_FILE_TOKENS
+
+
+def pack_batches(items: list, budget: int = BATCH_TOKEN_BUDGET, max_files: int = BATCH_MAX_FILES,
+                 key=lambda item: os.path.basename(item[0]), tokens=lambda item: item[1]) -> list:
+    """
+    First-fit-decreasing packing of items into batches under the token budget.
+    Items whose key already appears in a batch go to another one, so every
+    key is unique within its batch. The default key is the file's basename,
+    which keeps replies that name only the basename routable.
+    """
+    batches = []
+    for item in sorted(items, key=tokens, reverse=True):
+        cost = tokens(item)
+        for batch in batches:
+            if (batch["tokens"] + cost <= budget and len(batch["items"]) < max_files
+                    and key(item) not in batch["keys"]):
+                batch["items"].append(item)
+                batch["keys"].add(key(item))
+                batch["tokens"] += cost
+                break
+        else:
+            batches.append({"items": [item], "keys": {key(item)}, "tokens": cost})
+    return [batch["items"] for batch in batches]
+
+
+def build_batch_prompt(files: list) -> str:
+    """
+    files is a list of (filename, language, code). Each file is wrapped in
+    explicit delimiters so the reply can be routed by `filename`.
+    """
+    names = ", ".join(name for name, _, _ in files)
+    parts = [
+        f"Review the following {len(files)} files for guideline violations.",
+        f"Files: {names}",
+        "",
+        "Each file is enclosed between `===== BEGIN FILE: <name> =====` and `===== END FILE: <name> =====`.",
+        "Return ONE JSON array covering all files. Set `filename` in every violation to the exact",
+        "name of the file it belongs to, and `line` to the 1-based line number within that file.",
+        "",
+    ]
+    for name, language, code in files:
+        parts.append(f"===== BEGIN FILE: {name} =====")
+        parts.append(f"Language: {language}")
+        parts.append(f"```{language}\n{code}\n```")
+        parts.append(f"===== END FILE: {name} =====")
+        parts.append("")
+    parts.append("REMEMBER: respond ONLY with the JSON array as specified earlier.")
+    return "\n".join(parts) + "\n"
+
+
+def route_violations(violations: list, filenames: list) -> dict | None:
+    """
+    Groups violations by their `filename`, matching exactly or by basename.
+    Returns None if any violation cannot be attributed to a file in the
+    batch, including a basename shared by several of its files.
+    """
+    routed = {name: [] for name in filenames}
+    by_base = {}
+    for name in filenames:
+        base = os.path.basename(name)
+        by_base[base] = None if base in by_base else name
+    for v in violations:
+        reported = str(v.get("filename", ""))
+        target = reported if reported in routed else by_base.get(os.path.basename(reported))
+        if target is None:
+            return None
+        v["filename"] = target
+        routed[target].append(v)
+    return routed
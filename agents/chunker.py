@@ -0,0 +1,176 @@
+import os
+import ast
+import re
+import json
+from config.settings import load_env
+
+load_env()
+
+# Files estimated above this many tokens are reviewed in chunks
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", 3000))
+CHUNK_CONCURRENCY = int(os.getenv("CHUNK_CONCURRENCY", 4))
+
+# Rough characters-per-token ratio for code with llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _python_boundaries(code: str) -> list:
+    """
+    1-based lines where top-level definitions and class members start.
+    Decorators are kept with the definition they decorate.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    def start_of(node):
+        lines = [node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]
+        return min(lines)
+
+    boundaries = set()
+    for node in tree.body:
+        boundaries.add(start_of(node))
+        if isinstance(node, ast.ClassDef):
+            for member in node.body[1:]:
+                boundaries.add(start_of(member))
+    return sorted(boundaries)
+
+
+_JAVA_TOKEN = re.compile(r'//.*|/\*|\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{}]')
+
+
+def _java_boundaries(code: str) -> list:
+    """
+    1-based lines where a type or a type member begins, found by tracking
+    brace depth outside of strings and comments.
+    """
+    boundaries = []
+    depth = 0
+    in_comment = False
+    statement_closed = True
+
+    for n, line in enumerate(code.splitlines(), start=1):
+        stripped = line.strip()
+        if depth <= 1 and statement_closed and stripped and not in_comment:
+            boundaries.append(n)
+            statement_closed = False
+
+        for token in _JAVA_TOKEN.findall(line):
+            if in_comment:
+                if token == "*/":
+                    in_comment = False
+                continue
+            if token == "/*":
+                in_comment = True
+            elif token == "{":
+                depth += 1
+            elif token == "}":
+                depth -= 1
+
+        code_part = re.sub(r"//.*", "", stripped).rstrip()
+        if depth <= 1 and code_part.endswith(("}", ";", "{")):
+            statement_closed = True
+
+    return boundaries
+
+
+def _split_lines(lines: list, start: int, budget: int) -> list:
+    chunks = []
+    current = []
+    current_start = start
+    for offset, line in enumerate(lines):
+        if current and estimate_tokens("\n".join(current + [line])) > budget:
+            chunks.append((current_start, "\n".join(current)))
+            current = []
+            current_start = start + offset
+        current.append(line)
+    if current:
+        chunks.append((current_start, "\n".join(current)))
+    return chunks
+
+
+def split_into_chunks(code: str, language: str, budget: int = CHUNK_TOKEN_BUDGET) -> list:
+    """
+    Splits code into (start_line, text) chunks of at most `budget` tokens,
+    cutting at function/class boundaries for Python and Java and falling
+    back to plain line splits for anything else or oversized members.
+    """
+    lines = code.splitlines()
+    if estimate_tokens(code) <= budget:
+        return [(1, code)]
+
+    if language == "python":
+        boundaries = _python_boundaries(code)
+    elif language == "java":
+        boundaries = _java_boundaries(code)
+    else:
+        boundaries = []
+    if not boundaries:
+        return _split_lines(lines, 1, budget)
+
+    cuts = sorted(set([1] + boundaries)) + [len(lines) + 1]
+    segments = [(cuts[i], lines[cuts[i] - 1:cuts[i + 1] - 1]) for i in range(len(cuts) - 1)]
+
+    chunks = []
+    current = []
+    current_start = 1
+    for seg_start, seg_lines in segments:
+        if estimate_tokens("\n".join(seg_lines)) > budget:
+            if current:
+                chunks.append((current_start, "\n".join(current)))
+                current = []
+            chunks.extend(_split_lines(seg_lines, seg_start, budget))
+            continue
+        if current and estimate_tokens("\n".join(current + seg_lines)) > budget:
+            chunks.append((current_start, "\n".join(current)))
+            current = []
+        if not current:
+            current_start = seg_start
+        current.extend(seg_lines)
+    if current:
+        chunks.append((current_start, "\n".join(current)))
+    return chunks
+
+
+def rebase_line(line, start_line: int) -> int:
+    """
+    Converts a chunk-relative line to a file line; 0 (file-level) is kept.
+    """
+    try:
+        line = int(line)
+    except (TypeError, ValueError):
+        return 0
+    return line + start_line - 1 if line >= 1 else line
+
+
+def merge_chunk_results(results: list) -> str:
+    """
+    Combines [(start_line, raw_json)] chunk replies into one JSON array with
+    file-relative line numbers and duplicate findings removed.
+    """
+    merged = []
+    seen = set()
+    for start_line, raw in results:
+        try:
+            violations = json.loads(raw)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(violations, list):
+            continue
+        for v in violations:
+            if not isinstance(v, dict):
+                continue
+            line = rebase_line(v.get("line", 0), start_line)
+            v["line"] = line
+            key = (line, " ".join(str(v.get("issue", "")).lower().split()))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(v)
+    merged.sort(key=lambda v: v["line"])
+    return json.dumps(merged)
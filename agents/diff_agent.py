@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import subprocess
+from config.settings import load_env
+
+load_env()
+
+# Unchanged lines kept above and below every changed hunk
+DIFF_CONTEXT_LINES = int(os.getenv("DIFF_CONTEXT_LINES", 5))
+
+# Separator placed between non-adjacent hunks in an excerpt
+EXCERPT_GAP_MARKER = "... (unchanged lines omitted) ..."
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def parse_unified_diff(diff_text: str) -> dict:
+    """
+    Returns {path: sorted list of head-file line numbers touched by the diff}.
+    Pure deletions mark the head line where the removed code used to be.
+    """
+    changed = {}
+    path = None
+    head_line = 0
+    # Lines still expected in the current hunk; "--- "/"+++ " are only file
+    # headers outside a hunk (inside one they are a removed "-- " or added "++ " line)
+    old_left = new_left = 0
+
+    for raw in diff_text.splitlines():
+        if old_left > 0 or new_left > 0:
+            if raw.startswith("+"):
+                if path is not None:
+                    changed[path].add(head_line)
+                head_line += 1
+                new_left -= 1
+            elif raw.startswith("-"):
+                if path is not None:
+                    changed[path].add(max(head_line, 1))
+                old_left -= 1
+            elif raw.startswith(" ") or not raw:
+                head_line += 1
+                old_left -= 1
+                new_left -= 1
+            continue
+
+        if raw.startswith("+++ "):
+            target = raw[4:].split("\t")[0].strip()
+            if target == "/dev/null":
+                path = None
+            else:
+                path = target[2:] if target.startswith("b/") else target
+                changed.setdefault(path, set())
+            continue
+
+        header = HUNK_HEADER.match(raw)
+        if header:
+            old_left = int(header.group(1) or 1)
+            head_line = int(header.group(2))
+            new_left = int(header.group(3) or 1)
+            if new_left == 0 and path is not None:
+                # Hunk only removes lines; anchor review at the adjoining head line
+                changed[path].add(max(head_line, 1))
+
+    return {p: sorted(lines) for p, lines in changed.items() if lines}
+
+
+def git_changed_lines(base_ref: str, head_ref: str | None = None, cwd: str = ".") -> dict:
+    """
+    Runs `git diff` between base_ref and head_ref (or the working tree) and
+    returns changed lines keyed by absolute file path. Reviews read the
+    working-tree files, so a head_ref whose changed files differ from the
+    working tree raises ValueError rather than mapping lines onto other code.
+    """
+    top = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    cmd = ["git", "diff", "--no-color", "--no-ext-diff", "--unified=0", base_ref]
+    if head_ref:
+        cmd.append(head_ref)
+    diff_text = subprocess.run(cmd, cwd=top, capture_output=True, text=True, check=True).stdout
+    changed = parse_unified_diff(diff_text)
+    if head_ref and changed:
+        stale = subprocess.run(
+            ["git", "diff", "--no-ext-diff", "--name-only", head_ref, "--", *changed],
+            cwd=top, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        if stale:
+            raise ValueError(f"Working tree differs from {head_ref} in {', '.join(stale)}; "
+                             f"check out {head_ref} or leave the diff head unset")
+    return {os.path.join(top, p): lines for p, lines in changed.items()}
+
+
+def diff_file_changed_lines(diff_path: str, root: str = ".") -> dict:
+    """
+    Same as git_changed_lines but reads a pre-generated unified diff file.
+    """
+    with open(diff_path, "r") as f:
+        diff_text = f.read()
+    return {os.path.abspath(os.path.join(root, p)): lines for p, lines in parse_unified_diff(diff_text).items()}
+
+
+def build_excerpt(code: str, changed_lines: list, context: int = DIFF_CONTEXT_LINES) -> tuple:
+    """
+    Cuts the changed regions (plus context) out of code.
+    Returns (excerpt, line_map) where line_map[i] is the head-file line of
+    excerpt line i + 1, or None for gap markers.
+    """
+    code_lines = code.splitlines()
+    total = len(code_lines)
+    if total == 0:
+        return code, []
+
+    ranges = []
+    for line in sorted(set(changed_lines)):
+        start = max(1, line - context)
+        end = min(total, line + context)
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    excerpt_lines = []
+    line_map = []
+    for i, (start, end) in enumerate(ranges):
+        if i > 0 or start > 1:
+            excerpt_lines.append(EXCERPT_GAP_MARKER)
+            line_map.append(None)
+        for n in range(start, end + 1):
+            excerpt_lines.append(code_lines[n - 1])
+            line_map.append(n)
+    if ranges and ranges[-1][1] < total:
+        excerpt_lines.append(EXCERPT_GAP_MARKER)
+        line_map.append(None)
+
+    return "\n".join(excerpt_lines), line_map
+
+
+def map_line_to_head(line, line_map: list):
+    """
+    Maps one excerpt-relative line to its head-file line. Lines on gap
+    markers snap to the next real line in the excerpt.
+    """
+    try:
+        line = int(line)
+    except (TypeError, ValueError):
+        return line
+    if line < 1 or not line_map:
+        return line
+    for candidate in line_map[min(line, len(line_map)) - 1:]:
+        if candidate is not None:
+            return candidate
+    return next((c for c in reversed(line_map) if c is not None), 0)
+
+
+def map_violations_to_head(response: str, line_map: list) -> str:
+    """
+    Rewrites excerpt-relative `line` values to head-file line numbers.
+    """
+    try:
+        violations = json.loads(response)
+    except json.JSONDecodeError:
+        return response
+    if not isinstance(violations, list):
+        return response
+
+    for v in violations:
+        if isinstance(v, dict):
+            v["line"] = map_line_to_head(v.get("line", 0), line_map)
+
+    return json.dumps(violations)
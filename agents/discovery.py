@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from config.settings import load_env
+
+load_env()
+
+EXTENSION_LANG_MAP = {
+    ext.strip(): lang.strip()
+    for ext, lang in (item.split(":") for item in os.getenv("EXTENSION_LANG_MAP", ".java:java,.py:python").split(","))
+}
+
+# For local discovery only: VCS metadata, build output, vendored and generated
+# code, and this tool's own report folders. Project-specific paths belong in a
+# .reviewbotignore at the scanned root or in DISCOVERY_EXCLUDE.
+DEFAULT_EXCLUDES = [
+    ".*", "reports/", "annotated/", "node_modules/", "vendor/", "third_party/", "build/", "dist/",
+    "target/", "__pycache__/", "venv/", "*.min.js", "*_pb2.py",
+]
+# gitignore-style patterns, comma separated; ignore files are read from the scanned root
+DISCOVERY_EXCLUDE = [p.strip() for p in os.getenv("DISCOVERY_EXCLUDE", ",".join(DEFAULT_EXCLUDES)).split(",") if p.strip()]
+DISCOVERY_IGNORE_FILES = [p.strip() for p in os.getenv("DISCOVERY_IGNORE_FILES", ".gitignore,.reviewbotignore").split(",") if p.strip()]
+# Larger files are skipped without being read
+DISCOVERY_MAX_FILE_BYTES = int(os.getenv("DISCOVERY_MAX_FILE_BYTES", 1024 * 1024))
+DISCOVERY_INDEX_ENABLED = os.getenv("DISCOVERY_INDEX_ENABLED", "1") == "1"
+DISCOVERY_INDEX_PATH = os.getenv("DISCOVERY_INDEX_PATH", ".reviewbot/index.json")
+
+INDEX_VERSION = 1
+SNIFF_BYTES = 8192
+# Generated-code markers are only looked for in the file header
+GENERATED_MARKER = re.compile(rb"@generated|DO NOT EDIT|[Aa]uto-?generated (?:by|from)")
+GENERATED_HEADER_BYTES = 1024
+# Minified or machine-written files have very long first lines
+MAX_SNIFF_LINE = 2000
+# A directory modified this close to the last scan may have changed within the
+# same mtime tick, so it is listed again
+MTIME_SLACK_NS = 2 * 10**9
+
+_BY_NAME = {key: lang for key, lang in EXTENSION_LANG_MAP.items() if not key.startswith(".")}
+_BY_SUFFIX = {key: lang for key, lang in EXTENSION_LANG_MAP.items() if key.startswith(".")}
+
+
+def detect_language(filename: str) -> str:
+    """
+    Language for a file name or path from EXTENSION_LANG_MAP, trying the
+    longest dotted suffix first (".d.ts" before ".ts"). Keys without a dot
+    match whole file names, e.g. "Dockerfile".
+    """
+    name = filename.rpartition("/")[2]
+    lang = _BY_NAME.get(name)
+    if lang is not None:
+        return lang
+    dot = name.find(".")
+    while dot != -1:
+        lang = _BY_SUFFIX.get(name[dot:])
+        if lang is not None:
+            return lang
+        dot = name.find(".", dot + 1)
+    return "unknown"
+
+
+def _glob_to_regex(pattern: str) -> str:
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            regex.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+class IgnoreRules:
+    """
+    The common subset of .gitignore syntax: *, ?, **, [...], a trailing /
+    for directories only, a leading or inner / to anchor to the root, and
+    ! to re-include. The last matching pattern wins.
+    """
+
+    def __init__(self, patterns: list):
+        self.patterns = list(patterns)
+        self._rules = []
+        for line in self.patterns:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            regex = _glob_to_regex(line.lstrip("/"))
+            self._rules.append((re.compile(regex if anchored else f"(?:.*/)?{regex}"), negate, dir_only))
+
+    @classmethod
+    def for_root(cls, root: str, patterns: list = DISCOVERY_EXCLUDE,
+                 ignore_files: list = DISCOVERY_IGNORE_FILES) -> "IgnoreRules":
+        lines = list(patterns)
+        for name in ignore_files:
+            try:
+                with open(os.path.join(root, name), "r", encoding="utf-8", errors="replace") as f:
+                    lines.extend(f.read().splitlines())
+            except OSError:
+                continue
+        return cls(lines)
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        rel_path is relative to the root, with / separators.
+        """
+        for regex, negate, dir_only in reversed(self._rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not negate
+        return False
+
+    def ignored_path(self, rel_path: str) -> bool:
+        """
+        Like ignored() for a file, but also true when any parent directory is
+        excluded (for paths that did not come from a pruned walk).
+        """
+        parts = rel_path.split("/")
+        for depth in range(1, len(parts)):
+            if self.ignored("/".join(parts[:depth]), True):
+                return True
+        return self.ignored(rel_path, False)
+
+
+def sniff(path: str) -> str | None:
+    """
+    Reads the head of a file: "binary" if it has a NUL byte, "generated" if
+    it carries a generated-code marker or looks minified, else None.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return "unreadable"
+    if b"\0" in head:
+        return "binary"
+    if GENERATED_MARKER.search(head, 0, GENERATED_HEADER_BYTES):
+        return "generated"
+    first_line = head.split(b"\n", 1)[0]
+    if len(first_line) > MAX_SNIFF_LINE:
+        return "generated"
+    return None
+
+
+class FileDiscovery:
+    """
+    Finds reviewable files under root. Excluded directories are pruned
+    rather than walked, and each directory's listing is kept in a JSON index
+    with its mtime: on later runs a directory whose mtime is unchanged is
+    not listed again. Its reviewable files are still stat'ed, since editing
+    a file in place does not change the directory's mtime.
+    """
+
+    def __init__(self, root: str, patterns: list = DISCOVERY_EXCLUDE, max_file_bytes: int = DISCOVERY_MAX_FILE_BYTES,
+                 index_path: str | None = DISCOVERY_INDEX_PATH if DISCOVERY_INDEX_ENABLED else None):
+        self.root = root
+        self.max_file_bytes = max_file_bytes
+        self.index_path = index_path
+        self.rules = IgnoreRules.for_root(root, patterns)
+        self.stats = {}
+        fingerprint = json.dumps([INDEX_VERSION, os.path.abspath(root), self.rules.patterns,
+                                  EXTENSION_LANG_MAP, max_file_bytes, MAX_SNIFF_LINE])
+        self._config = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+    def _load_index(self) -> tuple:
+        if not self.index_path:
+            return {}, 0
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}, 0
+        if index.get("config") != self._config:
+            return {}, 0
+        return index.get("dirs", {}), index.get("scanned_ns", 0)
+
+    def _save_index(self, dirs: dict, scanned_ns: int):
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Per-process tmp name: concurrent shards may save the index at once
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"config": self._config, "scanned_ns": scanned_ns, "dirs": dirs}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def _list_dir(self, abs_dir: str, rel: str, mtime_ns: int, cached: dict | None) -> dict:
+        old_files = cached["files"] if cached else {}
+        subdirs, files, skipped = [], {}, {}
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                rel_path = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self.rules.ignored(rel_path, True):
+                            subdirs.append(entry.name)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if self.rules.ignored(rel_path, False):
+                        reason = "excluded"
+                    elif detect_language(entry.name) == "unknown":
+                        reason = "unsupported"
+                    else:
+                        st = entry.stat()
+                        previous = old_files.get(entry.name)
+                        if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+                            reason = previous[2]
+                        else:
+                            reason = self._classify(entry.path, st.st_size)
+                        files[entry.name] = [st.st_size, st.st_mtime_ns, reason]
+                        continue
+                except OSError:
+                    reason = "unreadable"
+                skipped[reason] = skipped.get(reason, 0) + 1
+        return {"mtime_ns": mtime_ns, "dirs": subdirs, "files": files, "skipped": skipped}
+
+    def _classify(self, path: str, size: int) -> str | None:
+        return "too_large" if size > self.max_file_bytes else sniff(path)
+
+    def _restat(self, abs_dir: str, entry: dict) -> int:
+        """
+        Refreshes the size and skip reason of files in a reused directory
+        that were edited in place. Returns how many changed.
+        """
+        changed = 0
+        for name, record in entry["files"].items():
+            path = os.path.join(abs_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                if record[2] != "unreadable":
+                    record[2] = "unreadable"
+                    changed += 1
+                continue
+            if record[0] != st.st_size or record[1] != st.st_mtime_ns:
+                record[:] = [st.st_size, st.st_mtime_ns, self._classify(path, st.st_size)]
+                changed += 1
+        return changed
+
+    def scan(self) -> list:
+        """
+        Returns [(path, size)] for every supported, non-excluded file, sorted
+        by path, and fills in self.stats.
+        """
+        start = time.perf_counter()
+        old_dirs, last_scan_ns = self._load_index()
+        scan_ns = time.time_ns()
+        dirs = {}
+        found = []
+        skipped = {}
+        listed = reused = restated = 0
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            abs_dir = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime_ns = os.stat(abs_dir).st_mtime_ns
+                cached = old_dirs.get(rel)
+                if cached and cached["mtime_ns"] == mtime_ns and mtime_ns < last_scan_ns - MTIME_SLACK_NS:
+                    entry = cached
+                    reused += 1
+                    restated += self._restat(abs_dir, entry)
+                else:
+                    entry = self._list_dir(abs_dir, rel, mtime_ns, cached)
+                    listed += 1
+            except OSError as e:
+                logging.warning(f"Discovery: cannot list {abs_dir}: {e}")
+                continue
+            dirs[rel] = entry
+            prefix = os.path.join(abs_dir, "")
+            for name, (size, _, reason) in entry["files"].items():
+                if reason is None:
+                    found.append((prefix + name, size))
+                else:
+                    skipped[reason] = skipped.get(reason, 0) + 1
+            for reason, count in entry["skipped"].items():
+                skipped[reason] = skipped.get(reason, 0) + count
+            stack.extend(f"{rel}/{name}" if rel else name for name in entry["dirs"])
+
+        if self.index_path and (listed or restated or dirs.keys() != old_dirs.keys()):
+            self._save_index(dirs, scan_ns)
+        found.sort()
+        self.stats = {"files": len(found), "dirs_listed": listed, "dirs_reused": reused,
+                      "files_changed_in_place": restated,
+                      "skipped": skipped, "seconds": round(time.perf_counter() - start, 4)}
+        return found
+
+
+def discover_files(root: str) -> list:
+    return FileDiscovery(root).scan()
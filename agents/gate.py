@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import argparse
+import math
+import time
+import asyncio
+import logging
+from config.settings import load_env, setup_logging
+from agents.discovery import FileDiscovery
+from agents.rule_engine_agent import get_violations_from_llm, cached_review
+from agents.llm_agent import LLM_FAILURE_ISSUE
+from agents.log_agent import violation_history, history_key, close_event_log, flush_event_log_at_exit
+from agents.scheduler import ReviewScheduler
+from agents.http_client import close_http_client, warm_http_client
+from agents.llm_errors import RetryBudget, set_retry_budget
+from agents.diff_agent import git_changed_lines, diff_file_changed_lines
+from agents import tracing
+
+load_env()
+
+# A finding at or above this severity blocks the merge
+GATE_SEVERITY = int(os.getenv("GATE_SEVERITY", 8))
+# Cancel the remaining reviews once a blocking finding is confirmed
+GATE_CANCEL = os.getenv("GATE_CANCEL", "1") == "1"
+# Files modified within about this many days rank as recently changed
+GATE_RECENT_DAYS = float(os.getenv("GATE_RECENT_DAYS", 7))
+
+EXIT_PASS = 0
+EXIT_BLOCKED = 1
+EXIT_INCOMPLETE = 2
+
+
+def _is_failure(v: dict) -> bool:
+    return v.get("issue") == LLM_FAILURE_ISSUE
+
+
+def _blocking(violations: list, threshold: int) -> list:
+    return [v for v in violations
+            if isinstance(v, dict) and not _is_failure(v) and v.get("severity", 0) >= threshold]
+
+
+def risk_score(path: str, size: int, history: dict, threshold: int, changed: bool, now: float,
+               root: str = ".") -> float:
+    """
+    Higher means review sooner: a cached review with a blocking finding
+    wins outright, then files that have had blocking or many findings
+    before, recently modified (or diff-touched) files and large files.
+    """
+    key = history_key(path, root)
+    score = math.log2(size + 1)
+    past = history.get(key)
+    # Only a file whose history has a blocking finding can have a cached
+    # blocking review, so the rest are ranked without being read
+    if not changed and past and past["max_severity"] >= threshold:
+        try:
+            with open(path, "r") as f:
+                cached = cached_review(f.read(), key)
+        except (OSError, UnicodeDecodeError, ValueError):
+            cached = None
+        if cached is not None and _blocking(json.loads(cached), threshold):
+            return 1000.0 + score
+    if past:
+        score += 4 * min(past["violations"] / past["reviews"], 5)
+        if past["max_severity"] >= threshold:
+            score += 30
+    if changed:
+        score += 20
+    else:
+        try:
+            age_days = (now - os.path.getmtime(path)) / 86400
+            score += 20 * math.exp(-age_days / GATE_RECENT_DAYS)
+        except OSError:
+            pass
+    return score
+
+
+def order_by_risk(files: list, threshold: int = GATE_SEVERITY, changed: dict | None = None,
+                  root: str = ".") -> list:
+    """
+    files is [(path, size)] under root; returns [(path, score)], riskiest first.
+    """
+    history = violation_history()
+    now = time.time()
+    scored = [
+        (path, risk_score(path, size, history, threshold,
+                          changed is not None and os.path.abspath(path) in changed, now, root))
+        for path, size in files
+    ]
+    return sorted(scored, key=lambda item: -item[1])
+
+
+class Gate:
+    """
+    Reviews files riskiest first and reports each finding as it arrives.
+    A blocking finding counts once its file's review has finished (so it is
+    not from an attempt that was later retried); with cancel_on_block the
+    remaining queued and in-flight reviews are then cancelled.
+    """
+
+    def __init__(self, threshold: int = GATE_SEVERITY, cancel_on_block: bool = GATE_CANCEL, out=sys.stdout,
+                 root: str = "."):
+        self.threshold = threshold
+        self.root = root
+        self.cancel_on_block = cancel_on_block
+        self.out = out
+        self.blocking = []
+        self.reviewed = 0
+        self.failed = []
+        self.time_to_verdict = None
+        self._start = 0.0
+        self._run_task = None
+        self._stopped = False
+
+    def _emit(self, v: dict, path: str, provisional: bool):
+        if not isinstance(v, dict) or _is_failure(v):
+            return
+        severity = v.get("severity", 0)
+        mark = "BLOCKING" if severity >= self.threshold else "note"
+        suffix = " (unconfirmed)" if provisional and severity >= self.threshold else ""
+        print(f"{path}:{v.get('line', 0)}: [{mark} {severity}] {v.get('issue', '')}{suffix}", file=self.out, flush=True)
+
+    async def review(self, path: str, changed_lines: list | None = None):
+        key = history_key(path, self.root)
+        with tracing.span("read", file=key):
+            with open(path, "r") as f:
+                code = f.read()
+        raw = await get_violations_from_llm(code, filename=key, changed_lines=changed_lines,
+                                            on_violation=lambda v: self._emit(v, path, True))
+        violations = json.loads(raw)
+        self.reviewed += 1
+        if any(_is_failure(v) for v in violations if isinstance(v, dict)):
+            self.failed.append(path)
+        found = _blocking(violations, self.threshold)
+        if found:
+            self.blocking.extend(dict(v, path=path) for v in found)
+            if self.time_to_verdict is None:
+                self.time_to_verdict = time.monotonic() - self._start
+                print(f"Blocking finding confirmed in {path} after {self.time_to_verdict:.2f}s",
+                      file=self.out, flush=True)
+            if self.cancel_on_block and self._run_task is not None and not self._stopped:
+                self._stopped = True
+                self._run_task.cancel()
+
+    async def run(self, ordered: list, changed: dict | None = None) -> dict:
+        """
+        ordered is [(path, score)] riskiest first. Returns the verdict.
+        """
+        self._start = time.monotonic()
+
+        async def handler(path):
+            await self.review(path, changed.get(os.path.abspath(path)) if changed is not None else None)
+
+        scheduler = ReviewScheduler(handler)
+        # The scheduler dequeues the largest "size" first; rank stands in for it
+        jobs = [(path, len(ordered) - rank) for rank, (path, _) in enumerate(ordered)]
+        self._run_task = asyncio.ensure_future(scheduler.run(jobs))
+        try:
+            await self._run_task
+        except asyncio.CancelledError:
+            if not self._stopped:
+                raise
+
+        if self.blocking:
+            verdict = "blocked"
+        elif self.failed or scheduler.failures:
+            verdict = "incomplete"
+        else:
+            verdict = "pass"
+        return {
+            "verdict": verdict,
+            "threshold": self.threshold,
+            "blocking": self.blocking,
+            "files": len(ordered),
+            "reviewed": self.reviewed,
+            "skipped": len(ordered) - self.reviewed if self._stopped else 0,
+            "failed": self.failed,
+            "time_to_verdict": self.time_to_verdict,
+            "seconds": time.monotonic() - self._start,
+        }
+
+
+def exit_code(result: dict) -> int:
+    return {"pass": EXIT_PASS, "blocked": EXIT_BLOCKED}.get(result["verdict"], EXIT_INCOMPLETE)
+
+
+async def run_gate(root: str, threshold: int = GATE_SEVERITY, cancel_on_block: bool = GATE_CANCEL,
+                   changed: dict | None = None) -> dict:
+    """
+    Gates every reviewable file under root (or only those in changed, a
+    {abspath: [lines]} diff) and returns the verdict dict.
+    """
+    setup_logging()
+    flush_event_log_at_exit()
+    with tracing.span("discover"):
+        files = [(path, size) for path, size in FileDiscovery(root).scan()
+                 if changed is None or os.path.abspath(path) in changed]
+    # Keep the event loop free while the history is loaded and files are stat'ed
+    ordered = await asyncio.to_thread(order_by_risk, files, threshold, changed, root)
+    set_retry_budget(RetryBudget())
+    print(f"Gate: {len(ordered)} file(s), blocking at severity >= {threshold}")
+    gate = Gate(threshold, cancel_on_block, root=root)
+    try:
+        await warm_http_client()
+        result = await gate.run(ordered, changed)
+    finally:
+        await close_http_client()
+        await close_event_log()
+        tracing.write_telemetry()
+    ttv = f" (verdict after {result['time_to_verdict']:.2f}s)" if result["time_to_verdict"] is not None else ""
+    print(f"Gate {result['verdict'].upper()}: {len(result['blocking'])} blocking finding(s), "
+          f"{result['reviewed']}/{result['files']} file(s) reviewed in {result['seconds']:.2f}s{ttv}")
+    logging.info(f"Gate result: {result['verdict']}")
+    return result
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Fail fast on blocking review findings")
+    parser.add_argument("root", nargs="?", default=os.getenv("TEST_FOLDER", "tests"))
+    parser.add_argument("--severity", type=int, default=GATE_SEVERITY, help="Blocking severity threshold")
+    parser.add_argument("--no-cancel", action="store_true", help="Finish every review after a blocking finding")
+    parser.add_argument("--diff-base", default=os.getenv("REVIEW_DIFF_BASE"), help="Gate only lines changed since this ref")
+    parser.add_argument("--diff-file", default=os.getenv("REVIEW_DIFF_FILE"), help="Gate only lines in this unified diff")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    changed = None
+    if args.diff_file:
+        changed = diff_file_changed_lines(args.diff_file)
+    elif args.diff_base:
+        try:
+            changed = git_changed_lines(args.diff_base, os.getenv("REVIEW_DIFF_HEAD"))
+        except ValueError as e:
+            parser.error(str(e))
+    result = asyncio.run(run_gate(args.root, args.severity, not args.no_cancel, changed))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    return exit_code(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from config.settings import load_env
+from auth.github_app import GITHUB_API_URL, with_installation_token
+from agents.http_client import get_http_client
+from agents.diff_agent import HUNK_HEADER
+from agents.llm_agent import LLM_FAILURE_ISSUE
+
+load_env()
+
+# Comments per submitted review; files are packed into reviews up to this size
+REVIEW_MAX_COMMENTS = int(os.getenv("REVIEW_MAX_COMMENTS", 50))
+# Attempts when GitHub answers a write with a (secondary) rate limit
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", 3))
+ETAG_CACHE_SIZE = 1024
+
+FINGERPRINT_MARKER = re.compile(r"<!-- reviewbot:fp=([0-9a-f]{16}) -->")
+
+# url -> (etag, parsed body), shared by all publishers in the process
+_etag_cache = OrderedDict()
+
+
+def diff_positions(patch: str | None) -> dict:
+    """
+    Maps head-file line numbers to GitHub diff positions: the line right
+    below the first @@ header is position 1, and later hunk headers count
+    as lines too. Only added and context lines can carry a comment.
+    """
+    positions = {}
+    if not patch:
+        return positions
+    head_line = 0
+    for position, raw in enumerate(patch.splitlines()):
+        header = HUNK_HEADER.match(raw)
+        if header:
+            head_line = int(header.group(2))
+            continue
+        if raw.startswith("-") or raw.startswith("\\"):
+            continue
+        positions[head_line] = position
+        head_line += 1
+    return positions
+
+
+def fingerprint(path: str, violation: dict, code_lines: list | None = None, occurrence: int = 0) -> str:
+    """
+    Identifies a finding across pushes: the file, the normalized issue and
+    the text of the flagged line (not its number, which shifts). occurrence
+    tells apart the same issue on identical lines, counted in line order.
+    """
+    line = violation.get("line", 0)
+    anchor = str(line)
+    if code_lines and isinstance(line, int) and 1 <= line <= len(code_lines):
+        anchor = code_lines[line - 1].strip()
+    issue = " ".join(str(violation.get("issue", "")).lower().split())
+    # The first occurrence keeps the plain key, so already-posted markers still match
+    suffix = f"\0{occurrence}" if occurrence else ""
+    return hashlib.sha256(f"{path}\0{issue}\0{anchor}{suffix}".encode()).hexdigest()[:16]
+
+
+def format_comment(violation: dict, fp: str) -> str:
+    issue = str(violation.get("issue", "")).strip()
+    fix = str(violation.get("recommendation", "")).strip()
+    body = f"**Severity {violation.get('severity', 5)}/10**: {issue}"
+    if fix:
+        body += f"\n\n💡 {fix}"
+    return f"{body}\n\n<!-- reviewbot:fp={fp} -->"
+
+
+class GitHubPublisher:
+    """
+    Posts review findings to one pull request as a few batched reviews
+    instead of one API call per comment. Findings the bot already posted
+    (recognized by the fingerprint marker in its comments) are skipped, and
+    existing comments are listed with conditional requests. With
+    installation_id, a token GitHub rejects is replaced and the request
+    retried once.
+    """
+
+    def __init__(self, repo: str, pr_number: int, head_sha: str, token: str,
+                 api_url: str = GITHUB_API_URL, max_comments: int = REVIEW_MAX_COMMENTS,
+                 installation_id: int | None = None):
+        self.repo = repo
+        self.pr_number = pr_number
+        self.head_sha = head_sha
+        self.token = token
+        self.installation_id = installation_id
+        self.api_url = api_url.rstrip("/")
+        self.max_comments = max(1, max_comments)
+        self.not_modified = 0
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}", "Accept": "application/vnd.github+json"}
+
+    async def _send(self, method: str, url: str, headers: dict | None = None, **kwargs):
+        async def send(token: str):
+            self.token = token
+            return await get_http_client().request(method, url, headers=dict(self._headers(), **(headers or {})),
+                                                   **kwargs)
+        if self.installation_id is None:
+            return await send(self.token)
+        return await with_installation_token(self.installation_id, send, self.token)
+
+    async def _get_cached(self, url: str, params: dict):
+        """
+        GET with If-None-Match; a 304 reuses the cached body and does not
+        count against the rate limit.
+        """
+        key = f"{url}?{sorted(params.items())}"
+        headers = {}
+        cached = _etag_cache.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        response = await self._send("GET", url, headers, params=params)
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            _etag_cache.move_to_end(key)
+            return cached[1]
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("etag")
+        if etag:
+            _etag_cache[key] = (etag, data)
+            _etag_cache.move_to_end(key)
+            while len(_etag_cache) > ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+        return data
+
+    async def _list(self, resource: str) -> list:
+        url = f"{self.api_url}/repos/{self.repo}/pulls/{self.pr_number}/{resource}"
+        items = []
+        page = 1
+        while True:
+            batch = await self._get_cached(url, {"per_page": 100, "page": page})
+            items.extend(batch)
+            if len(batch) < 100:
+                return items
+            page += 1
+
+    async def existing_fingerprints(self) -> set:
+        """
+        Fingerprints already on the pull request: in review comments, and in
+        review bodies for findings that were outside the diff.
+        """
+        found = set()
+        for resource in ("comments", "reviews"):
+            for item in await self._list(resource):
+                found.update(FINGERPRINT_MARKER.findall(item.get("body") or ""))
+        return found
+
+    async def _post_review(self, body: str, comments: list) -> dict:
+        url = f"{self.api_url}/repos/{self.repo}/pulls/{self.pr_number}/reviews"
+        payload = {"commit_id": self.head_sha, "event": "COMMENT", "body": body, "comments": comments}
+        for attempt in range(1, PUBLISH_MAX_ATTEMPTS + 1):
+            response = await self._send("POST", url, json=payload)
+            limited = response.status_code == 429 or (
+                response.status_code == 403 and "rate limit" in response.text.lower())
+            if not limited or attempt == PUBLISH_MAX_ATTEMPTS:
+                response.raise_for_status()
+                return response.json()
+            delay = float(response.headers.get("retry-after", 2 ** attempt))
+            logging.warning(f"{self.repo}#{self.pr_number} review rate limited, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    async def publish(self, files: list) -> dict:
+        """
+        files is a list of {"path", "patch", "violations", optional "code"}.
+        Violations on lines inside the diff become review comments; the rest
+        are listed in the review body. The placeholder for a failed review is
+        never posted; such files are returned in "failed" instead. Returns
+        counts of what was posted.
+        """
+        known = await self.existing_fingerprints()
+        stats = {"reviews": 0, "comments": 0, "duplicates": 0, "outside_diff": 0, "failed": []}
+        pending = []
+        for entry in files:
+            positions = diff_positions(entry.get("patch"))
+            code_lines = entry["code"].splitlines() if entry.get("code") else None
+            comments, outside = [], []
+            occurrences = {}
+            violations = [v for v in entry.get("violations") or [] if isinstance(v, dict)]
+            for violation in sorted(violations, key=lambda v: v.get("line") if isinstance(v.get("line"), int) else 0):
+                if violation.get("issue") == LLM_FAILURE_ISSUE:
+                    if entry["path"] not in stats["failed"]:
+                        stats["failed"].append(entry["path"])
+                    continue
+                # Lines flagged with this issue and anchor so far; a repeat on
+                # the same line is still a duplicate
+                lines = occurrences.setdefault(fingerprint(entry["path"], violation, code_lines), [])
+                if violation.get("line") not in lines:
+                    lines.append(violation.get("line"))
+                fp = fingerprint(entry["path"], violation, code_lines, lines.index(violation.get("line")))
+                if fp in known:
+                    stats["duplicates"] += 1
+                    continue
+                known.add(fp)
+                position = positions.get(violation.get("line"))
+                if position is None:
+                    outside.append((violation, fp))
+                else:
+                    comments.append({"path": entry["path"], "position": position,
+                                     "body": format_comment(violation, fp)})
+            if comments or outside:
+                pending.append((entry["path"], comments, outside))
+
+        for batch in self._batches(pending):
+            comments = [c for _, file_comments, _ in batch for c in file_comments]
+            outside = [(path, v, fp) for path, _, file_outside in batch for v, fp in file_outside]
+            await self._post_review(self._summary(batch, outside), comments)
+            stats["reviews"] += 1
+            stats["comments"] += len(comments)
+            stats["outside_diff"] += len(outside)
+        stats["not_modified"] = self.not_modified
+        return stats
+
+    def _batches(self, pending: list) -> list:
+        # Whole files per review up to max_comments; a file with more
+        # findings than that is split across reviews of its own
+        items = []
+        for path, comments, outside in pending:
+            for start in range(0, max(len(comments), len(outside)), self.max_comments):
+                items.append((path, comments[start:start + self.max_comments],
+                              outside[start:start + self.max_comments]))
+        batches, current, size = [], [], 0
+        for item in items:
+            cost = max(len(item[1]), len(item[2]))
+            if current and size + cost > self.max_comments:
+                batches.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _summary(self, batch: list, outside: list) -> str:
+        files = len({path for path, _, _ in batch})
+        total = sum(len(c) + len(o) for _, c, o in batch)
+        lines = [f"ReviewBot found {total} new issue(s) in {files} file(s) at {self.head_sha[:12]}."]
+        if outside:
+            lines += ["", "Findings outside the changed lines:", ""]
+            for path, violation, fp in outside:
+                lines.append(f"- `{path}` line {violation.get('line', 0)} (severity {violation.get('severity', 5)}): "
+                             f"{violation.get('issue', '')} <!-- reviewbot:fp={fp} -->")
+        return "\n".join(lines)
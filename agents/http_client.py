@@ -0,0 +1,84 @@
+import os
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+from config.settings import load_env
+
+load_env()
+
+if TYPE_CHECKING:
+    import httpx
+
+# Pool configuration shared by every outbound request in a run
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", 30))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "1") == "1"
+
+_client: "httpx.AsyncClient | None" = None
+
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional `h2` package is installed
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> "httpx.AsyncClient":
+    # httpx is imported on first use; runs that never call out skip its import cost
+    import httpx
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(HTTP_DEFAULT_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    http2 = HTTP_ENABLE_HTTP2 and _http2_available()
+    logging.info(
+        f"Creating shared HTTP client (max_connections={HTTP_MAX_CONNECTIONS}, "
+        f"keepalive={HTTP_MAX_KEEPALIVE}, expiry={HTTP_KEEPALIVE_EXPIRY}s, http2={http2})"
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    Returns the process-wide AsyncClient, creating it on first use.
+    Callers must not close it; use close_http_client() at shutdown.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def _import_http_stack():
+    import httpx  # noqa: F401
+    _http2_available()
+
+
+async def warm_http_client() -> "httpx.AsyncClient":
+    """
+    Imports httpx (and h2) on a worker thread, then creates the shared
+    client. Entry points await this before scheduling reviews, so the
+    deferred import does not stall the event loop while requests are in flight.
+    """
+    if _client is None or _client.is_closed:
+        await asyncio.to_thread(_import_http_stack)
+    return get_http_client()
+
+
+async def close_http_client():
+    """
+    Closes the shared client and releases pooled connections.
+    Safe to call more than once.
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -1,54 +1,235 @@
+import io
 import os
+from collections import deque
+from typing import Iterable, Iterator
+from agents.discovery import detect_language
 
-def insert_inline_comments(code: str, violations: list, filename: str) -> str:
+# Line and block comment delimiters per language, keyed by the language names
+# used in EXTENSION_LANG_MAP. The default map only yields java and python; the
+# other entries apply once EXTENSION_LANG_MAP maps extensions to those names
+# (e.g. ".go:go,.sql:sql").
+COMMENT_SYNTAX = {
+    "python": ("#", ""),
+    "java": ("//", ""),
+    "javascript": ("//", ""),
+    "typescript": ("//", ""),
+    "go": ("//", ""),
+    "rust": ("//", ""),
+    "c": ("//", ""),
+    "cpp": ("//", ""),
+    "csharp": ("//", ""),
+    "kotlin": ("//", ""),
+    "scala": ("//", ""),
+    "swift": ("//", ""),
+    "dart": ("//", ""),
+    "php": ("//", ""),
+    "groovy": ("//", ""),
+    "ruby": ("#", ""),
+    "perl": ("#", ""),
+    "shell": ("#", ""),
+    "bash": ("#", ""),
+    "powershell": ("#", ""),
+    "r": ("#", ""),
+    "elixir": ("#", ""),
+    "yaml": ("#", ""),
+    "toml": ("#", ""),
+    "dockerfile": ("#", ""),
+    "makefile": ("#", ""),
+    "sql": ("--", ""),
+    "lua": ("--", ""),
+    "haskell": ("--", ""),
+    "erlang": ("%", ""),
+    "matlab": ("%", ""),
+    "clojure": (";;", ""),
+    "lisp": (";;", ""),
+    "vb": ("'", ""),
+    "html": ("<!--", "-->"),
+    "xml": ("<!--", "-->"),
+    "css": ("/*", "*/"),
+}
+DEFAULT_COMMENT_SYNTAX = ("//", "")
+
+DIFF_CONTEXT = 3
+
+
+def comment_syntax(filename: str) -> tuple:
+    return COMMENT_SYNTAX.get(detect_language(filename), DEFAULT_COMMENT_SYNTAX)
+
+
+def detect_encoding(file_path: str) -> str:
     """
-    Inserts inline suggestions directly above the affected lines of code.
-    Each comment includes the issue description and a fix recommendation.
+    UTF-16/32 from a byte-order mark, otherwise UTF-8. The BOM itself is
+    decoded as U+FEFF and written back unchanged.
     """
-    code_lines = code.splitlines()
-    annotated_lines = []
-    
-    # Create a map from line number to all violations at that line
-    violation_map = {}
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+    for bom, encoding in ((b"\xff\xfe\x00\x00", "utf-32-le"), (b"\x00\x00\xfe\xff", "utf-32-be"),
+                          (b"\xff\xfe", "utf-16-le"), (b"\xfe\xff", "utf-16-be")):
+        if head.startswith(bom):
+            return encoding
+    return "utf-8"
+
+
+def _violation_map(violations: list) -> dict:
+    by_line = {}
     for v in violations:
-        line = v.get("line", 0)
-        if line not in violation_map:
-            violation_map[line] = []
-        violation_map[line].append(v)
+        by_line.setdefault(v.get("line", 0), []).append(v)
+    return by_line
 
-    # Use comment syntax based on file type
-    comment_prefix = "# " if filename.endswith(".py") else "// "
 
-    for i, line in enumerate(code_lines, start=1):
-        if i in violation_map:
-            for v in violation_map[i]:
-                issue = v.get('issue', 'No issue description provided.').strip()
-                fix = v.get('recommendation', 'Consider refactoring.').strip()
-                severity = v.get('severity', 5)
-                
-                annotated_lines.append(f"{comment_prefix} 🚩 Recommendation (Severity {severity}): {issue}")
-                annotated_lines.append(f"{comment_prefix} 💡 {fix}")
-        annotated_lines.append(line)
+def _split_ending(line: str) -> tuple:
+    if line.endswith("\r\n"):
+        return line[:-2], "\r\n"
+    if line.endswith(("\n", "\r")):
+        return line[:-1], line[-1]
+    return line, ""
 
-    return "\n".join(annotated_lines)
+
+def _comment_lines(violations: list, syntax: tuple, indent: str) -> list:
+    prefix, suffix = syntax
+    close = f" {suffix}" if suffix else ""
+    lines = []
+    for v in violations:
+        issue = str(v.get("issue", "No issue description provided.")).strip()
+        fix = str(v.get("recommendation", "Consider refactoring.")).strip()
+        if suffix:
+            issue, fix = issue.replace(suffix, ""), fix.replace(suffix, "")
+        lines.append(f"{indent}{prefix} 🚩 Recommendation (Severity {v.get('severity', 5)}): {issue}{close}")
+        lines.append(f"{indent}{prefix} 💡 {fix}{close}")
+    return lines
 
 
-def annotate_file_with_comments(file_path: str, violations: list, output_dir: str = "tests/annotated") -> str:
+def _annotated(lines: Iterable[str], by_line: dict, syntax: tuple) -> Iterator[tuple]:
+    """
+    Yields (body, ending, comment_ending, comments) for each source line;
+    comments are the lines to insert above it. Only one line is held at a time.
     """
-    Annotates a code file with inline comments and saves the result to output_dir.
+    last_ending = "\n"
+    for number, line in enumerate(lines, start=1):
+        body, ending = _split_ending(line)
+        comments = []
+        if number in by_line:
+            code = body.lstrip("\ufeff")
+            comments = _comment_lines(by_line[number], syntax, code[:len(code) - len(code.lstrip())])
+        yield body, ending, ending or last_ending, comments
+        last_ending = ending or last_ending
+
+
+def annotate_lines(lines: Iterable[str], violations: list, syntax: tuple = DEFAULT_COMMENT_SYNTAX) -> Iterator[str]:
+    """
+    Streams the source lines with comments inserted above the affected ones.
+    Each inserted line reuses the line ending of the line it annotates.
+    """
+    for body, ending, comment_ending, comments in _annotated(lines, _violation_map(violations), syntax):
+        if comments and body.startswith("\ufeff"):
+            # Keep a byte-order mark at the start of the file
+            body = body[1:]
+            comments[0] = "\ufeff" + comments[0]
+        for comment in comments:
+            yield comment + comment_ending
+        yield body + ending
+
+
+def diff_lines(lines: Iterable[str], violations: list, syntax: tuple = DEFAULT_COMMENT_SYNTAX,
+               name: str = "file", context: int = DIFF_CONTEXT) -> Iterator[str]:
+    """
+    Streams a unified diff from the source to its annotated version. Only
+    the current hunk is buffered, so memory depends on how close together
+    the findings are, not on the file size.
+    """
+    yield f"--- a/{name}\n"
+    yield f"+++ b/{name}\n"
+    before = deque(maxlen=context)
+    hunk = None
+    tail = []
+    offset = 0
+
+    def render(hunk, trailing):
+        old_count = hunk["old"] + len(trailing)
+        new_count = hunk["new"] + len(trailing)
+        yield f"@@ -{hunk['start']},{old_count} +{hunk['start'] + hunk['offset']},{new_count} @@\n"
+        yield from hunk["lines"]
+        for body, ending in trailing:
+            yield from _diff_line(" ", body, ending)
+
+    for number, (body, ending, comment_ending, comments) in enumerate(
+            _annotated(lines, _violation_map(violations), syntax), start=1):
+        if comments:
+            if hunk is None:
+                hunk = {"start": number - len(before), "offset": offset, "old": 0, "new": 0, "lines": []}
+                tail = list(before)
+            for context_body, context_ending in tail:
+                hunk["lines"].extend(_diff_line(" ", context_body, context_ending))
+            hunk["old"] += len(tail)
+            hunk["new"] += len(tail)
+            tail = []
+            if body.startswith("\ufeff"):
+                # The byte-order mark moves from the code line to the first comment
+                hunk["lines"].extend(_diff_line("-", body, ending))
+                comments[0] = "\ufeff" + comments[0]
+                body = body[1:]
+                marker = "+"
+            else:
+                marker = " "
+            for comment in comments:
+                hunk["lines"].append(f"+{comment}{comment_ending}")
+            hunk["lines"].extend(_diff_line(marker, body, ending))
+            hunk["old"] += 1
+            hunk["new"] += len(comments) + 1
+            offset += len(comments)
+            before.clear()
+        elif hunk is not None:
+            tail.append((body, ending))
+            if len(tail) > 2 * context:
+                yield from render(hunk, tail[:context])
+                before.extend(tail[context:])
+                hunk, tail = None, []
+        else:
+            before.append((body, ending))
+    if hunk is not None:
+        yield from render(hunk, tail[:context])
+
+
+def _diff_line(marker: str, body: str, ending: str) -> list:
+    # Original line endings are kept so the diff applies byte for byte
+    if ending:
+        return [f"{marker}{body}{ending}"]
+    return [f"{marker}{body}\n", "\\ No newline at end of file\n"]
+
+
+def insert_inline_comments(code: str, violations: list, filename: str) -> str:
+    """
+    Inserts inline suggestions directly above the affected lines of code.
+    Each comment includes the issue description and a fix recommendation.
+    """
+    lines = io.StringIO(code, newline="")
+    return "".join(annotate_lines(lines, violations, comment_syntax(filename)))
+
+
+def annotate_file_with_comments(file_path: str, violations: list, output_dir: str = "tests/annotated",
+                                diff: bool = False) -> str:
+    """
+    Annotates a code file with inline comments and saves the result to
+    output_dir, streaming line by line with the original encoding and line
+    endings. With diff=True, writes a unified diff (<name>.diff) instead.
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    with open(file_path, 'r') as f:
-        code = f.read()
-
     filename = os.path.basename(file_path)
-    annotated_code = insert_inline_comments(code, violations, filename)
-    output_path = os.path.join(output_dir, filename)
-
-    with open(output_path, 'w') as f:
-        f.write(annotated_code)
+    encoding = detect_encoding(file_path)
+    output_path = os.path.join(output_dir, filename + (".diff" if diff else ""))
+    # Written beside the target and swapped in, so annotating in place never
+    # truncates the file being read
+    tmp_path = output_path + ".tmp"
+    with open(file_path, "r", encoding=encoding, errors="surrogateescape", newline="") as src, \
+            open(tmp_path, "w", encoding=encoding, errors="surrogateescape", newline="") as dst:
+        syntax = comment_syntax(filename)
+        if diff:
+            dst.writelines(diff_lines(src, violations, syntax, name=filename))
+        else:
+            dst.writelines(annotate_lines(src, violations, syntax))
+    os.replace(tmp_path, output_path)
 
     print(f"✅ Annotated file saved to: {output_path}")
     return output_path
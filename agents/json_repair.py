@@ -0,0 +1,168 @@
+import re
+import json
+
+MAX_TEXT_LENGTH = 150
+
+_FENCE = re.compile(r"```[a-zA-Z0-9_-]*")
+_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+
+
+def _scan_outside_strings(text: str):
+    """
+    Yields (index, char, in_string) for every character of text, tracking
+    JSON string literals so callers can ignore their contents.
+    """
+    in_string = False
+    escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            yield i, ch, True
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        else:
+            if ch == '"':
+                in_string = True
+                yield i, ch, True
+            else:
+                yield i, ch, False
+
+
+def strip_fences(text: str) -> str:
+    return _FENCE.sub("", text)
+
+
+def strip_comments(text: str) -> str:
+    """
+    Removes // line comments and /* */ block comments that sit outside strings.
+    """
+    out = []
+    i = 0
+    in_string = False
+    escape = False
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+            i += 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def remove_trailing_commas(text: str) -> str:
+    out = []
+    last = 0
+    for i, ch, in_string in _scan_outside_strings(text):
+        if ch == "," and not in_string:
+            match = _TRAILING_COMMA.match(text, i)
+            if match:
+                out.append(text[last:i])
+                last = i + 1
+    out.append(text[last:])
+    return "".join(out)
+
+
+def extract_array(text: str) -> str | None:
+    """
+    Returns the first balanced top-level JSON array in text, skipping any
+    prose before or after it.
+    """
+    start = None
+    depth = 0
+    for i, ch, in_string in _scan_outside_strings(text):
+        if in_string:
+            continue
+        if ch == "[":
+            if start is None:
+                start = i
+            depth += 1
+        elif ch == "]" and start is not None:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def clean_json_text(text: str) -> str:
+    return remove_trailing_commas(strip_comments(strip_fences(text)))
+
+
+def validate_violation(violation, filename: str = "unknown") -> dict | None:
+    """
+    Coerces one element to the violation schema, or returns None if it
+    cannot be salvaged. Extra keys are dropped.
+    """
+    if not isinstance(violation, dict):
+        return None
+    issue = violation.get("issue")
+    if not isinstance(issue, str) or not issue.strip():
+        return None
+
+    try:
+        line = int(violation.get("line", 0))
+    except (TypeError, ValueError):
+        line = 0
+    try:
+        severity = int(violation.get("severity", 5))
+    except (TypeError, ValueError):
+        severity = 5
+
+    recommendation = violation.get("recommendation")
+    if not isinstance(recommendation, str) or not recommendation.strip():
+        recommendation = "Consider refactoring."
+
+    reported_name = violation.get("filename")
+    return {
+        "filename": reported_name if isinstance(reported_name, str) and reported_name else filename,
+        "line": max(line, 0),
+        "issue": issue.strip()[:MAX_TEXT_LENGTH],
+        "recommendation": recommendation.strip()[:MAX_TEXT_LENGTH],
+        "severity": min(max(severity, 1), 10),
+    }
+
+
+def validate_violations(violations: list, filename: str = "unknown") -> list:
+    return [v for v in (validate_violation(item, filename) for item in violations) if v is not None]
+
+
+def repair_violations(text: str, filename: str = "unknown") -> list | None:
+    """
+    Deterministically repairs common LLM formatting slips (markdown fences,
+    // comments, trailing commas, surrounding prose) and validates every
+    element. Returns None when the text cannot be turned into an array.
+    """
+    if not text:
+        return None
+    cleaned = clean_json_text(text)
+    candidate = extract_array(cleaned)
+    if candidate is None:
+        return None
+    try:
+        parsed = json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, list):
+        return None
+    return validate_violations(parsed, filename)
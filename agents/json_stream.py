@@ -0,0 +1,123 @@
+import json
+from agents.json_repair import clean_json_text
+
+# Prose or a markdown fence before the array is tolerated up to this many characters
+MAX_PREAMBLE_CHARS = 300
+
+
+class InvalidStreamError(ValueError):
+    """
+    Raised as soon as streamed output can no longer become a JSON array of objects.
+    """
+
+
+class ViolationStreamParser:
+    """
+    Incrementally parses a JSON array of violation objects as text arrives.
+    feed() returns every object completed by the new text, so consumers can
+    act on findings before the model has finished generating. The same slips
+    that json_repair fixes (leading prose or fences, // and /* */ comments,
+    trailing commas) are tolerated; anything else aborts the stream.
+    """
+
+    def __init__(self):
+        self.violations = []
+        self.done = False
+        self._started = False
+        self._preamble = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # None, "//" or "/*" while inside a comment
+        self._comment = None
+        self._pending_star = False
+        self._pending_slash = False
+        self._element = []
+        self._expect_value = True
+
+    def feed(self, text: str) -> list:
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                    continue
+                self._preamble += 1
+                if self._preamble > MAX_PREAMBLE_CHARS or ch in "{]}":
+                    raise InvalidStreamError("output does not start with a JSON array")
+                continue
+
+            if self._comment == "//":
+                if ch == "\n":
+                    self._comment = None
+                continue
+            if self._comment == "/*":
+                if self._pending_star and ch == "/":
+                    self._comment = None
+                self._pending_star = ch == "*"
+                continue
+            if self._pending_slash:
+                self._pending_slash = False
+                if ch in "/*":
+                    self._comment = "/" + ch
+                    self._pending_star = False
+                    continue
+                if self._depth == 0:
+                    raise InvalidStreamError("unexpected '/' between array elements")
+                self._element.append("/")
+            if ch == "/" and not self._in_string:
+                self._pending_slash = True
+                continue
+
+            if self._depth == 0:
+                # Between elements of the top-level array
+                if ch.isspace():
+                    continue
+                if ch == "]":
+                    self.done = True
+                elif ch == "," and not self._expect_value:
+                    self._expect_value = True
+                elif ch == "{" and self._expect_value:
+                    self._depth = 1
+                    self._element = [ch]
+                    self._expect_value = False
+                else:
+                    raise InvalidStreamError(f"unexpected {ch!r} between array elements")
+                continue
+
+            self._element.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(self._finish_element())
+
+        return completed
+
+    def _finish_element(self) -> dict:
+        raw = "".join(self._element)
+        self._element = []
+        try:
+            element = json.loads(raw)
+        except json.JSONDecodeError:
+            try:
+                element = json.loads(clean_json_text(raw))
+            except json.JSONDecodeError as e:
+                raise InvalidStreamError(f"malformed array element: {str(e).splitlines()[0]}")
+        self.violations.append(element)
+        return element
+
+    def result(self) -> str:
+        return json.dumps(self.violations)
@@ -1,32 +1,24 @@
 import os
-import httpx
 import asyncio
 import json
-import time
 import logging
 from collections import defaultdict
-from dotenv import load_dotenv
+from config.settings import load_env
+from agents.json_repair import repair_violations, validate_violations
+from agents.llm_router import get_router
+from agents.log_agent import log_attempt
+from agents.llm_errors import LLMError, LLMInvalidOutputError, backoff_delay, get_retry_budget
+from agents import tracing
 
 # Load secrets
-load_dotenv("config/secrets.env")
+load_env()
 
-# Config from env
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
-OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", 60))
-OLLAMA_RETRY_DELAY = int(os.getenv("OLLAMA_RETRY_DELAY", 3))
+# Config from env (backend endpoints live in agents/backends.py, backoff and
+# retry budget in agents/llm_errors.py)
 MAX_ATTEMPTS = int(os.getenv("OLLAMA_MAX_ATTEMPTS", 5))
 
-# Setup logs
-LOG_DIR = os.getenv("LOG_FOLDER", "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
-LOG_FILE = os.path.join(LOG_DIR, "llm_agent.log")
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
+# Issue text of the placeholder violation returned when every attempt fails
+LLM_FAILURE_ISSUE = "LLM failed to return valid JSON after retries"
 
 # Prompt to trigger retry on invalid output
 REPAIR_PROMPT = """
@@ -55,72 +47,115 @@ You must re-analyze the file from scratch and return **only** the JSON array.
 Be strict and structured.
 """
 
-async def query_ollama_async(prompt: str) -> str | None:
-    async with httpx.AsyncClient(timeout=OLLAMA_TIMEOUT) as client:
-        try:
-            response = await client.post(
-                f"{OLLAMA_URL.rstrip('/')}/api/generate",
-                json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
-            )
-            if response.status_code == 200:
-                return response.json().get("response", "").strip() or None
-            else:
-                return None
-        except Exception as e:
-            return None
-
-
-async def get_llm_response_async(prompt: str, filename: str = "unknown") -> str:
+def _log_earlier_failures(filename: str, attempt: int, failure_reasons: dict):
+    if attempt > 1:
+        for reason, count in failure_reasons.items():
+            logging.info(f"{filename} had {count} earlier failure(s) due to: {reason}")
+
+
+def _finding_fields(violations: list) -> dict:
+    # Kept in the attempt log so later runs know which files tend to have findings
+    severities = [v.get("severity", 0) for v in violations if isinstance(v.get("severity"), int)]
+    return {"violations": len(violations), "max_severity": max(severities, default=0)}
+
+
+async def get_llm_response_async(prompt: str, filename: str = "unknown", on_violation=None,
+                                 system: str | None = None, max_attempts: int = MAX_ATTEMPTS) -> str:
+    """
+    Queries the LLM until it returns a JSON array of violations. system is the
+    stable instruction prefix; it is sent separately so backends can reuse
+    its evaluation across files, and only prompt changes between retries.
+    Failures are retried according to their LLMError class: invalid output
+    immediately with the repair prompt, backend trouble after a jittered
+    exponential backoff, and never once the run's retry budget is spent.
+    """
     attempt = 1
     full_prompt = prompt
     failure_reasons = defaultdict(int)
+    router = get_router()
+    budget = get_retry_budget()
+    budget.record_request()
 
     print(f"Starting review for {filename}")
     logging.info(f"Starting LLM review for {filename}")
 
-    while attempt <= MAX_ATTEMPTS:
+    while attempt <= max_attempts:
         print(f"{filename} attempt {attempt}")
-        logging.info(f"{filename} attempt {attempt} with model {OLLAMA_MODEL}")
+        logging.info(f"{filename} attempt {attempt} with model {router.model_signature()}")
 
-        result = await query_ollama_async(full_prompt)
-
-        if result:
-            try:
-                parsed = json.loads(result)
+        try:
+            with tracing.labels(attempt=attempt):
+                result = await router.generate(full_prompt, on_violation=on_violation, filename=filename,
+                                               system=system)
+
+            with tracing.span("parse", attempt=attempt) as parse_span:
+                try:
+                    parsed = json.loads(result)
+                    decode_error = None
+                except json.JSONDecodeError as e:
+                    parsed = None
+                    decode_error = f"JSONDecodeError: {str(e).splitlines()[0]}"
                 if isinstance(parsed, list):
-                    print(f"{filename} - valid JSON received at attempt {attempt}")
-                    logging.info(f"{filename} valid JSON received at attempt {attempt}")
-                    if attempt > 1:
-                        for reason, count in failure_reasons.items():
-                            logging.info(f"{filename} had {count} earlier failure(s) due to: {reason}")
-                    return result
+                    violations = validate_violations(parsed, filename)
+                    parse_span["status"] = "valid"
                 else:
-                    reason = "Non-list JSON structure"
-                    failure_reasons[reason] += 1
-                    logging.warning(f"{filename} response not a list")
-            except json.JSONDecodeError as e:
-                reason = f"JSONDecodeError: {str(e).splitlines()[0]}"
-                failure_reasons[reason] += 1
-                logging.warning(f"{filename} JSON decode error: {reason}")
+                    # Try a cheap deterministic repair before paying for another generation
+                    violations = repair_violations(result, filename)
+                    parse_span["status"] = "repaired" if violations is not None else "invalid"
+
+            if isinstance(parsed, list):
+                print(f"{filename} - valid JSON received at attempt {attempt}")
+                logging.info(f"{filename} valid JSON received at attempt {attempt}")
+                _log_earlier_failures(filename, attempt, failure_reasons)
+                log_attempt(prompt, "success", key=filename, attempt=attempt, **_finding_fields(violations))
+                return json.dumps(violations)
+
+            if violations is not None:
+                print(f"{filename} - JSON repaired locally at attempt {attempt}")
+                logging.info(f"{filename} malformed output repaired locally at attempt {attempt}")
+                _log_earlier_failures(filename, attempt, failure_reasons)
+                log_attempt(prompt, "success", key=filename, attempt=attempt, repaired=True,
+                            **_finding_fields(violations))
+                return json.dumps(violations)
+
+            if decode_error:
                 full_prompt = prompt + "\n" + REPAIR_PROMPT
-        else:
-            reason = "No response or HTTP error"
-            failure_reasons[reason] += 1
-            logging.warning(f"{filename} no response from Ollama")
+                raise LLMInvalidOutputError(decode_error)
+            raise LLMInvalidOutputError("Non-list JSON structure")
 
-        print(f"Retrying {filename} in {OLLAMA_RETRY_DELAY} seconds...")
-        await asyncio.sleep(OLLAMA_RETRY_DELAY)
-        attempt += 1
+        except LLMError as e:
+            error = e
 
-    print(f"{filename} failed after {MAX_ATTEMPTS} attempts")
-    logging.critical(f"{filename} all {MAX_ATTEMPTS} attempts failed")
+        reason = error.reason
+        failure_reasons[reason] += 1
+        logging.warning(f"{filename} attempt {attempt} failed: {reason}")
+        log_attempt(prompt, "failure", reason, key=filename, attempt=attempt, error_kind=error.kind)
+
+        if not error.retryable:
+            logging.error(f"{filename} not retrying {error.kind} error")
+            break
+        attempt += 1
+        if attempt > max_attempts:
+            break
+        if not budget.try_spend():
+            logging.error(f"{filename} retry budget exhausted ({budget.stats()}), giving up")
+            break
+
+        delay = backoff_delay(attempt - 1, error)
+        if delay:
+            print(f"Retrying {filename} in {delay:.2f} seconds...")
+            with tracing.span("backoff", attempt=attempt, status=error.kind):
+                await asyncio.sleep(delay)
+
+    print(f"{filename} failed after {min(attempt, max_attempts)} attempt(s)")
+    logging.critical(f"{filename} gave up after {min(attempt, max_attempts)} attempt(s)")
     for reason, count in failure_reasons.items():
         logging.critical(f"{filename} {count} failure(s): {reason}")
 
     return json.dumps([{
         "filename": filename,
         "line": 0,
-        "issue": "LLM failed to return valid JSON after retries",
+        "issue": LLM_FAILURE_ISSUE,
         "recommendation": "Check model output, prompt size, or formatting",
         "severity": 10
     }])
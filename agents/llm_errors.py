@@ -0,0 +1,215 @@
+import os
+import random
+import threading
+from contextvars import ContextVar
+from config.settings import load_env
+
+load_env()
+
+# Exponential backoff with full jitter: sleep uniform(0, min(MAX, BASE * 2**(attempt-1)))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", os.getenv("OLLAMA_RETRY_DELAY", 3)))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 60))
+# Retries allowed per run: LLM_RETRY_BUDGET_MIN plus this fraction of first attempts
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", 0.2))
+LLM_RETRY_BUDGET_MIN = int(os.getenv("LLM_RETRY_BUDGET_MIN", 10))
+
+
+class LLMError(Exception):
+    """
+    A failed LLM request. The class attributes say how callers react:
+    retryable  - another attempt may succeed
+    failover   - another backend may succeed where this one did not
+    backoff    - wait before retrying (the backend is struggling)
+    overload   - the backend is pushing back; shrink concurrency
+    trips_breaker - counts towards the backend's circuit breaker
+    """
+    kind = "error"
+    retryable = True
+    failover = True
+    backoff = True
+    overload = False
+    trips_breaker = True
+
+    def __init__(self, detail: str = "", backend: str | None = None):
+        super().__init__(detail or self.kind)
+        self.detail = detail
+        self.backend = backend
+
+    @property
+    def reason(self) -> str:
+        return f"{self.kind}: {self.detail}" if self.detail else self.kind
+
+
+class LLMTimeoutError(LLMError):
+    kind = "timeout"
+    overload = True
+
+
+class LLMConnectionError(LLMError):
+    kind = "connection"
+
+
+class LLMServerError(LLMError):
+    kind = "server_error"
+
+    def __init__(self, status: int, detail: str = "", backend: str | None = None):
+        super().__init__(detail or f"HTTP {status}", backend)
+        self.status = status
+        # 503 is the server shedding load
+        self.overload = status == 503
+
+
+class LLMRateLimitError(LLMError):
+    kind = "rate_limited"
+    overload = True
+    trips_breaker = False
+
+    def __init__(self, detail: str = "HTTP 429", backend: str | None = None, retry_after: float | None = None):
+        super().__init__(detail, backend)
+        self.retry_after = retry_after
+
+
+class LLMProtocolError(LLMError):
+    """
+    The server answered with something that is not a valid API response.
+    """
+    kind = "protocol"
+
+
+class LLMClientError(LLMError):
+    """
+    The request itself was rejected (4xx other than 429); repeating it will not help.
+    """
+    kind = "client_error"
+    retryable = False
+    failover = False
+    trips_breaker = False
+
+    def __init__(self, status: int, detail: str = "", backend: str | None = None):
+        super().__init__(detail or f"HTTP {status}", backend)
+        self.status = status
+
+
+class LLMEmptyResponseError(LLMError):
+    kind = "empty_response"
+    backoff = False
+    trips_breaker = False
+
+
+class LLMInvalidOutputError(LLMError):
+    """
+    The model answered but not with a usable violation array; retried
+    immediately with the repair prompt.
+    """
+    kind = "invalid_output"
+    failover = False
+    backoff = False
+    trips_breaker = False
+
+
+class LLMCircuitOpenError(LLMError):
+    """
+    The backend's circuit is open, or half-open with its one probe request
+    already in flight.
+    """
+    kind = "circuit_open"
+    trips_breaker = False
+
+
+class LLMUnavailableError(LLMError):
+    """
+    No backend could take the request (all circuits open).
+    """
+    kind = "unavailable"
+    failover = False
+    trips_breaker = False
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def error_for_status(status: int, backend: str | None = None, retry_after: str | None = None) -> LLMError:
+    if status == 429:
+        return LLMRateLimitError(backend=backend, retry_after=retry_after_seconds(retry_after))
+    if status >= 500:
+        return LLMServerError(status, backend=backend)
+    return LLMClientError(status, backend=backend)
+
+
+def backoff_delay(attempt: int, error: LLMError | None = None, base: float = LLM_BACKOFF_BASE,
+                  cap: float = LLM_BACKOFF_MAX, rng=random) -> float:
+    """
+    Seconds to wait before retry number attempt (1-based). Full jitter keeps
+    concurrent reviews from retrying in lockstep; Retry-After is honoured.
+    """
+    if error is not None and not error.backoff:
+        return 0.0
+    delay = rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
+
+
+class RetryBudget:
+    """
+    Caps retries across a whole run to min_retries plus ratio times the
+    number of first attempts, so a struggling backend sees at most that much
+    extra load no matter how many files fail.
+    """
+
+    def __init__(self, ratio: float = LLM_RETRY_BUDGET_RATIO, min_retries: int = LLM_RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                self.denied += 1
+                return False
+            self.retries += 1
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "denied": self.denied,
+            "allowed": int(self.min_retries + self.ratio * self.requests),
+        }
+
+
+# Set per run or per webhook job; asyncio tasks inherit it, so concurrent
+# jobs in one process each spend their own budget
+_retry_budget: ContextVar = ContextVar("retry_budget", default=None)
+_default_budget: RetryBudget | None = None
+
+
+def get_retry_budget() -> RetryBudget:
+    global _default_budget
+    budget = _retry_budget.get()
+    if budget is None:
+        if _default_budget is None:
+            _default_budget = RetryBudget()
+        budget = _default_budget
+    return budget
+
+
+def set_retry_budget(budget: RetryBudget | None):
+    """
+    Starts a fresh budget, e.g. per run or per webhook job. It applies to the
+    current task and the tasks it creates from then on.
+    """
+    _retry_budget.set(budget)
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import logging
+from config.settings import load_env
+from agents.backends import OllamaBackend, backends_from_spec
+from agents.llm_errors import LLMError, LLMUnavailableError
+
+load_env()
+
+# Empty means a single Ollama backend built from OLLAMA_URL / OLLAMA_MODEL
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+# Send a duplicate request to a second backend once the first has run longer
+# than this latency percentile; 0 disables hedging
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 0.95))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+class LLMRouter:
+    """
+    Spreads requests over several backends: picks the least loaded healthy
+    one, fails over when it errors, and hedges slow requests by racing a
+    duplicate on a second backend.
+    """
+
+    def __init__(self, backends: list, hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def model_signature(self) -> str:
+        return "+".join(sorted({b.model for b in self.backends}))
+
+    def pick(self, exclude=()) -> object | None:
+        candidates = [b for b in self.backends if b not in exclude and b.is_available()]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda b: (b.load(), _percentile(b.latencies, 0.5) if b.latencies else 0.0))
+
+    def hedge_delay(self) -> float | None:
+        if self.hedge_percentile <= 0 or len(self.backends) < 2:
+            return None
+        samples = [lat for b in self.backends for lat in b.latencies]
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return _percentile(samples, self.hedge_percentile)
+
+    async def generate(self, prompt: str, on_violation=None, filename: str = "unknown",
+                       system: str | None = None) -> str:
+        """
+        Returns the first successful raw completion. Errors that another
+        backend could avoid fail over; otherwise the last error is raised
+        (LLMUnavailableError when no backend could be tried at all).
+        """
+        tried = []
+        last_error = None
+        while True:
+            backend = self.pick(exclude=tried)
+            if backend is None:
+                raise last_error or LLMUnavailableError("no healthy backend")
+            tried.append(backend)
+            try:
+                return await self._hedged(backend, tried, prompt, on_violation, filename, system)
+            except LLMError as e:
+                if not e.failover:
+                    raise
+                last_error = e
+            self.failovers += 1
+            logging.warning(f"{filename} failing over from {backend.name} ({last_error.reason})")
+
+    async def _hedged(self, primary, tried: list, prompt: str, on_violation, filename: str,
+                      system: str | None) -> str:
+        owner = []
+
+        def emit_from(backend):
+            # Only the first backend to stream a violation feeds the consumer
+            if on_violation is None:
+                return None
+
+            def callback(violation):
+                if not owner:
+                    owner.append(backend)
+                if owner[0] is backend:
+                    on_violation(violation)
+            return callback
+
+        first = asyncio.create_task(primary.generate(prompt, emit_from(primary), filename, system))
+        tasks = [first]
+        errors = []
+        # Also covers the hedge delay: a cancelled caller must not orphan first
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await first
+
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                return first.result()
+
+            secondary = self.pick(exclude=tried)
+            if secondary is None:
+                return await first
+            tried.append(secondary)
+            self.hedges += 1
+            logging.info(f"{filename} hedging {primary.name} with {secondary.name} after {delay:.2f}s")
+            second = asyncio.create_task(secondary.generate(prompt, emit_from(secondary), filename, system))
+            tasks.append(second)
+
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(task.exception())
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        # Both failed; prefer a classified LLMError over an unexpected exception
+        errors.sort(key=lambda e: not isinstance(e, LLMError))
+        raise errors[0]
+
+    def stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "backends": {b.name: b.stats() for b in self.backends},
+        }
+
+
+_router: LLMRouter | None = None
+
+
+def get_router() -> LLMRouter:
+    global _router
+    if _router is None:
+        backends = backends_from_spec(LLM_BACKENDS) if LLM_BACKENDS else [OllamaBackend()]
+        _router = LLMRouter(backends)
+    return _router
+
+
+def set_router(router: LLMRouter | None):
+    """
+    Replaces the process-wide router, e.g. with MockBackends in tests.
+    """
+    global _router
+    _router = router
@@ -1,44 +1,271 @@
 import os
 import json
-from datetime import datetime
+import glob
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from config.settings import load_env
 
-LOG_FILE = "logs/ollama_log.json"
-os.makedirs("logs", exist_ok=True)
+load_env()
 
-def load_logs():
-    if not os.path.exists(LOG_FILE):
-        return {}
-    with open(LOG_FILE, "r") as f:
+LOG_DIR = os.getenv("LOG_FOLDER", "logs")
+LOG_FILE = os.path.join(LOG_DIR, "ollama_log.jsonl")
+
+# Buffered events are written once this many are pending or every flush interval
+EVENT_LOG_BATCH = int(os.getenv("EVENT_LOG_BATCH", 100))
+EVENT_LOG_FLUSH_INTERVAL = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL", 1.0))
+# Rotate the active file past this size or age; keep this many rotated files
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", 50 * 1024 * 1024))
+EVENT_LOG_MAX_AGE = float(os.getenv("EVENT_LOG_MAX_AGE", 24 * 3600))
+EVENT_LOG_BACKUPS = int(os.getenv("EVENT_LOG_BACKUPS", 10))
+
+
+class EventLog:
+    """
+    Append-only JSON Lines event log. log() only appends to an in-memory
+    buffer; batches are written by flush(), which the background task calls
+    when running inside an event loop.
+    """
+
+    def __init__(self, path: str = LOG_FILE):
+        self.path = path
+        self._buffer = []
+        # _lock guards the buffer and is only held briefly; _write_lock
+        # serializes file writes and rotation
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._task = None
+        # The batch flush in flight, if any; referenced so it is not garbage-collected
+        self._flushes = set()
+        # When the active file was started; read from the file on first use
+        self._opened_at = None
+
+    def log(self, event: dict):
+        with self._lock:
+            self._buffer.append(event)
+            pending = len(self._buffer)
+        if pending >= EVENT_LOG_BATCH:
+            self._schedule_flush()
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._flush_periodically())
+
+    def _schedule_flush(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._flushes:
+            # The pending flush takes whatever is buffered when it runs
+            return
+        task = loop.create_task(asyncio.to_thread(self.flush))
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Event log flush to {self.path} failed: {task.exception()!r}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(EVENT_LOG_FLUSH_INTERVAL)
+            if self._buffer:
+                await asyncio.to_thread(self.flush)
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._rotate_if_needed()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in batch))
+
+    def _started_at(self, st: os.stat_result) -> float:
+        """
+        When the active file was started: its birth time where the platform
+        records one, else the timestamp of its first event, else its mtime.
+        """
+        birth = getattr(st, "st_birthtime", None)
+        if birth:
+            return birth
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                first = json.loads(f.readline())
+            return datetime.fromisoformat(first["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return st.st_mtime
+
+    def _rotate_if_needed(self):
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._opened_at = time.time()
+            return
+        if self._opened_at is None:
+            self._opened_at = self._started_at(st)
+        too_big = st.st_size >= EVENT_LOG_MAX_BYTES
+        too_old = time.time() - self._opened_at >= EVENT_LOG_MAX_AGE
+        if not (too_big or too_old):
+            return
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        base, ext = os.path.splitext(self.path)
+        try:
+            os.replace(self.path, f"{base}.{stamp}{ext}")
+        except FileNotFoundError:
+            # Another process sharing the log (e.g. a review shard) rotated it first
+            pass
+        self._opened_at = time.time()
+        rotated = self.files()
+        for stale in rotated[:max(0, len(rotated) - EVENT_LOG_BACKUPS)]:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                # Already pruned by another process sharing the log
+                pass
+
+    def files(self) -> list:
+        """
+        Rotated files oldest first, followed by the active file.
+        """
+        base, ext = os.path.splitext(self.path)
+        rotated = sorted(glob.glob(f"{base}.*{ext}"))
+        return rotated + ([self.path] if os.path.exists(self.path) else [])
+
+    def events(self):
+        """
+        Streams every logged event, oldest first, without loading whole files.
+        """
+        self.flush()
+        for path in self.files():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await asyncio.to_thread(self.flush)
+
+
+_event_log = EventLog()
+_flush_registered = False
+
+
+def get_event_log() -> EventLog:
+    return _event_log
 
-def save_logs(log_data):
-    with open(LOG_FILE, "w") as f:
-        json.dump(log_data, f, indent=2)
 
-def log_attempt(prompt, status, error=None):
-    logs = load_logs()
-    prompt_key = prompt.strip()[:80]  # Avoid log bloat
+def flush_event_log_at_exit():
+    """
+    Writes events still buffered when the interpreter exits. Called by
+    entry points rather than at import, like setup_logging().
+    """
+    global _flush_registered
+    if not _flush_registered:
+        _flush_registered = True
+        atexit.register(_event_log.flush)
 
-    if prompt_key not in logs:
-        logs[prompt_key] = {
-            "attempts": [],
+
+def aggregate(key: str | None = None, since: str | None = None) -> dict:
+    """
+    Builds the per-prompt view ({attempts, fail_counts, success_count}) from
+    the event log on demand. since is an ISO timestamp lower bound.
+    """
+    view = {}
+    for event in _event_log.events():
+        if key is not None and event.get("key") != key:
+            continue
+        if since is not None and event.get("timestamp", "") < since:
+            continue
+        entry = view.setdefault(event.get("key", ""), {
+            "attempts": 0,
             "fail_counts": {},
-            "success_count": 0
-        }
+            "success_count": 0,
+            "last_attempt": None,
+        })
+        entry["attempts"] += 1
+        entry["last_attempt"] = event.get("timestamp")
+        if event.get("status") == "success":
+            entry["success_count"] += 1
+        elif event.get("status") == "failure" and event.get("error"):
+            error = event["error"]
+            entry["fail_counts"][error] = entry["fail_counts"].get(error, 0) + 1
+    return view
+
+
+def history_key(path: str, root: str) -> str:
+    """
+    The path below root. Local reviews and the gate review (and so log
+    attempts) under it, so they share one history and same-named files in
+    different directories keep separate ones.
+    """
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def violation_history() -> dict:
+    """
+    Per-key finding history from successful attempts: {reviews, violations,
+    max_severity}. The key is the filename the review was given: the
+    history_key() of the file for local reviews and the gate, the repository
+    path for the service. Attempts logged before findings were recorded are
+    ignored.
+    """
+    history = {}
+    for event in _event_log.events():
+        if event.get("status") != "success" or "violations" not in event:
+            continue
+        entry = history.setdefault(event.get("key", ""), {"reviews": 0, "violations": 0, "max_severity": 0})
+        entry["reviews"] += 1
+        entry["violations"] += event["violations"]
+        entry["max_severity"] = max(entry["max_severity"], event.get("max_severity", 0))
+    return history
+
+
+def load_logs():
+    return aggregate()
 
-    timestamp = datetime.utcnow().isoformat()
-    entry = {"timestamp": timestamp, "status": status}
 
+def log_attempt(prompt, status, error=None, key=None, **fields):
+    """
+    Records one LLM attempt. key groups attempts (defaults to the start of
+    the prompt); extra fields such as filename or attempt are stored as-is.
+    """
+    event = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "key": key if key is not None else prompt.strip()[:80],  # Avoid log bloat
+        "status": status,
+    }
     if status == "failure" and error:
-        error = str(error)
-        logs[prompt_key]["fail_counts"][error] = logs[prompt_key]["fail_counts"].get(error, 0) + 1
-        entry["error"] = error
+        event["error"] = str(error)
+    event.update(fields)
+    _event_log.log(event)
 
-    if status == "success":
-        logs[prompt_key]["success_count"] += 1
 
-    logs[prompt_key]["attempts"].append(entry)
-    save_logs(logs)
+async def close_event_log():
+    await _event_log.aclose()
@@ -0,0 +1,142 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from config.settings import load_env
+
+load_env()
+
+REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "1") == "1"
+REVIEW_CACHE_PATH = os.getenv("REVIEW_CACHE_PATH", ".reviewbot/review_cache.sqlite")
+REVIEW_CACHE_MAX_BYTES = int(os.getenv("REVIEW_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Least recently used entries deleted per round trip when evicting
+EVICT_BATCH = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+"""
+
+
+def make_cache_key(code: str, language: str, prompt_version: str, model: str) -> str:
+    """
+    Content address of a review: identical bytes, language, prompt and model
+    always map to the same key.
+    """
+    digest = hashlib.sha256()
+    for part in (code, language, prompt_version, model):
+        digest.update(part.encode("utf-8", "surrogateescape"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    SQLite-backed store of raw LLM review output with size-bounded LRU
+    eviction. The total size is kept as a running count, so a put does not
+    scan the table; it is recounted only when it says eviction is due, as
+    other processes may share the file.
+    """
+
+    def __init__(self, path: str = REVIEW_CACHE_PATH, max_bytes: int = REVIEW_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._total = self._size()
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._conn:
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def peek(self, key: str) -> str | None:
+        """
+        Like get(), but without counting a lookup or refreshing the entry.
+        """
+        row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8", "surrogateescape"))
+        with self._conn:
+            previous = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+        self._total += size - (previous[0] if previous else 0)
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        total = self._size()
+        with self._conn:
+            while total > self.max_bytes:
+                rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT ?",
+                                          (EVICT_BATCH,)).fetchall()
+                if not rows:
+                    break
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    total -= size
+                    self.evictions += 1
+        self._total = total
+        logging.info(f"Review cache evicted down to {total} bytes")
+
+    def stats(self) -> dict:
+        entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._total = total
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+_cache: ReviewCache | None = None
+
+
+def get_review_cache() -> ReviewCache | None:
+    """
+    Returns the shared cache, or None when REVIEW_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not REVIEW_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ReviewCache()
+    return _cache
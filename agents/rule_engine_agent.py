@@ -1,16 +1,24 @@
 import os
-from dotenv import load_dotenv
-from agents.llm_agent import get_llm_response_async
-from typing import Optional
+import json
+import asyncio
+import logging
+import hashlib
+from config.settings import load_env
+from agents.llm_agent import get_llm_response_async, LLM_FAILURE_ISSUE
+from agents.llm_router import get_router
+from agents.review_cache import get_review_cache, make_cache_key
+from agents.diff_agent import build_excerpt, map_violations_to_head, map_line_to_head, DIFF_CONTEXT_LINES
+from agents.static_checks import run_static_checks, strip_covered_rules
+from agents.batcher import build_batch_prompt, route_violations
+from agents.discovery import detect_language
+from agents import tracing
+from agents.chunker import (
+    split_into_chunks, merge_chunk_results, rebase_line, estimate_tokens,
+    CHUNK_TOKEN_BUDGET, CHUNK_CONCURRENCY,
+)
 
 # Load environment variables
-load_dotenv("config/secrets.env")
-
-# Extension-to-language mapping from environment variable
-EXTENSION_LANG_MAP = {
-    ext.strip(): lang.strip()
-    for ext, lang in (item.split(":") for item in os.getenv("EXTENSION_LANG_MAP", ".java:java,.py:python").split(","))
-}
+load_env()
 
 # Strict AutoReviewBot System Prompt (revised)
 SYSTEM_PROMPT = """
@@ -96,30 +104,268 @@ Output MUST be valid JSON or the review will fail and re-run.
 You are a **blocking reviewer**: no merge is allowed unless your violations are fixed.
 """
 
+# Mechanical rules are checked locally and dropped from the prompt; with
+# STATIC_SKIP_LLM_ON_CLEAN files without static findings skip the LLM entirely
+STATIC_CHECKS_ENABLED = os.getenv("STATIC_CHECKS_ENABLED", "1") == "1"
+STATIC_SKIP_LLM_ON_CLEAN = os.getenv("STATIC_SKIP_LLM_ON_CLEAN", "0") == "1"
+
+REVIEW_SYSTEM_PROMPT = strip_covered_rules(SYSTEM_PROMPT) if STATIC_CHECKS_ENABLED else SYSTEM_PROMPT
+
+# Attempts per multi-file prompt before the batch is split in half
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", 1))
+
+# Bumps automatically whenever the prompt text changes, invalidating cached reviews
+PROMPT_VERSION = hashlib.sha256(REVIEW_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+
 
-def detect_language_from_filename(filename: str) -> str:
-    for ext, lang in EXTENSION_LANG_MAP.items():
-        if filename.endswith(ext):
-            return lang
-    return "unknown"
+def _is_cacheable(response: str) -> bool:
+    try:
+        parsed = json.loads(response)
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(parsed, list):
+        return False
+    return not any(isinstance(v, dict) and v.get("issue") == LLM_FAILURE_ISSUE for v in parsed)
 
 
-async def get_violations_from_llm(code: str, filename: str) -> str:
-    language = detect_language_from_filename(filename)
+def _with_filename(response: str, filename: str) -> str:
+    # Cached output may come from an identical file under another name
+    parsed = json.loads(response)
+    for v in parsed:
+        if isinstance(v, dict):
+            v["filename"] = filename
+    return json.dumps(parsed)
+
+
+def build_review_prompt(code: str, filename: str, language: str, scope_note: str = "") -> str:
     full_prompt = f"""Review the following file for guideline violations.
 
 Filename: {filename}
 Language: {language}
-
+{scope_note}
 ```{language}
 {code}
 ```
 
 REMEMBER: respond ONLY with the JSON array as specified earlier.
 """
-    prompt = f"{SYSTEM_PROMPT}\n{full_prompt}"
-    response = await get_llm_response_async(prompt, filename=filename)
-    return response.strip() if response else "[]"
+    return full_prompt
+
+
+def _relined(on_violation, rebase):
+    # Wraps a streaming callback so it sees file-relative line numbers
+    if on_violation is None:
+        return None
+
+    def callback(violation):
+        if isinstance(violation, dict):
+            violation = dict(violation, line=rebase(violation.get("line", 0)))
+        on_violation(violation)
+    return callback
+
+
+async def _review_with_cache(code: str, filename: str, language: str, variant: str, prompt: str,
+                             on_violation=None) -> str:
+    cache = get_review_cache()
+    cache_key = make_cache_key(code, language, f"{PROMPT_VERSION}{variant}", get_router().model_signature())
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            response = _with_filename(cached, filename)
+            if on_violation is not None:
+                for v in json.loads(response):
+                    on_violation(v)
+            return response
+
+    response = await get_llm_response_async(prompt, filename=filename, on_violation=on_violation,
+                                            system=REVIEW_SYSTEM_PROMPT)
+    response = response.strip() if response else "[]"
+    if cache is not None and _is_cacheable(response):
+        cache.put(cache_key, response)
+    return response
+
+
+def cached_review(code: str, filename: str) -> str | None:
+    """
+    The cached whole-file review of code, if there is one, without calling
+    the LLM or touching cache statistics.
+    """
+    cache = get_review_cache()
+    if cache is None:
+        return None
+    language = detect_language(filename)
+    cached = cache.peek(make_cache_key(code, language, PROMPT_VERSION, get_router().model_signature()))
+    return _with_filename(cached, filename) if cached is not None else None
+
+
+async def get_violations_from_llm(code: str, filename: str, changed_lines: list | None = None,
+                                  context_lines: int = DIFF_CONTEXT_LINES, on_violation=None) -> str:
+    """
+    Reviews code and returns the raw JSON array of violations: static check
+    findings merged with the LLM's.
+    When changed_lines is given, only those lines plus context_lines of
+    surrounding code are sent, and reported lines are mapped back to the file.
+    on_violation, if set, is called with each violation as soon as it is
+    parsed; findings from an attempt that later fails may be repeated.
+    """
+    language = detect_language(filename)
+
+    with tracing.labels(file=filename, language=language, size=len(code)):
+        with tracing.span("static"):
+            static = run_static_checks(code, filename, language) if STATIC_CHECKS_ENABLED else []
+        if changed_lines:
+            touched = set(changed_lines)
+            static = [v for v in static if v["line"] in touched or v["line"] == 0]
+        if on_violation is not None:
+            for v in static:
+                on_violation(v)
+
+        if STATIC_CHECKS_ENABLED and STATIC_SKIP_LLM_ON_CLEAN and not static:
+            return "[]"
+
+        response = await _llm_review(code, filename, language, changed_lines, context_lines, on_violation)
+        return _merge_static(response, static)
+
+
+def _merge_static(response: str, static: list) -> str:
+    if not static:
+        return response
+    try:
+        violations = json.loads(response)
+    except json.JSONDecodeError:
+        return json.dumps(static)
+    if not isinstance(violations, list):
+        violations = []
+    return json.dumps(sorted(violations + static, key=lambda v: v.get("line", 0) if isinstance(v, dict) else 0))
+
+
+async def _llm_review(code: str, filename: str, language: str, changed_lines: list | None,
+                      context_lines: int, on_violation) -> str:
+    if changed_lines:
+        excerpt, line_map = build_excerpt(code, changed_lines, context_lines)
+        if len(line_map) < len(code.splitlines()):
+            scope_note = (
+                "Scope: this is an EXCERPT containing only the changed regions of the file plus context.\n"
+                "Report `line` as the 1-based line number within the excerpt below.\n"
+            )
+            with tracing.span("prompt"):
+                prompt = build_review_prompt(excerpt, filename, language, scope_note)
+            callback = _relined(on_violation, lambda line: map_line_to_head(line, line_map))
+            response = await _review_with_cache(excerpt, filename, language, "/diff", prompt, callback)
+            return map_violations_to_head(response, line_map)
+
+    if estimate_tokens(code) > CHUNK_TOKEN_BUDGET:
+        return await _review_in_chunks(code, filename, language, on_violation)
+
+    with tracing.span("prompt"):
+        prompt = build_review_prompt(code, filename, language)
+    return await _review_with_cache(code, filename, language, "", prompt, on_violation)
+
+
+async def _review_in_chunks(code: str, filename: str, language: str, on_violation=None) -> str:
+    chunks = split_into_chunks(code, language, CHUNK_TOKEN_BUDGET)
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    total = len(chunks)
+
+    async def review_chunk(index: int, start_line: int, text: str):
+        end_line = start_line + len(text.splitlines()) - 1
+        scope_note = (
+            f"Scope: this is chunk {index} of {total}, covering lines {start_line}-{end_line} of the file.\n"
+            "Report `line` as the 1-based line number within this chunk.\n"
+        )
+        with tracing.span("prompt", chunk=index):
+            prompt = build_review_prompt(text, filename, language, scope_note)
+        callback = _relined(on_violation, lambda line: rebase_line(line, start_line))
+        async with semaphore:
+            response = await _review_with_cache(text, filename, language, "/chunk", prompt, callback)
+        return start_line, response
+
+    results = await asyncio.gather(*(
+        review_chunk(i, start, text) for i, (start, text) in enumerate(chunks, start=1)
+    ))
+    return merge_chunk_results(results)
+
+
+async def get_violations_for_batch(files: list, on_violation=None) -> dict:
+    """
+    Reviews several small files with shared prompts. files is a list of
+    (filename, code) with unique filenames; returns {filename: raw JSON array}.
+    Cached files are answered locally, the rest go out in one prompt whose
+    reply is routed back by `filename`. A batch whose reply is unusable is
+    split in half and retried rather than re-sent whole.
+    """
+    results = {}
+    static = {}
+    pending = []
+    cache = get_review_cache()
+    signature = get_router().model_signature()
+
+    for filename, code in files:
+        language = detect_language(filename)
+        with tracing.span("static", file=filename, language=language, size=len(code)):
+            found = run_static_checks(code, filename, language) if STATIC_CHECKS_ENABLED else []
+        static[filename] = found
+        if on_violation is not None:
+            for v in found:
+                on_violation(v)
+        if STATIC_CHECKS_ENABLED and STATIC_SKIP_LLM_ON_CLEAN and not found:
+            results[filename] = "[]"
+            continue
+        cached = None
+        if cache is not None:
+            # A whole-file review answers a batched file too; batch answers are
+            # kept apart so they never pass for a whole-file review
+            cached = cache.get(make_cache_key(code, language, PROMPT_VERSION, signature))
+            if cached is None:
+                cached = cache.get(make_cache_key(code, language, f"{PROMPT_VERSION}/batch", signature))
+        if cached is not None:
+            results[filename] = _with_filename(cached, filename)
+            if on_violation is not None:
+                for v in json.loads(results[filename]):
+                    on_violation(v)
+        else:
+            pending.append((filename, language, code))
+
+    if pending:
+        results.update(await _review_batch(pending, on_violation))
+    return {name: _merge_static(results[name], static[name]) for name, _ in files}
+
+
+async def _review_batch(files: list, on_violation) -> dict:
+    if len(files) == 1:
+        filename, language, code = files[0]
+        with tracing.labels(file=filename, language=language, size=len(code)):
+            return {filename: await _llm_review(code, filename, language, None, DIFF_CONTEXT_LINES, on_violation)}
+
+    label = f"batch[{', '.join(name for name, _, _ in files)}]"
+    with tracing.labels(file=label, language="batch", size=sum(len(code) for _, _, code in files)):
+        with tracing.span("prompt"):
+            prompt = build_batch_prompt(files)
+        response = await get_llm_response_async(prompt, filename=label,
+                                                system=REVIEW_SYSTEM_PROMPT, max_attempts=BATCH_MAX_ATTEMPTS)
+    routed = None
+    if _is_cacheable(response):
+        routed = route_violations(json.loads(response), [name for name, _, _ in files])
+
+    if routed is None:
+        middle = len(files) // 2
+        logging.warning(f"{label} reply unusable, splitting into {middle} + {len(files) - middle} files")
+        halves = await asyncio.gather(_review_batch(files[:middle], on_violation),
+                                      _review_batch(files[middle:], on_violation))
+        return {**halves[0], **halves[1]}
+
+    cache = get_review_cache()
+    signature = get_router().model_signature()
+    results = {}
+    for filename, language, code in files:
+        raw = json.dumps(routed[filename])
+        if cache is not None:
+            cache.put(make_cache_key(code, language, f"{PROMPT_VERSION}/batch", signature), raw)
+        if on_violation is not None:
+            for v in routed[filename]:
+                on_violation(v)
+        results[filename] = raw
+    return results
 
 
 def format_review_report(raw_output: str) -> str:
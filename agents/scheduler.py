@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import itertools
+import logging
+from config.settings import load_env
+from agents import tracing
+
+load_env()
+
+# Upper/lower bound on concurrent reviews and the latency the backend should stay under
+REVIEW_WORKERS = int(os.getenv("REVIEW_WORKERS", 4))
+REVIEW_MIN_WORKERS = int(os.getenv("REVIEW_MIN_WORKERS", 1))
+REVIEW_TARGET_LATENCY = float(os.getenv("REVIEW_TARGET_LATENCY", 30))
+REVIEW_QUEUE_SIZE = int(os.getenv("REVIEW_QUEUE_SIZE", 256))
+REVIEW_DECREASE_COOLDOWN = float(os.getenv("REVIEW_DECREASE_COOLDOWN", 2))
+
+_active_schedulers = set()
+
+
+def report_backpressure(reason: str = "backend rejected request"):
+    """
+    Called by the LLM layer when the backend pushes back (429/503, refused
+    connection, timeout). Every running scheduler shrinks its window.
+    """
+    for scheduler in list(_active_schedulers):
+        scheduler.on_backpressure(reason)
+
+
+class ReviewScheduler:
+    """
+    Runs review jobs through a bounded priority queue with an adaptive
+    concurrency window (additive increase, multiplicative decrease).
+    Larger jobs are dequeued first so they do not end up as stragglers.
+    """
+
+    def __init__(self, handler, max_workers: int = REVIEW_WORKERS, min_workers: int = REVIEW_MIN_WORKERS,
+                 target_latency: float = REVIEW_TARGET_LATENCY, queue_size: int = REVIEW_QUEUE_SIZE):
+        self.handler = handler
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.target_latency = target_latency
+        self.limit = float(self.max_workers)
+        self.queue = asyncio.PriorityQueue(maxsize=queue_size)
+        self.in_flight = 0
+        self.completed = 0
+        self.failures = 0
+        self.backpressure_events = 0
+        self._cond = asyncio.Condition()
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._results = {}
+        self._enqueued = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "limit": int(self.limit),
+            "completed": self.completed,
+            "failures": self.failures,
+            "backpressure_events": self.backpressure_events,
+        }
+
+    def on_backpressure(self, reason: str):
+        self.backpressure_events += 1
+        self._decrease(reason)
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < REVIEW_DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        old = int(self.limit)
+        self.limit = max(float(self.min_workers), self.limit / 2)
+        if int(self.limit) != old:
+            logging.warning(f"Scheduler window {old} -> {int(self.limit)} ({reason})")
+
+    def _adjust(self, latency: float, ok: bool):
+        if not ok:
+            self._decrease("job failed")
+        elif latency > self.target_latency:
+            self._decrease(f"latency {latency:.1f}s over target {self.target_latency:.1f}s")
+        else:
+            self.limit = min(float(self.max_workers), self.limit + 1 / self.limit)
+
+    async def submit(self, item, size: int = 0):
+        """
+        Enqueues a job; blocks while the queue is full.
+        """
+        seq = next(self._seq)
+        self._enqueued[seq] = time.monotonic()
+        await self.queue.put((-size, seq, item))
+        return seq
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+                self.in_flight += 1
+            try:
+                size_key, seq, item = await self.queue.get()
+            except asyncio.CancelledError:
+                async with self._cond:
+                    self.in_flight -= 1
+                    self._cond.notify_all()
+                raise
+
+            start = time.monotonic()
+            tracing.record("queue_wait", start - self._enqueued.pop(seq, start), size=-size_key)
+            ok = True
+            try:
+                self._results[seq] = await self.handler(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ok = False
+                self.failures += 1
+                self._results[seq] = None
+                logging.error(f"Review job {item} failed: {e}")
+            finally:
+                latency = time.monotonic() - start
+                self.completed += 1
+                async with self._cond:
+                    self.in_flight -= 1
+                    self._adjust(latency, ok)
+                    self._cond.notify_all()
+                self.queue.task_done()
+                logging.info(f"Scheduler progress: {self.stats()}")
+
+    async def run(self, items: list) -> list:
+        """
+        Reviews every (item, size) pair and returns results ordered largest first.
+        """
+        _active_schedulers.add(self)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+        try:
+            for item, size in sorted(items, key=lambda pair: -pair[1]):
+                await self.submit(item, size)
+            await self.queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            _active_schedulers.discard(self)
+        return [self._results.get(seq) for seq in sorted(self._results)]
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import heapq
+import hashlib
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import load_env
+from agents.discovery import FileDiscovery
+
+load_env()
+
+# hash: a file stays in the same shard as the tree changes;
+# size: greedy largest-first bin packing, for evenly sized shards
+SHARD_STRATEGY = os.getenv("SHARD_STRATEGY", "size")
+SHARD_OUTPUT_DIR = os.getenv("SHARD_OUTPUT_DIR", ".reviewbot/shards")
+
+# Same exit codes as agents.gate
+EXIT_PASS = 0
+EXIT_BLOCKED = 1
+EXIT_INCOMPLETE = 2
+
+
+def parse_shard(spec: str) -> tuple:
+    """
+    "i/N" (1-based, as CI matrices number jobs) -> (i, N).
+    """
+    index, _, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {spec!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def _relative(path: str, root: str) -> str:
+    # Shard assignment keys on the path below root, so every machine agrees
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def assign_shards(files: list, count: int, strategy: str = SHARD_STRATEGY, root: str = ".") -> list:
+    """
+    Splits [(path, size)] into count lists. Both strategies depend only on
+    the file set, so independent jobs compute the same split.
+    """
+    shards = [[] for _ in range(count)]
+    if strategy == "hash":
+        for path, size in files:
+            digest = hashlib.sha256(_relative(path, root).encode("utf-8", "surrogateescape")).digest()
+            shards[int.from_bytes(digest[:8], "big") % count].append((path, size))
+    elif strategy == "size":
+        # Longest-processing-time first: each file goes to the lightest shard
+        loads = [(0, i) for i in range(count)]
+        for path, size in sorted(files, key=lambda item: (-item[1], _relative(item[0], root))):
+            load, i = heapq.heappop(loads)
+            shards[i].append((path, size))
+            heapq.heappush(loads, (load + size, i))
+    else:
+        raise ValueError(f"Unknown shard strategy {strategy!r} (expected hash or size)")
+    return shards
+
+
+def shard_output_path(index: int, count: int, output_dir: str = SHARD_OUTPUT_DIR) -> str:
+    return os.path.join(output_dir, f"shard-{index}-of-{count}.json")
+
+
+def write_json(path: str, data: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def run_shard(root: str, index: int, count: int, strategy: str = SHARD_STRATEGY) -> dict:
+    """
+    Reviews shard index of count and returns its mergeable result.
+    """
+    import test_inline_engine as engine
+
+    files = assign_shards(FileDiscovery(root).scan(), count, strategy, root)[index - 1]
+    print(f"Shard {index}/{count} ({strategy}): {len(files)} file(s), {sum(size for _, size in files)} bytes")
+    result = await engine.run_inline_review_on_tests(files=files)
+    violations = result["violations"]
+    return {
+        "shard": index,
+        "count": count,
+        "strategy": strategy,
+        "files": [path for path, _ in files],
+        # Files actually queued: fewer than files in diff-only mode
+        "queued": result["files"],
+        "reviewed": result["reviewed"],
+        "failed": result["failed"],
+        "seconds": result["seconds"],
+        "violations": violations,
+    }
+
+
+def run_local(root: str, count: int, strategy: str = SHARD_STRATEGY, jobs: int | None = None,
+              output_dir: str = SHARD_OUTPUT_DIR) -> list:
+    """
+    Runs every shard as its own `reviewbot.py review --shard i/N` process, at
+    most jobs at a time, exactly as independent CI jobs would. Returns the
+    shard output paths; each shard's console output goes to a .log beside it.
+    """
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reviewbot.py")
+    metrics_base, metrics_ext = os.path.splitext(os.getenv("METRICS_PATH") or os.path.join(
+        os.getenv("LOG_FOLDER", "logs"), "metrics.prom"))
+    os.makedirs(output_dir, exist_ok=True)
+
+    def launch(index: int) -> str:
+        output = shard_output_path(index, count, output_dir)
+        if os.path.exists(output):
+            os.remove(output)
+        # Each shard writes its own metrics rather than overwriting one file
+        env = dict(os.environ, METRICS_PATH=f"{metrics_base}.shard-{index}{metrics_ext}")
+        with open(output[:-len(".json")] + ".log", "w") as log:
+            code = subprocess.run(
+                [sys.executable, script, "review", root, "--shard", f"{index}/{count}",
+                 "--shard-by", strategy, "--output", output],
+                stdout=log, stderr=subprocess.STDOUT, env=env,
+            ).returncode
+        logging.info(f"Shard {index}/{count} exited with {code}")
+        print(f"Shard {index}/{count} finished (exit {code})")
+        return output
+
+    with ThreadPoolExecutor(max_workers=jobs or count) as pool:
+        return list(pool.map(launch, range(1, count + 1)))
+
+
+def merge(paths: list, fail_severity: int | None = None) -> dict:
+    """
+    Combines shard outputs into one report. Missing or inconsistent shards,
+    files claimed by two shards and files whose review failed make the
+    verdict "incomplete"; otherwise any finding at or above fail_severity
+    makes it "blocked".
+    """
+    shards = []
+    unreadable = []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                shards.append(json.load(f))
+        except (OSError, ValueError):
+            unreadable.append(path)
+
+    counts = {shard["count"] for shard in shards}
+    strategies = {shard["strategy"] for shard in shards}
+    count = max(counts, default=0)
+    seen = {shard["shard"] for shard in shards}
+    owners = {}
+    violations = {}
+    failed = []
+    for shard in sorted(shards, key=lambda s: s["shard"]):
+        for path in shard["files"]:
+            owners.setdefault(path, []).append(shard["shard"])
+        violations.update(shard["violations"])
+        failed.extend(shard["failed"])
+
+    by_severity = {}
+    for found in violations.values():
+        for v in found:
+            if isinstance(v, dict):
+                severity = v.get("severity", 0)
+                by_severity[severity] = by_severity.get(severity, 0) + 1
+    blocking = sum(n for severity, n in by_severity.items()
+                   if fail_severity is not None and isinstance(severity, int) and severity >= fail_severity)
+
+    report = {
+        "shards": count,
+        "strategy": strategies.pop() if len(strategies) == 1 else sorted(strategies),
+        "missing_shards": sorted(set(range(1, count + 1)) - seen),
+        "unreadable": unreadable,
+        "inconsistent": len(counts) > 1,
+        "duplicates": sorted(path for path, owner in owners.items() if len(owner) > 1),
+        "files": len(owners),
+        "queued": sum(shard["queued"] for shard in shards),
+        "reviewed": sum(shard["reviewed"] for shard in shards),
+        "failed": sorted(failed),
+        "by_severity": {str(k): by_severity[k] for k in sorted(
+            by_severity, key=lambda k: (not isinstance(k, int), k if isinstance(k, int) else str(k)))},
+        "blocking": blocking,
+        "fail_severity": fail_severity,
+        "shard_seconds": {str(shard["shard"]): round(shard["seconds"], 3) for shard in shards},
+        "violations": dict(sorted(violations.items())),
+    }
+    if report["missing_shards"] or unreadable or report["inconsistent"] or report["duplicates"] or failed:
+        report["verdict"] = "incomplete"
+    elif blocking:
+        report["verdict"] = "blocked"
+    else:
+        report["verdict"] = "pass"
+    return report
+
+
+def exit_code(report: dict) -> int:
+    return {"pass": EXIT_PASS, "blocked": EXIT_BLOCKED}.get(report["verdict"], EXIT_INCOMPLETE)
+
+
+def print_summary(report: dict):
+    total = sum(report["by_severity"].values())
+    seconds = report["shard_seconds"]
+    print(f"Merged {len(seconds)}/{report['shards']} shard(s): {report['files']} file(s), "
+          f"{total} finding(s), verdict {report['verdict'].upper()}")
+    if seconds:
+        print(f"Shard time: max {max(seconds.values()):.2f}s, min {min(seconds.values()):.2f}s")
+    for key in ("missing_shards", "unreadable", "duplicates", "failed"):
+        if report[key]:
+            print(f"  {key.replace('_', ' ')}: {', '.join(map(str, report[key]))}")
@@ -0,0 +1,296 @@
+import re
+import ast
+
+# Rules from SYSTEM_PROMPT section A (by language and number) that these checks
+# enforce completely, so they can be dropped from the LLM prompt. Rules the
+# checks only partly cover (PEP8, Java naming, broad excepts "without
+# justification") stay in the prompt; the static findings are still merged.
+COVERED_RULES = {
+    "python": {2, 3, 9, 10},
+    "java": {9},
+}
+
+MAX_LINE_LENGTH = 79
+
+SNAKE_CASE = re.compile(r"^_{0,2}[a-z][a-z0-9_]*_{0,2}$")
+PASCAL_CASE = re.compile(r"^_?[A-Z][a-zA-Z0-9]*$")
+ALL_CAPS = re.compile(r"^_?[A-Z][A-Z0-9_]*$")
+CAMEL_CASE = re.compile(r"^[a-z][a-zA-Z0-9]*$")
+
+# Method names fixed by a base class (ast.NodeVisitor, unittest.TestCase)
+OVERRIDE_NAME = re.compile(r"^(?:visit_\w+|setUp|tearDown|setUpClass|tearDownClass|asyncSetUp|asyncTearDown)$")
+BUILTIN_TYPES = {"int", "float", "complex", "str", "bytes", "bool", "object", "dict", "list", "set", "tuple",
+                 "frozenset", "type"}
+TYPE_FACTORIES = {"TypeVar", "NewType", "ParamSpec", "TypeVarTuple", "NamedTuple", "namedtuple", "TypedDict"}
+
+
+def _violation(filename: str, line: int, issue: str, recommendation: str, severity: int) -> dict:
+    return {
+        "filename": filename,
+        "line": line,
+        "issue": issue,
+        "recommendation": recommendation,
+        "severity": severity,
+    }
+
+
+def _is_type_alias(value) -> bool:
+    """
+    True for the right-hand side of `Alias = ...` when it names a type:
+    `dict[str, int]`, `Foo | None`, `pathlib.Path`, `TypeVar("T")`.
+    """
+    if isinstance(value, ast.Name):
+        return value.id[:1].isupper() or value.id in BUILTIN_TYPES
+    if isinstance(value, ast.Attribute):
+        return value.attr[:1].isupper()
+    if isinstance(value, ast.Subscript):
+        return _is_type_alias(value.value)
+    if isinstance(value, ast.BinOp) and isinstance(value.op, ast.BitOr):
+        return all(_is_type_alias(side) or (isinstance(side, ast.Constant) and side.value is None)
+                   for side in (value.left, value.right))
+    if isinstance(value, ast.Call):
+        func = value.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else ""
+        return name in TYPE_FACTORIES
+    return False
+
+
+class _PythonChecker(ast.NodeVisitor):
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.violations = []
+        self._function_depth = 0
+        self._in_class = False
+
+    def add(self, node, issue: str, recommendation: str, severity: int):
+        self.violations.append(_violation(self.filename, node.lineno, issue, recommendation, severity))
+
+    def visit_ImportFrom(self, node):
+        if any(alias.name == "*" for alias in node.names):
+            self.add(node, f"Wildcard import from '{node.module}'.",
+                     "Import the needed names explicitly.", 6)
+        self.generic_visit(node)
+
+    def visit_Compare(self, node):
+        lefts = [node.left] + node.comparators[:-1]
+        for left, op, right in zip(lefts, node.ops, node.comparators):
+            is_none = any(isinstance(side, ast.Constant) and side.value is None for side in (left, right))
+            if isinstance(op, (ast.Eq, ast.NotEq)) and is_none:
+                wanted = "is None" if isinstance(op, ast.Eq) else "is not None"
+                self.add(node, "Comparison to None with an equality operator.", f"Use `{wanted}`.", 4)
+        self.generic_visit(node)
+
+    def _check_function(self, node):
+        dunder = node.name.startswith("__") and node.name.endswith("__")
+        override = self._in_class and OVERRIDE_NAME.match(node.name)
+        if not SNAKE_CASE.match(node.name) and not dunder and not override:
+            self.add(node, f"Function name '{node.name}' is not snake_case.",
+                     "Rename the function using snake_case.", 4)
+        # Nested helpers are not public API; only module-level functions and methods need a docstring
+        if self._function_depth == 0 and not node.name.startswith("_") and ast.get_docstring(node) is None:
+            self.add(node, f"Public function '{node.name}' has no docstring.",
+                     "Add a docstring describing purpose, arguments and return value.", 3)
+        defaults = node.args.defaults + [d for d in node.args.kw_defaults if d is not None]
+        for default in defaults:
+            mutable = isinstance(default, (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp))
+            if isinstance(default, ast.Call) and isinstance(default.func, ast.Name):
+                mutable = mutable or default.func.id in ("list", "dict", "set")
+            if mutable:
+                self.add(default, f"Mutable default argument in '{node.name}'.",
+                         "Default to None and create the container inside the function.", 7)
+        self._function_depth += 1
+        in_class, self._in_class = self._in_class, False
+        self.generic_visit(node)
+        self._in_class = in_class
+        self._function_depth -= 1
+
+    visit_FunctionDef = _check_function
+    visit_AsyncFunctionDef = _check_function
+
+    def visit_ClassDef(self, node):
+        if not PASCAL_CASE.match(node.name):
+            self.add(node, f"Class name '{node.name}' is not PascalCase.", "Rename the class using PascalCase.", 4)
+        if not node.name.startswith("_") and ast.get_docstring(node) is None:
+            self.add(node, f"Public class '{node.name}' has no docstring.", "Add a class docstring.", 3)
+        in_class, self._in_class = self._in_class, True
+        self.generic_visit(node)
+        self._in_class = in_class
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                name = target.id
+                # Module-level ALL_CAPS names are constants; PascalCase names bound to a type are aliases
+                allowed = SNAKE_CASE.match(name) or (self._function_depth == 0 and ALL_CAPS.match(name)) or (
+                    PASCAL_CASE.match(name) and _is_type_alias(node.value))
+                if not allowed:
+                    self.add(node, f"Variable name '{name}' is not snake_case.",
+                             "Rename the variable using snake_case.", 3)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        broad = node.type is None or (isinstance(node.type, ast.Name) and node.type.id in ("Exception", "BaseException"))
+        reraises = any(isinstance(child, ast.Raise) for child in ast.walk(node))
+        if broad and not reraises:
+            caught = "everything" if node.type is None else node.type.id
+            self.add(node, f"Broad exception handler catches {caught} and swallows it.",
+                     "Catch specific exceptions or re-raise after handling.", 6)
+        self.generic_visit(node)
+
+
+def check_python(code: str, filename: str) -> list:
+    violations = []
+    for n, line in enumerate(code.splitlines(), start=1):
+        if len(line) > MAX_LINE_LENGTH:
+            violations.append(_violation(filename, n, f"Line is {len(line)} characters long (PEP8 limit is 79).",
+                                         "Wrap or refactor the line to at most 79 characters.", 2))
+        indent = line[:len(line) - len(line.lstrip())]
+        if "\t" in indent:
+            violations.append(_violation(filename, n, "Tab used for indentation.",
+                                         "Indent with four spaces.", 3))
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        violations.append(_violation(filename, e.lineno or 0, f"Syntax error: {e.msg}.",
+                                     "Fix the syntax error.", 10))
+        return violations
+    checker = _PythonChecker(filename)
+    checker.visit(tree)
+    return violations + checker.violations
+
+
+JAVA_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;")
+JAVA_TYPE = re.compile(r"\b(?:class|interface|enum|record)\s+([A-Za-z_]\w*)")
+JAVA_CONSTANT = re.compile(r"\bstatic\s+final\s+[\w<>\[\], ?]+?\s+([A-Za-z_]\w*)\s*[=;]")
+JAVA_VARIABLE = re.compile(
+    r"^\s*(?:(?:private|protected|public|final|volatile|transient)\s+)*"
+    r"(?:int|long|short|byte|char|float|double|boolean|String|var|[A-Z]\w*(?:<[^;=()]*>)?)(?:\[\])*"
+    r"\s+([A-Za-z_]\w*)\s*(?:=|;)"
+)
+JAVA_EQUALS = re.compile(r"\bboolean\s+equals\s*\(\s*(?:final\s+)?Object\b")
+JAVA_HASHCODE = re.compile(r"\bint\s+hashCode\s*\(\s*\)")
+
+
+def _strip_java_comments_and_strings(code: str) -> str:
+    # Blank out comments and literals but keep line structure for line numbers
+    def blank(match):
+        return re.sub(r"[^\n]", " ", match.group(0))
+    pattern = r'/\*.*?\*/|//[^\n]*|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+    return re.sub(pattern, blank, code, flags=re.S)
+
+
+def _java_type_bodies(stripped: str) -> list:
+    """
+    (start, end) offsets of the braces of every type declaration's body,
+    nested types included.
+    """
+    bodies = []
+    for match in JAVA_TYPE.finditer(stripped):
+        start = stripped.find("{", match.end())
+        if start == -1:
+            continue
+        depth = 0
+        for i in range(start, len(stripped)):
+            if stripped[i] == "{":
+                depth += 1
+            elif stripped[i] == "}":
+                depth -= 1
+                if depth == 0:
+                    bodies.append((start, i))
+                    break
+    return bodies
+
+
+def _equals_without_hashcode(stripped: str) -> list:
+    """
+    Offsets of equals(Object) overrides in type bodies that do not also
+    override hashCode(). Each body is checked without its nested types.
+    """
+    bodies = _java_type_bodies(stripped) or [(0, len(stripped))]
+    found = []
+    for start, end in bodies:
+        own = list(stripped[start:end])
+        for inner_start, inner_end in bodies:
+            if start < inner_start and inner_end < end:
+                own[inner_start - start:inner_end - start] = " " * (inner_end - inner_start)
+        own = "".join(own)
+        equals = JAVA_EQUALS.search(own)
+        if equals and not JAVA_HASHCODE.search(own):
+            found.append(start + equals.start())
+    return found
+
+
+def check_java(code: str, filename: str) -> list:
+    violations = []
+    stripped = _strip_java_comments_and_strings(code)
+    lines = stripped.splitlines()
+
+    for n, line in enumerate(lines, start=1):
+        package = JAVA_PACKAGE.match(line)
+        if package and package.group(1) != package.group(1).lower():
+            violations.append(_violation(filename, n, f"Package name '{package.group(1)}' is not lowercase.",
+                                         "Use an all-lowercase package name.", 3))
+        for name in JAVA_TYPE.findall(line):
+            if not PASCAL_CASE.match(name):
+                violations.append(_violation(filename, n, f"Type name '{name}' is not PascalCase.",
+                                             "Rename the type using PascalCase.", 4))
+        constant = JAVA_CONSTANT.search(line)
+        if constant:
+            if not ALL_CAPS.match(constant.group(1)):
+                violations.append(_violation(filename, n, f"Constant '{constant.group(1)}' is not ALL_CAPS.",
+                                             "Rename the constant using ALL_CAPS with underscores.", 3))
+            continue
+        variable = JAVA_VARIABLE.match(line)
+        if variable and not line.lstrip().startswith(("return", "package", "import")):
+            if not CAMEL_CASE.match(variable.group(1)):
+                violations.append(_violation(filename, n, f"Variable '{variable.group(1)}' is not camelCase.",
+                                             "Rename the variable using camelCase.", 3))
+
+    for offset in _equals_without_hashcode(stripped):
+        line = stripped.count("\n", 0, offset) + 1
+        violations.append(_violation(filename, line, "equals() is overridden without hashCode().",
+                                     "Override hashCode() consistently with equals().", 8))
+    return violations
+
+
+def run_static_checks(code: str, filename: str, language: str) -> list:
+    """
+    Deterministic checks for the mechanical rules in COVERED_RULES. Returns
+    violations in the same schema as the LLM output, sorted by line.
+    """
+    if language == "python":
+        violations = check_python(code, filename)
+    elif language == "java":
+        violations = check_java(code, filename)
+    else:
+        violations = []
+    return sorted(violations, key=lambda v: v["line"])
+
+
+def strip_covered_rules(prompt: str, covered: dict | None = None) -> str:
+    """
+    Removes the numbered rules in covered (COVERED_RULES by default) from the
+    language sections of the system prompt and tells the model they are
+    handled elsewhere.
+    """
+    if covered is None:
+        covered = COVERED_RULES
+    sections = {"Java Guidelines": "java", "Python Guidelines": "python"}
+    language = None
+    kept = []
+    for line in prompt.splitlines():
+        header = next((lang for title, lang in sections.items() if line.startswith(title)), None)
+        if header:
+            language = header
+        elif not line.strip() or line.startswith("━"):
+            language = None
+        rule = re.match(r"^(\d+)\.\s", line)
+        if language and rule and int(rule.group(1)) in covered.get(language, set()):
+            continue
+        kept.append(line)
+    note = (
+        "\nRules missing from the numbered lists above are enforced by a separate static checker. "
+        "Do NOT report violations of them."
+    )
+    return "\n".join(kept) + note + "\n"
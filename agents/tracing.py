@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import heapq
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from config.settings import load_env
+
+load_env()
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+# OpenMetrics text file written at the end of a run; empty disables it
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(os.getenv("LOG_FOLDER", "logs"), "metrics.prom"))
+# Chrome trace (chrome://tracing, Perfetto) written when set
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", 200_000))
+
+# Labels that become metric dimensions; the rest (file, size, attempt) only go to the trace
+METRIC_LABELS = ("language", "backend", "status")
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_labels = contextvars.ContextVar("trace_labels", default={})
+
+
+class Histogram:
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> list:
+        total, out = 0, []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Tracer:
+    """
+    Collects stage durations as histograms keyed by stage and the low
+    cardinality METRIC_LABELS, plus (when trace_path is set) complete events
+    for a Chrome trace.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, trace_path: str = TRACE_PATH,
+                 max_events: int = TRACE_MAX_EVENTS):
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.max_events = max_events
+        self.histograms = {}
+        self.events = []
+        self.dropped_events = 0
+        self._lanes = {}
+        self._free_lanes = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def _lane(self) -> int:
+        # One trace row per asyncio task (or thread outside a loop). A finished
+        # task's row is reused, so rows are bounded by peak concurrency.
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        owner = id(task) if task is not None else threading.get_ident()
+        lane = self._lanes.get(owner)
+        if lane is None:
+            lane = heapq.heappop(self._free_lanes) if self._free_lanes else len(self._lanes) + 1
+            self._lanes[owner] = lane
+            if task is not None:
+                task.add_done_callback(lambda _: self._release_lane(owner))
+        return lane
+
+    def _release_lane(self, owner: int):
+        with self._lock:
+            heapq.heappush(self._free_lanes, self._lanes.pop(owner))
+
+    def record(self, stage: str, seconds: float, labels: dict, start: float | None = None):
+        if not self.enabled:
+            return
+        key = (stage,) + tuple(str(labels.get(name, "")) for name in METRIC_LABELS)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+            if not self.trace_path:
+                return
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            begin = start if start is not None else time.perf_counter() - seconds
+            self.events.append({
+                "name": stage,
+                "cat": "review",
+                "ph": "X",
+                "ts": round((begin - self._origin) * 1e6),
+                "dur": round(seconds * 1e6),
+                "pid": os.getpid(),
+                "tid": self._lane(),
+                "args": {k: v for k, v in labels.items() if v is not None},
+            })
+
+    def summary(self) -> dict:
+        """
+        Per-stage totals across all label combinations.
+        """
+        stages = {}
+        with self._lock:
+            for (stage, *_), histogram in self.histograms.items():
+                entry = stages.setdefault(stage, {"count": 0, "seconds": 0.0})
+                entry["count"] += histogram.count
+                entry["seconds"] += histogram.sum
+        return {stage: dict(v, mean=v["seconds"] / v["count"] if v["count"] else 0.0)
+                for stage, v in sorted(stages.items())}
+
+    def openmetrics(self) -> str:
+        name = "reviewbot_stage_seconds"
+        lines = [
+            f"# TYPE {name} histogram",
+            f"# UNIT {name} seconds",
+            f"# HELP {name} Time spent in each review pipeline stage.",
+        ]
+        with self._lock:
+            for key in sorted(self.histograms):
+                histogram = self.histograms[key]
+                labels = ",".join(f'{label}="{_escape(value)}"'
+                                  for label, value in zip(("stage",) + METRIC_LABELS, key) if value)
+                sep = "," if labels else ""
+                for bound, total in zip(histogram.buckets, histogram.cumulative()):
+                    lines.append(f'{name}_bucket{{{labels}{sep}le="{float(bound)!r}"}} {total}')
+                lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self) -> dict:
+        with self._lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                    "otherData": {"dropped_events": self.dropped_events}}
+
+    def write(self, metrics_path: str = METRICS_PATH) -> list:
+        """
+        Writes the OpenMetrics file and, if configured, the Chrome trace.
+        Returns the paths written.
+        """
+        written = []
+        if not self.enabled:
+            return written
+        if metrics_path:
+            os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+            with open(metrics_path, "w") as f:
+                f.write(self.openmetrics())
+            written.append(metrics_path)
+        if self.trace_path:
+            os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+            with open(self.trace_path, "w") as f:
+                json.dump(self.chrome_trace(), f)
+            written.append(self.trace_path)
+        return written
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def current_labels() -> dict:
+    return _labels.get()
+
+
+@contextmanager
+def labels(**values):
+    """
+    Attaches labels to every span opened inside the block (including in
+    tasks created there) without recording a span itself.
+    """
+    token = _labels.set({**_labels.get(), **values})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+@contextmanager
+def span(stage: str, **values):
+    """
+    Times the block as one stage. Labels are inherited from enclosing spans;
+    the yielded dict can be updated inside the block (e.g. status). An
+    exception escaping the block sets status="error" unless one was set.
+    """
+    merged = {**{k: v for k, v in _labels.get().items() if k != "status"}, **values}
+    token = _labels.set(merged)
+    start = time.perf_counter()
+    try:
+        yield merged
+    except BaseException as e:
+        merged.setdefault("status", "cancelled" if isinstance(e, asyncio.CancelledError) else "error")
+        raise
+    finally:
+        _labels.reset(token)
+        _tracer.record(stage, time.perf_counter() - start, merged, start)
+
+
+def record(stage: str, seconds: float, **values):
+    """
+    Records a duration measured elsewhere (e.g. time spent queued).
+    """
+    _tracer.record(stage, seconds, {**_labels.get(), **values})
+
+
+def write_telemetry() -> list:
+    return _tracer.write()
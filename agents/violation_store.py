@@ -0,0 +1,404 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from config.settings import load_env
+
+load_env()
+
+VIOLATION_STORE_ENABLED = os.getenv("VIOLATION_STORE_ENABLED", "1") == "1"
+VIOLATION_STORE_PATH = os.getenv("VIOLATION_STORE_PATH", ".reviewbot/violations.sqlite")
+# Findings at or above this severity are counted as blocking in summaries and map to SARIF "error"
+BLOCKING_SEVERITY = int(os.getenv("GATE_SEVERITY", 8))
+# Rows fetched per round trip when streaming exports
+FETCH_ROWS = 2000
+
+DAY = 86400
+
+# violations holds only integers; paths, issues and fixes are interned in strings.
+# Every row carries its run's timestamp so time-window queries are index-only
+# range scans over idx_violations_ts.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
+    label TEXT,
+    files INTEGER,
+    reviewed INTEGER,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    run_id INTEGER NOT NULL,
+    path_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    violations INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    PRIMARY KEY (run_id, path_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS violations (
+    run_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    path_id INTEGER NOT NULL,
+    issue_id INTEGER NOT NULL,
+    fix_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    severity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_violations_ts ON violations(ts, severity, issue_id, path_id);
+CREATE INDEX IF NOT EXISTS idx_violations_run ON violations(run_id, path_id, line);
+CREATE INDEX IF NOT EXISTS idx_violations_path ON violations(path_id, ts);
+CREATE INDEX IF NOT EXISTS idx_reviews_ts ON reviews(ts);
+"""
+
+
+def _int(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def normalize_issue(issue) -> str:
+    # Collapse whitespace so the same rule worded with different spacing groups together
+    return " ".join(str(issue or "").split())
+
+
+def rule_id(issue: str) -> str:
+    """
+    Stable SARIF rule id for a normalized issue text.
+    """
+    return "RB" + hashlib.sha256(issue.lower().encode("utf-8", "surrogateescape")).hexdigest()[:10]
+
+
+class ViolationStore:
+    """
+    Review findings across runs as typed integer rows with interned strings,
+    so aggregate reports (top rules, trends, most-violated files) are SQL
+    over indexes and exports stream rows instead of loading them.
+    """
+
+    def __init__(self, path: str = VIOLATION_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Review shards may write to the same store concurrently
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._ids = {}
+
+    def _intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO strings (value) VALUES (?)", (value,))
+            string_id = self._conn.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()[0]
+            self._ids[value] = string_id
+        return string_id
+
+    def start_run(self, label: str | None = None, ts: float | None = None) -> int:
+        with self._conn:
+            cursor = self._conn.execute("INSERT INTO runs (ts, label) VALUES (?, ?)",
+                                        (int(ts if ts is not None else time.time()), label))
+        return cursor.lastrowid
+
+    def finish_run(self, run_id: int, files: int, reviewed: int, seconds: float):
+        with self._conn:
+            self._conn.execute("UPDATE runs SET files = ?, reviewed = ?, seconds = ? WHERE id = ?",
+                               (files, reviewed, seconds, run_id))
+
+    def add(self, run_id: int, path: str, violations: list, failed: bool = False):
+        """
+        Records one file's review in run_id. Re-adding a file replaces its rows.
+        """
+        with self._conn:
+            ts = self._conn.execute("SELECT ts FROM runs WHERE id = ?", (run_id,)).fetchone()[0]
+            path_id = self._intern(path)
+            rows = [
+                (run_id, ts, path_id, self._intern(normalize_issue(v.get("issue"))),
+                 self._intern(str(v.get("recommendation") or "").strip()),
+                 _int(v.get("line")), _int(v.get("severity")))
+                for v in violations if isinstance(v, dict)
+            ]
+            self._conn.execute("DELETE FROM violations WHERE run_id = ? AND path_id = ?", (run_id, path_id))
+            self._conn.executemany(
+                "INSERT INTO violations (run_id, ts, path_id, issue_id, fix_id, line, severity)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reviews (run_id, path_id, ts, violations, failed) VALUES (?, ?, ?, ?, ?)",
+                (run_id, path_id, ts, len(rows), int(failed)))
+
+    def last_run(self) -> int | None:
+        row = self._conn.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def _where(self, run_id: int | None, since: float | None, until: float | None, prefix: str = "") -> tuple:
+        clauses, params = [], []
+        if run_id is not None:
+            clauses.append(f"{prefix}run_id = ?")
+            params.append(run_id)
+        if since is not None:
+            clauses.append(f"{prefix}ts >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append(f"{prefix}ts < ?")
+            params.append(int(until))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _strings(self, ids) -> dict:
+        ids = list(set(ids))
+        values = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            values.update(self._conn.execute(
+                f"SELECT id, value FROM strings WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        return values
+
+    def totals(self, run_id: int | None = None, since: float | None = None, until: float | None = None) -> dict:
+        where, params = self._where(run_id, since, until)
+        violations, files = self._conn.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT path_id) FROM violations{where}", params).fetchone()
+        runs, reviewed, failed = self._conn.execute(
+            f"SELECT COUNT(DISTINCT run_id), COUNT(*), COALESCE(SUM(failed), 0) FROM reviews{where}",
+            params).fetchone()
+        by_severity = dict(self._conn.execute(
+            f"SELECT severity, COUNT(*) FROM violations{where} GROUP BY severity ORDER BY severity", params))
+        return {"runs": runs, "reviews": reviewed, "failed_reviews": failed, "violations": violations,
+                "files_with_violations": files, "by_severity": by_severity}
+
+    def top_rules(self, limit: int = 10, run_id: int | None = None, since: float | None = None,
+                  until: float | None = None) -> list:
+        """
+        [{"rule", "issue", "count", "files", "max_severity"}], most frequent first.
+        """
+        where, params = self._where(run_id, since, until)
+        rows = self._conn.execute(
+            f"SELECT issue_id, COUNT(*) AS n, COUNT(DISTINCT path_id), MAX(severity) FROM violations{where}"
+            " GROUP BY issue_id ORDER BY n DESC, issue_id LIMIT ?", params + [limit]).fetchall()
+        names = self._strings(row[0] for row in rows)
+        return [{"rule": rule_id(names[issue_id]), "issue": names[issue_id], "count": count, "files": files,
+                 "max_severity": max_severity} for issue_id, count, files, max_severity in rows]
+
+    def top_files(self, limit: int = 10, run_id: int | None = None, since: float | None = None,
+                  until: float | None = None) -> list:
+        """
+        [{"path", "count", "blocking", "max_severity"}], most violations first.
+        """
+        where, params = self._where(run_id, since, until)
+        rows = self._conn.execute(
+            f"SELECT path_id, COUNT(*) AS n, SUM(severity >= ?), MAX(severity) FROM violations{where}"
+            " GROUP BY path_id ORDER BY n DESC, path_id LIMIT ?", [BLOCKING_SEVERITY] + params + [limit]).fetchall()
+        names = self._strings(row[0] for row in rows)
+        return [{"path": names[path_id], "count": count, "blocking": blocking, "max_severity": max_severity}
+                for path_id, count, blocking, max_severity in rows]
+
+    def trend(self, bucket_seconds: int = DAY, since: float | None = None, until: float | None = None) -> list:
+        """
+        Violations per time bucket: [{"start", "count", "blocking", "mean_severity", "reviews"}].
+        """
+        where, params = self._where(None, since, until)
+        reviews = dict(self._conn.execute(
+            f"SELECT ts / ? AS bucket, COUNT(*) FROM reviews{where} GROUP BY bucket", [bucket_seconds] + params))
+        rows = self._conn.execute(
+            f"SELECT ts / ? AS bucket, COUNT(*), SUM(severity >= ?), AVG(severity) FROM violations{where}"
+            " GROUP BY bucket", [bucket_seconds, BLOCKING_SEVERITY] + params).fetchall()
+        counts = {bucket: (count, blocking, mean) for bucket, count, blocking, mean in rows}
+        return [
+            {"start": bucket * bucket_seconds, "count": counts.get(bucket, (0,))[0],
+             "blocking": counts.get(bucket, (0, 0))[1],
+             "mean_severity": round(counts[bucket][2], 2) if bucket in counts else None,
+             "reviews": reviews.get(bucket, 0)}
+            for bucket in sorted(set(reviews) | set(counts))
+        ]
+
+    def iter_rules(self, run_id: int | None = None, since: float | None = None, until: float | None = None):
+        """
+        Yields each distinct issue text among the matching violations,
+        FETCH_ROWS at a time.
+        """
+        where, params = self._where(run_id, since, until)
+        cursor = self._conn.execute(
+            f"SELECT value FROM strings WHERE id IN (SELECT DISTINCT issue_id FROM violations{where}) ORDER BY id",
+            params)
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                return
+            for (issue,) in rows:
+                yield issue
+
+    def iter_violations(self, run_id: int | None = None, since: float | None = None, until: float | None = None):
+        """
+        Yields (path, line, severity, issue, recommendation, ts) ordered by
+        path text, then line, then time (so each path appears once across
+        runs), FETCH_ROWS at a time.
+        """
+        where, params = self._where(run_id, since, until, prefix="v.")
+        cursor = self._conn.execute(
+            "SELECT p.value, v.line, v.severity, i.value, f.value, v.ts FROM violations v"
+            " JOIN strings p ON p.id = v.path_id JOIN strings i ON i.id = v.issue_id"
+            f" JOIN strings f ON f.id = v.fix_id{where}"
+            " ORDER BY p.value, v.line, v.ts", params)
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                return
+            yield from rows
+
+    def summary(self, run_id: int | None = None, since: float | None = None, until: float | None = None,
+                top: int = 10) -> dict:
+        return {
+            "run": run_id,
+            "since": since,
+            "until": until,
+            "totals": self.totals(run_id, since, until),
+            "top_rules": self.top_rules(top, run_id, since, until),
+            "top_files": self.top_files(top, run_id, since, until),
+            "trend": self.trend(since=since, until=until) if run_id is None else [],
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def _level(severity: int) -> str:
+    if severity >= BLOCKING_SEVERITY:
+        return "error"
+    return "warning" if severity >= 5 else "note"
+
+
+def write_sarif(store: ViolationStore, out, run_id: int | None = None, since: float | None = None,
+                until: float | None = None, root: str = "."):
+    """
+    Writes a SARIF 2.1.0 log to out, one rule and one result at a time.
+    """
+    out.write('{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", "version": "2.1.0", "runs": [{')
+    out.write('"tool": {"driver": {"name": "ReviewBot", '
+              '"informationUri": "https://github.com/PushkrJain/reviewbot", "rules": [')
+    for n, issue in enumerate(store.iter_rules(run_id, since, until)):
+        rule = {"id": rule_id(issue), "shortDescription": {"text": issue[:200] or "Review finding"},
+                "fullDescription": {"text": issue}}
+        out.write(("," if n else "") + "\n" + json.dumps(rule))
+    out.write('\n]}}, "results": [')
+    # Rows repeat the same few paths and issues; derive their fields once
+    uris, rule_ids = {}, {}
+    for n, (path, line, severity, issue, fix, _) in enumerate(store.iter_violations(run_id, since, until)):
+        uri = uris.get(path)
+        if uri is None:
+            uri = uris[path] = os.path.relpath(path, root).replace(os.sep, "/")
+        rule = rule_ids.get(issue)
+        if rule is None:
+            rule = rule_ids[issue] = rule_id(issue)
+        text = f"{issue} Fix: {fix}" if fix else issue
+        result = {
+            "ruleId": rule,
+            "level": _level(severity),
+            "message": {"text": text or "Review finding"},
+            "locations": [{"physicalLocation": {
+                "artifactLocation": {"uri": uri},
+                "region": {"startLine": max(line, 1)},
+            }}],
+            "properties": {"severity": severity},
+        }
+        out.write(("," if n else "") + "\n" + json.dumps(result))
+    out.write("\n]}]}\n")
+
+
+def _date(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def write_summary(store: ViolationStore, out, run_id: int | None = None, since: float | None = None,
+                  until: float | None = None, top: int = 10):
+    report = store.summary(run_id, since, until, top)
+    totals = report["totals"]
+    scope = f"run {run_id}" if run_id is not None else f"{totals['runs']} run(s)"
+    if since is not None:
+        scope += f" since {_date(since)}"
+    out.write(f"📋 AutoReviewBot - {totals['violations']} violation(s) in {totals['files_with_violations']} "
+              f"file(s), {totals['reviews']} review(s) across {scope}\n")
+    if totals["failed_reviews"]:
+        out.write(f"  {totals['failed_reviews']} review(s) failed\n")
+    if totals["by_severity"]:
+        out.write("By severity: " + ", ".join(f"{s}: {n}" for s, n in totals["by_severity"].items()) + "\n")
+    if report["top_rules"]:
+        out.write("\nTop rules:\n")
+        for r in report["top_rules"]:
+            out.write(f"  {r['count']:>7}  max {r['max_severity']:>2}  {r['files']:>5} file(s)  "
+                      f"{r['rule']}  {r['issue'][:100]}\n")
+    if report["top_files"]:
+        out.write("\nMost-violated files:\n")
+        for f in report["top_files"]:
+            out.write(f"  {f['count']:>7}  {f['blocking']:>5} blocking  {f['path']}\n")
+    if report["trend"]:
+        out.write("\nTrend (per day):\n")
+        for b in report["trend"]:
+            out.write(f"  {_date(b['start'])}  {b['count']:>7} violation(s)  {b['blocking']:>5} blocking  "
+                      f"{b['reviews']:>5} review(s)\n")
+
+
+_store: ViolationStore | None = None
+
+
+def get_violation_store() -> ViolationStore | None:
+    """
+    Returns the shared store, or None when VIOLATION_STORE_ENABLED is off.
+    """
+    global _store
+    if not VIOLATION_STORE_ENABLED:
+        return None
+    if _store is None:
+        _store = ViolationStore()
+    return _store
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Report on stored review findings")
+    parser.add_argument("format", nargs="?", choices=("summary", "json", "sarif"), default="summary")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument("--run", help="Run id, or 'last' (default: every run)")
+    scope.add_argument("--days", type=float, help="Only the last N days")
+    parser.add_argument("--top", type=int, default=10, help="Rules and files listed in the summary")
+    parser.add_argument("--root", default=".", help="SARIF paths are made relative to this folder")
+    parser.add_argument("--output", help="Write here instead of stdout")
+    parser.add_argument("--store", default=VIOLATION_STORE_PATH)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.store):
+        parser.error(f"No violation store at {args.store}")
+    store = ViolationStore(args.store)
+    run_id = None
+    if args.run == "last":
+        run_id = store.last_run()
+    elif args.run is not None:
+        run_id = int(args.run)
+    since = time.time() - args.days * DAY if args.days is not None else None
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.format == "sarif":
+            write_sarif(store, out, run_id, since, root=args.root)
+        elif args.format == "json":
+            json.dump(store.summary(run_id, since, top=args.top), out, indent=2)
+            out.write("\n")
+        else:
+            write_summary(store, out, run_id, since, top=args.top)
+    finally:
+        if args.output:
+            out.close()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from config.settings import load_env
+
+load_env()
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".reviewbot/jobs.sqlite")
+# A job claimed this many times (crashes, restarts) is marked failed instead of re-run
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    repo TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    head_sha TEXT NOT NULL,
+    base_sha TEXT,
+    installation_id INTEGER,
+    delivery_id TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (repo, pr_number, head_sha)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_pr ON jobs(repo, pr_number, status);
+"""
+
+
+class JobQueue:
+    """
+    Durable review queue in SQLite. One job per (repo, PR, head SHA): a
+    redelivered or duplicate push maps onto the existing job, and a newer
+    head SHA cancels the PR's older queued or running jobs.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so claims never race
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def enqueue(self, repo: str, pr_number: int, head_sha: str, base_sha: str | None = None,
+                installation_id: int | None = None, delivery_id: str | None = None) -> dict:
+        """
+        Returns {"job_id", "deduplicated", "cancelled": [ids of superseded jobs]}.
+        """
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status FROM jobs WHERE repo = ? AND pr_number = ? AND head_sha = ?",
+                    (repo, pr_number, head_sha),
+                ).fetchone()
+                deduplicated = row is not None
+                if row is None:
+                    job_id = self._conn.execute(
+                        "INSERT INTO jobs (repo, pr_number, head_sha, base_sha, installation_id, delivery_id,"
+                        " status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (repo, pr_number, head_sha, base_sha, installation_id, delivery_id, QUEUED, now, now),
+                    ).lastrowid
+                else:
+                    job_id = row["id"]
+                    if row["status"] in (FAILED, CANCELLED):
+                        # The same head came back (re-push, reopen): review it again
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, attempts = 0, error = NULL, updated = ? WHERE id = ?",
+                            (QUEUED, now, job_id),
+                        )
+                        deduplicated = False
+                cancelled = self._cancel_where(
+                    "repo = ? AND pr_number = ? AND head_sha != ?", (repo, pr_number, head_sha), now,
+                    "superseded by " + head_sha[:12],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"job_id": job_id, "deduplicated": deduplicated, "cancelled": cancelled}
+
+    def cancel_pr(self, repo: str, pr_number: int, reason: str = "pull request closed") -> list:
+        with self._lock:
+            self._transaction()
+            try:
+                cancelled = self._cancel_where("repo = ? AND pr_number = ?", (repo, pr_number), time.time(), reason)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cancelled
+
+    def _cancel_where(self, condition: str, params: tuple, now: float, reason: str) -> list:
+        ids = [r["id"] for r in self._conn.execute(
+            f"SELECT id FROM jobs WHERE {condition} AND status IN (?, ?)", params + ACTIVE)]
+        if ids:
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                [(CANCELLED, reason, now, job_id) for job_id in ids],
+            )
+            logging.info(f"Cancelled stale review jobs {ids}: {reason}")
+        return ids
+
+    def claim(self) -> dict | None:
+        """
+        Atomically moves the oldest queued job to running and returns it.
+        """
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (RUNNING, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return dict(row, status=RUNNING, attempts=row["attempts"] + 1)
+
+    def _finish(self, job_id: int, status: str, error: str | None = None, result=None) -> bool:
+        # Only a running job can finish; a cancelled one stays cancelled
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, result = ?, updated = ? WHERE id = ? AND status = ?",
+                (status, error, json.dumps(result) if result is not None else None, time.time(), job_id, RUNNING),
+            ).rowcount
+        return updated == 1
+
+    def complete(self, job_id: int, result=None) -> bool:
+        return self._finish(job_id, DONE, result=result)
+
+    def fail(self, job_id: int, error: str) -> bool:
+        return self._finish(job_id, FAILED, error=error)
+
+    def is_cancelled(self, job_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or row["status"] == CANCELLED
+
+    def recover(self) -> int:
+        """
+        Requeues jobs left running by a crashed or restarted process, failing
+        those already claimed JOB_MAX_ATTEMPTS times.
+        """
+        now = time.time()
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, "too many attempts", now, RUNNING, JOB_MAX_ATTEMPTS),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE status = ?", (QUEUED, now, RUNNING),
+            ).rowcount
+        if failed or requeued:
+            logging.warning(f"Job queue recovery: {requeued} requeued, {failed} failed")
+        return requeued
+
+    def get(self, job_id: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+
+    def close(self):
+        self._conn.close()
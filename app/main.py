@@ -0,0 +1,130 @@
+import os
+import hmac
+import json
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from config.settings import load_env, setup_logging
+from fastapi import FastAPI, Request, HTTPException
+from app.job_queue import JobQueue
+from app.worker import WorkerPool
+from app.review_job import run_review_job
+from agents.http_client import close_http_client, warm_http_client
+from agents.log_agent import close_event_log, flush_event_log_at_exit
+
+load_env()
+
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+# Accept unsigned deliveries when no secret is set (local development only)
+WEBHOOK_ALLOW_UNSIGNED = os.getenv("WEBHOOK_ALLOW_UNSIGNED", "0") == "1"
+
+# pull_request actions that put a new head SHA up for review
+REVIEW_ACTIONS = {"opened", "synchronize", "reopened", "ready_for_review"}
+
+
+def verify_signature(body: bytes, signature: str | None, secret: str | None = GITHUB_WEBHOOK_SECRET,
+                     allow_unsigned: bool = WEBHOOK_ALLOW_UNSIGNED) -> bool:
+    """
+    Checks GitHub's X-Hub-Signature-256 header. Without a configured secret
+    every delivery is rejected unless allow_unsigned is set.
+    """
+    if not secret:
+        return allow_unsigned
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature[len("sha256="):])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    flush_event_log_at_exit()
+    if not GITHUB_WEBHOOK_SECRET:
+        if WEBHOOK_ALLOW_UNSIGNED:
+            logging.warning("GITHUB_WEBHOOK_SECRET is not set; accepting unsigned deliveries (WEBHOOK_ALLOW_UNSIGNED=1)")
+        else:
+            logging.error("GITHUB_WEBHOOK_SECRET is not set; every delivery will be rejected")
+    await warm_http_client()
+    app.state.queue = JobQueue()
+    app.state.pool = WorkerPool(app.state.queue, run_review_job)
+    app.state.pool.start()
+    try:
+        yield
+    finally:
+        await app.state.pool.stop()
+        app.state.queue.close()
+        await close_http_client()
+        await close_event_log()
+
+
+app = FastAPI(title="ReviewBot", lifespan=lifespan)
+
+
+@app.post("/webhook", status_code=202)
+async def webhook(request: Request):
+    """
+    Accepts a GitHub webhook delivery and only records it: reviews run on
+    the worker pool, so the response time does not depend on review time.
+    """
+    if not GITHUB_WEBHOOK_SECRET and not WEBHOOK_ALLOW_UNSIGNED:
+        raise HTTPException(status_code=503, detail="webhook secret not configured")
+    body = await request.body()
+    if not verify_signature(body, request.headers.get("X-Hub-Signature-256"),
+                            GITHUB_WEBHOOK_SECRET, WEBHOOK_ALLOW_UNSIGNED):
+        raise HTTPException(status_code=401, detail="invalid signature")
+
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return {"status": "pong"}
+    if event != "pull_request":
+        return {"status": "ignored", "event": event}
+
+    try:
+        payload = json.loads(body)
+        action = payload["action"]
+        pr = payload["pull_request"]
+        repo = payload["repository"]["full_name"]
+        pr_number = pr["number"]
+        head_sha = pr["head"]["sha"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="malformed pull_request payload")
+
+    queue, pool = request.app.state.queue, request.app.state.pool
+    if action == "closed":
+        cancelled = queue.cancel_pr(repo, pr_number)
+        pool.cancel(cancelled)
+        return {"status": "cancelled", "cancelled": cancelled}
+    if action not in REVIEW_ACTIONS or pr.get("draft"):
+        return {"status": "ignored", "action": action}
+
+    installation = (payload.get("installation") or {}).get("id")
+    if installation is None:
+        raise HTTPException(status_code=400, detail="delivery has no installation id")
+
+    queued = queue.enqueue(
+        repo, pr_number, head_sha,
+        base_sha=pr.get("base", {}).get("sha"),
+        installation_id=installation,
+        delivery_id=request.headers.get("X-GitHub-Delivery"),
+    )
+    pool.cancel(queued["cancelled"])
+    pool.notify()
+    return dict(queued, status="duplicate" if queued["deduplicated"] else "queued")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, request: Request):
+    job = request.app.state.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="no such job")
+    return job
+
+
+@app.get("/health")
+async def health(request: Request):
+    return {
+        "status": "ok",
+        "jobs": request.app.state.queue.stats(),
+        "workers": request.app.state.pool.stats(),
+    }
@@ -0,0 +1,129 @@
+import os
+import json
+import logging
+from urllib.parse import quote
+from config.settings import load_env
+from auth.github_app import GITHUB_API_URL, get_installation_token, with_installation_token
+from agents.http_client import get_http_client
+from agents.diff_agent import parse_unified_diff
+from agents.rule_engine_agent import get_violations_from_llm
+from agents.llm_agent import LLM_FAILURE_ISSUE
+from agents.discovery import detect_language, IgnoreRules
+from agents.scheduler import ReviewScheduler
+from agents.llm_errors import RetryBudget, get_retry_budget, set_retry_budget
+from agents.github_publisher import GitHubPublisher
+from agents import tracing
+
+load_env()
+
+# Files larger than this are not fetched or reviewed
+SERVICE_MAX_FILE_BYTES = int(os.getenv("SERVICE_MAX_FILE_BYTES", 512 * 1024))
+# Post findings back to the pull request as review comments
+SERVICE_PUBLISH = os.getenv("SERVICE_PUBLISH", "1") == "1"
+# gitignore-style patterns (comma separated) for pull request files not to review; none by default
+SERVICE_EXCLUDE = IgnoreRules([p.strip() for p in os.getenv("SERVICE_EXCLUDE", "").split(",") if p.strip()])
+
+
+def _headers(token: str, accept: str = "application/vnd.github+json") -> dict:
+    return {"Authorization": f"Bearer {token}", "Accept": accept}
+
+
+async def fetch_pr_files(repo: str, pr_number: int, installation_id: int) -> list:
+    """
+    Lists the files changed by a pull request, with their patches.
+    """
+    client = get_http_client()
+    files = []
+    page = 1
+    while True:
+        response = await with_installation_token(installation_id, lambda token: client.get(
+            f"{GITHUB_API_URL}/repos/{repo}/pulls/{pr_number}/files",
+            params={"per_page": 100, "page": page},
+            headers=_headers(token),
+        ))
+        response.raise_for_status()
+        batch = response.json()
+        files.extend(batch)
+        if len(batch) < 100:
+            return files
+        page += 1
+
+
+async def fetch_file(repo: str, path: str, ref: str, installation_id: int) -> str | None:
+    client = get_http_client()
+    response = await with_installation_token(installation_id, lambda token: client.get(
+        f"{GITHUB_API_URL}/repos/{repo}/contents/{quote(path)}",
+        params={"ref": ref},
+        headers=_headers(token, "application/vnd.github.raw"),
+    ))
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    if len(response.content) > SERVICE_MAX_FILE_BYTES:
+        return None
+    return response.text
+
+
+def changed_lines_from_patch(path: str, patch: str | None) -> list | None:
+    if not patch:
+        return None
+    parsed = parse_unified_diff(f"--- a/{path}\n+++ b/{path}\n{patch}\n")
+    return parsed.get(path)
+
+
+async def run_review_job(job: dict) -> dict:
+    """
+    Reviews the changed lines of every supported file in a pull request at
+    the job's head SHA and, with SERVICE_PUBLISH, posts the findings as
+    batched pull-request reviews. Returns {"files": n, "violations":
+    {path: [...]}, "failed": [paths the LLM could not review], "published":
+    {...}}; a failed file's placeholder finding is never published. Raises
+    if a file's review raised, so the job is marked failed, not done.
+    """
+    repo, pr_number, head_sha = job["repo"], job["pr_number"], job["head_sha"]
+    installation_id = job["installation_id"]
+    # Runs as its own task, so this budget is not shared with concurrent jobs
+    set_retry_budget(RetryBudget())
+
+    with tracing.span("discover", file=f"{repo}#{pr_number}"):
+        changed = [
+            f for f in await fetch_pr_files(repo, pr_number, installation_id)
+            if f.get("status") != "removed" and detect_language(f["filename"]) != "unknown"
+            and not SERVICE_EXCLUDE.ignored_path(f["filename"])
+        ]
+
+    async def review(entry: dict):
+        path = entry["filename"]
+        with tracing.span("read", file=path):
+            code = await fetch_file(repo, path, head_sha, installation_id)
+        if code is None:
+            return None
+        raw = await get_violations_from_llm(code, filename=path,
+                                            changed_lines=changed_lines_from_patch(path, entry.get("patch")))
+        return {"path": path, "patch": entry.get("patch"), "code": code, "violations": json.loads(raw)}
+
+    scheduler = ReviewScheduler(review)
+    reviewed = [r for r in await scheduler.run([(entry, entry.get("changes", 0)) for entry in changed]) if r]
+    if scheduler.failures:
+        raise RuntimeError(f"{scheduler.failures} of {len(changed)} file review(s) raised; "
+                           f"retry budget {get_retry_budget().stats()}")
+    failed = []
+    for r in reviewed:
+        found = [v for v in r["violations"] if isinstance(v, dict)]
+        r["violations"] = [v for v in found if v.get("issue") != LLM_FAILURE_ISSUE]
+        if len(r["violations"]) < len(found):
+            failed.append(r["path"])
+    violations = {r["path"]: r["violations"] for r in reviewed}
+    logging.info(f"{repo}#{pr_number} @ {head_sha[:12]}: reviewed {len(violations)} file(s)")
+    if failed:
+        logging.warning(f"{repo}#{pr_number} @ {head_sha[:12]}: LLM review failed for {failed}")
+
+    published = None
+    if SERVICE_PUBLISH and any(violations.values()):
+        with tracing.span("publish", file=f"{repo}#{pr_number}"):
+            token = await get_installation_token(installation_id)
+            publisher = GitHubPublisher(repo, pr_number, head_sha, token, installation_id=installation_id)
+            published = await publisher.publish(reviewed)
+        logging.info(f"{repo}#{pr_number} @ {head_sha[:12]}: published {published}")
+    return {"files": len(violations), "violations": violations, "failed": failed, "published": published,
+            "retry_budget": get_retry_budget().stats()}
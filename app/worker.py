@@ -0,0 +1,110 @@
+import os
+import asyncio
+import logging
+from config.settings import load_env
+from app.job_queue import JobQueue
+
+load_env()
+
+# Concurrent review jobs (pull requests); files within a job are scheduled separately
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", 2))
+# Fallback poll for jobs enqueued by another process sharing the queue file
+SERVICE_POLL_INTERVAL = float(os.getenv("SERVICE_POLL_INTERVAL", 5))
+
+
+class WorkerPool:
+    """
+    Pulls jobs from the JobQueue and runs handler(job) on up to size of them
+    at once. Jobs superseded while running are cancelled through cancel().
+    """
+
+    def __init__(self, queue: JobQueue, handler, size: int = SERVICE_WORKERS,
+                 poll_interval: float = SERVICE_POLL_INTERVAL):
+        self.queue = queue
+        self.handler = handler
+        self.size = max(1, size)
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._wakeup = asyncio.Event()
+        self._workers = []
+        self._running = {}
+        self._stopping = False
+
+    def start(self):
+        self.queue.recover()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.size)]
+
+    def notify(self):
+        """
+        Wakes idle workers after an enqueue.
+        """
+        self._wakeup.set()
+
+    def cancel(self, job_ids: list):
+        for job_id in job_ids:
+            task = self._running.get(job_id)
+            if task is not None:
+                logging.info(f"Cancelling running review job {job_id}")
+                task.cancel()
+
+    async def _next_job(self) -> dict:
+        while True:
+            job = self.queue.claim()
+            if job is not None:
+                return job
+            self._wakeup.clear()
+            # asyncio.wait rather than wait_for: before Python 3.12, wait_for
+            # can swallow a cancellation that lands as the wakeup fires
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=self.poll_interval)
+            finally:
+                waiter.cancel()
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._next_job()
+            job_id = job["id"]
+            logging.info(f"Worker {index} starting job {job_id} ({job['repo']}#{job['pr_number']} "
+                         f"@ {job['head_sha'][:12]})")
+            task = asyncio.create_task(self.handler(job))
+            self._running[job_id] = task
+            try:
+                result = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # stop() cancels the job too, so by now it may look like a
+                # superseded job; only the flag tells the two apart
+                if self._stopping or not task.cancelled():
+                    # The pool itself is stopping; leave the job for recover()
+                    task.cancel()
+                    raise
+                self.cancelled += 1
+                logging.info(f"Job {job_id} cancelled")
+                continue
+            except Exception as e:
+                self.failed += 1
+                self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+                logging.exception(f"Job {job_id} failed")
+                continue
+            finally:
+                self._running.pop(job_id, None)
+            self.completed += 1
+            self.queue.complete(job_id, result)
+
+    async def stop(self):
+        self._stopping = True
+        for task in list(self._running.values()) + self._workers:
+            task.cancel()
+        await asyncio.gather(*self._running.values(), *self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.size,
+            "running": sorted(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
@@ -1,36 +1,153 @@
-import jwt
 import time
-import httpx
 import os
-from dotenv import load_dotenv
+import asyncio
+import logging
+from datetime import datetime
+from config.settings import load_env
+from agents.http_client import get_http_client
 
-load_dotenv(dotenv_path="config/secrets.env")
+load_env()
 
 GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
 PRIVATE_KEY_PATH = os.getenv("GITHUB_PRIVATE_KEY_PATH")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# App JWTs live 10 minutes; installation tokens an hour. Both are replaced
+# this many seconds before they expire.
+JWT_TTL = 10 * 60
+JWT_REFRESH_MARGIN = int(os.getenv("GITHUB_JWT_REFRESH_MARGIN", 60))
+TOKEN_REFRESH_MARGIN = int(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN", 300))
+
+_private_key = None
+_jwt = None
+_jwt_expires = 0.0
+
+
+def load_private_key() -> str:
+    """
+    Reads the App's PEM once per process.
+    """
+    global _private_key
+    if _private_key is None:
+        with open(PRIVATE_KEY_PATH, "r") as key_file:
+            _private_key = key_file.read()
+    return _private_key
+
 
 def generate_jwt():
-    with open(PRIVATE_KEY_PATH, "r") as key_file:
-        private_key = key_file.read()
+    """
+    Returns the App JWT, signing a new one only when the cached one is
+    within JWT_REFRESH_MARGIN seconds of expiry.
+    """
+    global _jwt, _jwt_expires
+    now = time.time()
+    if _jwt is not None and now < _jwt_expires - JWT_REFRESH_MARGIN:
+        return _jwt
 
+    import jwt  # deferred: only needed when a JWT is actually signed
     payload = {
-        "iat": int(time.time()) - 60,
-        "exp": int(time.time()) + (10 * 60),
+        "iat": int(now) - 60,
+        "exp": int(now) + JWT_TTL,
         "iss": GITHUB_APP_ID
     }
 
-    encoded_jwt = jwt.encode(payload, private_key, algorithm="RS256")
-    return encoded_jwt
+    _jwt = jwt.encode(payload, load_private_key(), algorithm="RS256")
+    _jwt_expires = payload["exp"]
+    return _jwt
 
-async def get_installation_token(installation_id):
-    jwt_token = generate_jwt()
-    headers = {
-        "Authorization": f"Bearer {jwt_token}",
-        "Accept": "application/vnd.github+json"
-    }
 
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-    async with httpx.AsyncClient() as client:
+def _parse_expiry(expires_at: str | None) -> float:
+    if not expires_at:
+        # GitHub always sends it; assume the documented one hour otherwise
+        return time.time() + 3600
+    return datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
+
+
+class InstallationTokenCache:
+    """
+    Installation access tokens keyed by installation id. A token is reused
+    until TOKEN_REFRESH_MARGIN seconds before its expires_at, and concurrent
+    callers for the same installation share a single refresh request.
+    """
+
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self.hits = 0
+        self.refreshes = 0
+        self._tokens = {}
+        self._inflight = {}
+
+    def _fresh(self, installation_id) -> str | None:
+        entry = self._tokens.get(installation_id)
+        if entry is not None and time.time() < entry[1] - self.refresh_margin:
+            return entry[0]
+        return None
+
+    async def get(self, installation_id) -> str:
+        token = self._fresh(installation_id)
+        if token is not None:
+            self.hits += 1
+            return token
+        task = self._inflight.get(installation_id)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(installation_id))
+            self._inflight[installation_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(installation_id, None))
+        # shield: one caller being cancelled must not abort the shared refresh
+        return await asyncio.shield(task)
+
+    async def _refresh(self, installation_id) -> str:
+        headers = {
+            "Authorization": f"Bearer {generate_jwt()}",
+            "Accept": "application/vnd.github+json"
+        }
+        url = f"{GITHUB_API_URL}/app/installations/{installation_id}/access_tokens"
+        client = get_http_client()
         resp = await client.post(url, headers=headers)
         resp.raise_for_status()
-        return resp.json()["token"]
+        body = resp.json()
+        self.refreshes += 1
+        self._tokens[installation_id] = (body["token"], _parse_expiry(body.get("expires_at")))
+        logging.info(f"Refreshed GitHub installation token for {installation_id} "
+                     f"(expires {body.get('expires_at')})")
+        return body["token"]
+
+    def invalidate(self, installation_id, token: str | None = None):
+        """
+        Drops a token GitHub rejected (revoked, app reinstalled). With token,
+        only that token is dropped, so concurrent callers that saw the same
+        401 do not discard a replacement another caller already fetched.
+        """
+        entry = self._tokens.get(installation_id)
+        if entry is not None and (token is None or entry[0] == token):
+            del self._tokens[installation_id]
+
+    def stats(self) -> dict:
+        return {"installations": len(self._tokens), "hits": self.hits, "refreshes": self.refreshes}
+
+
+_token_cache = InstallationTokenCache()
+
+
+def get_token_cache() -> InstallationTokenCache:
+    return _token_cache
+
+
+async def get_installation_token(installation_id):
+    return await _token_cache.get(installation_id)
+
+
+async def with_installation_token(installation_id, send, token: str | None = None):
+    """
+    Returns await send(token) with the installation's token (or token, if
+    given). On a 401 the token is invalidated and send is called once more
+    with a fresh one.
+    """
+    if token is None:
+        token = await get_installation_token(installation_id)
+    response = await send(token)
+    if response.status_code != 401:
+        return response
+    logging.warning(f"GitHub rejected the token for installation {installation_id}; refreshing it")
+    _token_cache.invalidate(installation_id, token)
+    return await send(await get_installation_token(installation_id))
@@ -1,9 +1,13 @@
 import asyncio
-from github_app import get_installation_token
+from auth.github_app import get_installation_token
+from agents.http_client import close_http_client
 
 async def main():
     installation_id = 74443799  # Replace with your installation ID
-    token = await get_installation_token(installation_id)
+    try:
+        token = await get_installation_token(installation_id)
+    finally:
+        await close_http_client()
     print(f"✅ GitHub Token: {token[:10]}...")
 
 asyncio.run(main())
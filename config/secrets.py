@@ -1,7 +1,7 @@
-from dotenv import load_dotenv
+from config.settings import load_env
 import os
 
-load_dotenv(dotenv_path="config/secrets.env")
+load_env()
 
 def get_secret(key: str) -> str:
     return os.getenv(key)
@@ -0,0 +1,41 @@
+import os
+import logging
+
+# Every module reads its settings from the environment after load_env()
+ENV_FILE = os.getenv("REVIEWBOT_ENV_FILE", "config/secrets.env")
+
+_env_loaded = False
+_logging_ready = False
+
+
+def load_env():
+    """
+    Loads ENV_FILE into os.environ once per process; later calls return at
+    once. Variables already set in the environment take precedence.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    if os.path.exists(ENV_FILE):
+        from dotenv import load_dotenv
+        load_dotenv(ENV_FILE)
+
+
+def setup_logging():
+    """
+    Sends log records to LOG_FOLDER/llm_agent.log. Called by entry points
+    rather than at import, so importing a module has no side effects.
+    """
+    global _logging_ready
+    if _logging_ready:
+        return
+    _logging_ready = True
+    load_env()
+    log_dir = os.getenv("LOG_FOLDER", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(log_dir, "llm_agent.log"),
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
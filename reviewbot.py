@@ -0,0 +1,140 @@
+"""
+ReviewBot command line.
+
+    python reviewbot.py review [folder] [--diff-base REF | --diff-file PATCH]
+                               [--shard i/N | --jobs N] [--shard-by hash|size] [--output FILE]
+    python reviewbot.py merge SHARD.json... [--output FILE] [--fail-severity N]
+    python reviewbot.py report [summary|json|sarif] [--run ID|last | --days N] [--output FILE]
+    python reviewbot.py gate [folder] [--severity N] [--no-cancel] [--json]
+    python reviewbot.py serve [--host HOST] [--port PORT]
+    python reviewbot.py bench [bench options]
+
+Each subcommand imports only what it needs, when it runs, so `--help` and
+short per-commit invocations do not pay for the whole pipeline.
+"""
+import os
+import sys
+import argparse
+
+
+def _review(args, extra) -> int:
+    # test_inline_engine reads its settings at import time
+    if args.folder:
+        os.environ["TEST_FOLDER"] = args.folder
+    if args.diff_base:
+        os.environ["REVIEW_DIFF_BASE"] = args.diff_base
+    if args.diff_file:
+        os.environ["REVIEW_DIFF_FILE"] = args.diff_file
+    if args.shard or args.jobs or args.shards:
+        return _review_sharded(args)
+    import asyncio
+    from test_inline_engine import run_inline_review_on_tests
+    result = asyncio.run(run_inline_review_on_tests())
+    return 0 if result["reviewed"] == result["files"] and not result["failed"] else 1
+
+
+def _review_sharded(args) -> int:
+    from agents import sharding
+    root = args.folder or os.getenv("TEST_FOLDER", "tests")
+    strategy = args.shard_by or sharding.SHARD_STRATEGY
+    if args.shard:
+        # One shard, e.g. one job of a CI matrix; merge combines the outputs
+        import asyncio
+        try:
+            index, count = sharding.parse_shard(args.shard)
+        except ValueError as e:
+            build_parser().error(str(e))
+        result = asyncio.run(sharding.run_shard(root, index, count, strategy))
+        sharding.write_json(args.output or sharding.shard_output_path(index, count), result)
+        return 0 if result["reviewed"] == result["queued"] and not result["failed"] else 1
+    # Every shard on this host, at most --jobs processes at a time
+    count = args.shards or args.jobs
+    paths = sharding.run_local(root, count, strategy, args.jobs)
+    report = sharding.merge(paths)
+    sharding.print_summary(report)
+    if args.output:
+        sharding.write_json(args.output, report)
+    return 0 if report["verdict"] == "pass" else 1
+
+
+def _merge(args, extra) -> int:
+    from agents import sharding
+    report = sharding.merge(args.paths, args.fail_severity)
+    sharding.print_summary(report)
+    if args.output:
+        sharding.write_json(args.output, report)
+    return sharding.exit_code(report)
+
+
+def _report(args, extra) -> int:
+    from agents.violation_store import main
+    return main(extra)
+
+
+def _gate(args, extra) -> int:
+    from agents.gate import main
+    return main(extra)
+
+
+def _serve(args, extra) -> int:
+    import uvicorn
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=args.reload)
+    return 0
+
+
+def _bench(args, extra) -> int:
+    from tools.bench import main
+    main(extra)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="reviewbot", description="LLM code review for Java and Python")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    review = commands.add_parser("review", help="Review every file under a folder and store the findings")
+    review.add_argument("folder", nargs="?", help="Folder to review (default TEST_FOLDER or tests)")
+    review.add_argument("--diff-base", help="Review only lines changed since this git ref")
+    review.add_argument("--diff-file", help="Review only lines changed in this unified diff")
+    review.add_argument("--shard", metavar="i/N", help="Review only shard i of N (1-based) and write its JSON")
+    review.add_argument("--jobs", type=int, help="Run all shards on this host, this many processes at a time")
+    review.add_argument("--shards", type=int, help="Number of shards with --jobs (default: one per job)")
+    review.add_argument("--shard-by", choices=("hash", "size"), help="Shard assignment (default SHARD_STRATEGY)")
+    review.add_argument("--output", help="Where to write the shard or merged JSON")
+    review.set_defaults(run=_review)
+
+    merge = commands.add_parser("merge", help="Combine shard outputs into one report and exit status")
+    merge.add_argument("paths", nargs="+", help="Shard JSON files")
+    merge.add_argument("--output", help="Write the merged report here")
+    merge.add_argument("--fail-severity", type=int, help="Exit 1 if any finding is at or above this severity")
+    merge.set_defaults(run=_merge)
+
+    # report, gate and bench parse their own options
+    report = commands.add_parser("report", help="Summarize stored findings or export them as SARIF",
+                                 add_help=False)
+    report.set_defaults(run=_report)
+
+    gate = commands.add_parser("gate", help="Exit non-zero as soon as a blocking finding is confirmed",
+                               add_help=False)
+    gate.set_defaults(run=_gate)
+
+    serve = commands.add_parser("serve", help="Run the GitHub webhook service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--reload", action="store_true")
+    serve.set_defaults(run=_serve)
+
+    bench = commands.add_parser("bench", help="Benchmark the pipeline against a mock LLM", add_help=False)
+    bench.set_defaults(run=_bench)
+    return parser
+
+
+def main(argv: list | None = None) -> int:
+    args, extra = build_parser().parse_known_args(argv)
+    if extra and args.command not in ("report", "gate", "bench"):
+        build_parser().error(f"unrecognized arguments: {' '.join(extra)}")
+    return args.run(args, extra)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
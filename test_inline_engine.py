@@ -1,28 +1,37 @@
 import os
+import json
 import time
 import asyncio
-from agents.rule_engine_agent import get_violations_from_llm, format_review_report
-from dotenv import load_dotenv
-
-load_dotenv("config/secrets.env")
+from agents.rule_engine_agent import get_violations_from_llm, get_violations_for_batch, format_review_report
+from agents.http_client import close_http_client, warm_http_client
+from agents.scheduler import ReviewScheduler
+from agents.review_cache import get_review_cache
+from agents.diff_agent import git_changed_lines, diff_file_changed_lines
+from agents.llm_router import get_router
+from agents.log_agent import close_event_log, flush_event_log_at_exit, history_key
+from agents.llm_errors import RetryBudget, get_retry_budget, set_retry_budget
+from agents.batcher import BATCHING_ENABLED, is_small, pack_batches
+from agents.discovery import FileDiscovery, detect_language
+from agents.violation_store import get_violation_store
+from agents.llm_agent import LLM_FAILURE_ISSUE
+from agents import tracing
+from config.settings import load_env, setup_logging
+
+load_env()
 
 TEST_FOLDER = os.getenv("TEST_FOLDER", "tests")
-REPORTS_FOLDER = os.path.join(TEST_FOLDER, "reports")
-
-EXTENSION_LANG_MAP = {
-    ext.strip(): lang.strip()
-    for ext, lang in (item.split(":") for item in os.getenv("EXTENSION_LANG_MAP", ".java:java,.py:python").split(","))
-}
-
 
-def detect_language(filename: str) -> str:
-    for ext, lang in EXTENSION_LANG_MAP.items():
-        if filename.endswith(ext):
-            return lang
-    return "unknown"
+# Diff-only mode: review just the lines changed since REVIEW_DIFF_BASE (or in REVIEW_DIFF_FILE)
+REVIEW_DIFF_BASE = os.getenv("REVIEW_DIFF_BASE")
+REVIEW_DIFF_HEAD = os.getenv("REVIEW_DIFF_HEAD")
+REVIEW_DIFF_FILE = os.getenv("REVIEW_DIFF_FILE")
 
+# Violations per reviewed file in the current run, returned by run_inline_review_on_tests
+_findings = {}
+# Violation store run the current reviews are recorded in
+_run_id = None
 
-async def review_file(file_path: str):
+async def review_file(file_path: str, changed_lines: list | None = None):
     fname = os.path.basename(file_path)
 
     if not os.path.isfile(file_path) or fname.startswith(".") or fname == "test_inline_engine.py":
@@ -32,47 +41,169 @@ async def review_file(file_path: str):
     if language == "unknown":
         return f"Skipping unsupported file: {fname}"
 
-    with open(file_path, "r") as f:
-        code = f.read()
+    # Reviewed (and logged) under the same key the gate ranks history by
+    key = history_key(file_path, TEST_FOLDER)
+    with tracing.labels(file=key, language=language):
+        with tracing.span("read"):
+            with open(file_path, "r") as f:
+                code = f.read()
 
-    start = time.time()
-    review = await get_violations_from_llm(code, filename=fname)
+        start = time.time()
+        review = await get_violations_from_llm(code, filename=key, changed_lines=changed_lines)
+        duration = time.time() - start
+
+        return write_report(file_path, review, duration)
+
+
+def write_report(file_path: str, review: str, duration: float) -> str:
+    key = history_key(file_path, TEST_FOLDER)
+    with tracing.span("write", file=key):
+        return _write_report(file_path, key, review, duration)
+
+
+def _write_report(file_path: str, fname: str, review: str, duration: float) -> str:
     formatted = format_review_report(review)
-    duration = time.time() - start
+    try:
+        violations = json.loads(review)
+    except json.JSONDecodeError:
+        violations = []
+    _findings[file_path] = violations
 
     print(f"\nCode Review Report for {fname}")
     print(f"Completed in {duration:.2f} seconds\n")
     print(formatted)
 
-    safe_name = file_path.replace("/", "_").replace("\\", "_")
-    os.makedirs(REPORTS_FOLDER, exist_ok=True)
-    report_path = os.path.join(REPORTS_FOLDER, f"{safe_name}_review.md")
-    with open(report_path, "w") as f:
-        f.write(formatted)
+    store = get_violation_store()
+    if store is not None and _run_id is not None:
+        failed = [v for v in violations if isinstance(v, dict) and v.get("issue") == LLM_FAILURE_ISSUE]
+        store.add(_run_id, file_path, [v for v in violations if v not in failed], failed=bool(failed))
 
     return f"✅ {fname} reviewed in {duration:.2f} seconds"
 
 
-async def run_inline_review_on_tests():
+async def review_batch(file_paths: list) -> list:
+    """
+    Reviews several small files with shared prompts and writes one report per file.
+    """
+    files = []
+    for file_path in file_paths:
+        key = history_key(file_path, TEST_FOLDER)
+        with tracing.span("read", file=key, language=detect_language(file_path)):
+            with open(file_path, "r") as f:
+                files.append((key, f.read()))
+
+    start = time.time()
+    reviews = await get_violations_for_batch(files)
+    duration = time.time() - start
+
+    return [write_report(path, reviews[name], duration) for path, (name, _) in zip(file_paths, files)]
+
+
+async def run_inline_review_on_tests(files: list | None = None) -> dict:
+    """
+    Reviews every file under TEST_FOLDER, or only files ([(path, size)])
+    when given, e.g. one shard. Diff-only mode still applies to either.
+    """
+    setup_logging()
+    flush_event_log_at_exit()
     print("Running AutoReviewBot Inline Review...\n")
 
     start_all = time.time()
     all_files = []
 
-    for dirpath, _, filenames in os.walk(TEST_FOLDER):
-        for fname in filenames:
-            full_path = os.path.join(dirpath, fname)
-            if os.path.isfile(full_path):
-                all_files.append(full_path)
-
-    review_tasks = [review_file(file_path) for file_path in all_files]
-    results = await asyncio.gather(*review_tasks)
-
-    reviewed = sum(1 for r in results if r and r.startswith("✅"))
+    changed = None
+    if REVIEW_DIFF_FILE:
+        changed = diff_file_changed_lines(REVIEW_DIFF_FILE)
+    elif REVIEW_DIFF_BASE:
+        changed = git_changed_lines(REVIEW_DIFF_BASE, REVIEW_DIFF_HEAD)
+    if changed is not None:
+        print(f"Diff-only mode: {len(changed)} changed file(s).")
+
+    discovery_stats = None
+    if files is None:
+        with tracing.span("discover"):
+            discovery = FileDiscovery(TEST_FOLDER)
+            files = discovery.scan()
+        discovery_stats = discovery.stats
+        print(f"Discovery: {discovery_stats}")
+    for full_path, size in files:
+        if changed is None or os.path.abspath(full_path) in changed:
+            all_files.append((full_path, size))
+
+    # Small files are packed into multi-file prompts (one scheduler job per batch)
+    jobs = all_files
+    if BATCHING_ENABLED and changed is None:
+        small = [(path, size) for path, size in all_files if is_small(size)]
+        batches = pack_batches(small, tokens=lambda item: item[1] // 4 + 1)
+        jobs = [(path, size) for path, size in all_files if not is_small(size)]
+        jobs += [([path for path, _ in batch], sum(size for _, size in batch)) for batch in batches]
+        if batches:
+            print(f"Packed {len(small)} small file(s) into {len(batches)} batch(es).")
+
+    async def review(job):
+        if isinstance(job, list):
+            return await review_batch(job)
+        changed_lines = changed.get(os.path.abspath(job)) if changed is not None else None
+        return await review_file(job, changed_lines)
+
+    global _run_id
+    scheduler = ReviewScheduler(review)
+    set_retry_budget(RetryBudget())
+    _findings.clear()
+    store = get_violation_store()
+    _run_id = store.start_run(TEST_FOLDER) if store is not None else None
+    print(f"Queued {len(all_files)} file(s) as {len(jobs)} job(s) across up to {scheduler.max_workers} worker(s).")
+    try:
+        await warm_http_client()
+        results = await scheduler.run(jobs)
+    finally:
+        await close_http_client()
+        await close_event_log()
+        telemetry = tracing.write_telemetry()
+
+    flat = [r for result in results for r in (result if isinstance(result, list) else [result])]
+    reviewed = sum(1 for r in flat if r and r.startswith("✅"))
+    # Reviews that came back as the placeholder for exhausted LLM retries
+    failed = sorted(path for path, found in _findings.items()
+                    if any(isinstance(v, dict) and v.get("issue") == LLM_FAILURE_ISSUE for v in found))
     total_time = time.time() - start_all
+    if _run_id is not None:
+        store.finish_run(_run_id, len(all_files), reviewed, total_time)
 
     print(f"\nReview completed for {reviewed} file(s).")
+    if failed:
+        print(f"LLM review failed for {len(failed)} file(s): {', '.join(failed)}")
     print(f"Total time taken: {total_time:.2f} seconds.")
+    print(f"Scheduler stats: {scheduler.stats()}")
+    print(f"LLM backends: {get_router().stats()}")
+    print(f"Retry budget: {get_retry_budget().stats()}")
+    cache = get_review_cache()
+    if cache is not None:
+        print(f"Review cache: {cache.stats()}")
+    stages = tracing.get_tracer().summary()
+    if stages:
+        print("Stage timings: " + ", ".join(
+            f"{stage} {v['seconds']:.2f}s/{v['count']}" for stage, v in stages.items()))
+    if telemetry:
+        print(f"Telemetry written to {', '.join(telemetry)}")
+    if _run_id is not None:
+        print(f"Findings stored as run {_run_id} in {store.path} (python reviewbot.py report --run {_run_id})")
+
+    return {
+        "files": len(all_files),
+        "discovery": discovery_stats,
+        "jobs": len(jobs),
+        "reviewed": reviewed,
+        "failed": failed,
+        "seconds": total_time,
+        "scheduler": scheduler.stats(),
+        "router": get_router().stats(),
+        "retry_budget": get_retry_budget().stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "stages": stages,
+        "violations": dict(_findings),
+        "run_id": _run_id,
+    }
 
 
 if __name__ == "__main__":
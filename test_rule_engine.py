@@ -2,40 +2,58 @@
 
 import sys
 import os
+import json
+import time
+import asyncio
 from agents.rule_engine_agent import get_violations_from_llm
-
-SUPPORTED_EXTENSIONS = {".java", ".py"}  # Extend this list as needed
-
-def run_file_test(path):
+from agents.llm_agent import LLM_FAILURE_ISSUE
+from agents.http_client import close_http_client, warm_http_client
+from agents.log_agent import close_event_log, flush_event_log_at_exit
+from agents.discovery import discover_files
+from agents.violation_store import ViolationStore, VIOLATION_STORE_PATH, write_summary
+from config.settings import setup_logging
+
+async def run_file_test(path):
     with open(path, "r") as f:
         code = f.read()
     filename = os.path.basename(path)
-    return get_violations_from_llm(code, filename)
+    violations = json.loads(await get_violations_from_llm(code, filename))
+    return [dict(v, filename=v.get("filename", filename)) for v in violations]
 
 def collect_code_files(folder="tests"):
-    all_files = []
-    for root, dirs, files in os.walk(folder):
-        for file in files:
-            if os.path.splitext(file)[1] in SUPPORTED_EXTENSIONS:
-                all_files.append(os.path.join(root, file))
-    return all_files
-
-def print_report(violations):
-    print("\n📋 AutoReviewBot - Code Review Report\n")
-    for idx, v in enumerate(violations, 1):
-        print(f"Issue {idx}:")
-        print(f"  📄 File     : {v['filename']}")
-        print(f"  🔢 Line     : {v['line']}")
-        print(f"  ⚠️  Issue    : {v['issue']}")
-        print(f"  🛠️  Fix      : {v['recommendation']}")
-        print(f"  🚨 Severity : {v['severity']}")
-        print("-" * 50)
-
-if __name__ == "__main__":
-    violations = []
-
-    for path in collect_code_files("tests"):
+    return [path for path, _ in discover_files(folder)]
+
+def print_report(store, run_id):
+    # Aggregated from the store rather than one block per violation
+    print()
+    write_summary(store, sys.stdout, run_id)
+
+async def main(store):
+    setup_logging()
+    flush_event_log_at_exit()
+    paths = collect_code_files("tests")
+    run_id = store.start_run("test_rule_engine")
+    start = time.time()
+    for path in paths:
         print(f"🔍 Analyzing {path} ...")
-        violations.extend(run_file_test(path))
+    try:
+        await warm_http_client()
+        results = await asyncio.gather(*(run_file_test(path) for path in paths), return_exceptions=True)
+    finally:
+        await close_http_client()
+        await close_event_log()
+    reviewed = 0
+    for path, violations in zip(paths, results):
+        if isinstance(violations, Exception):
+            print(f"❌ {path}: {violations}")
+            continue
+        # Same bookkeeping as test_inline_engine._write_report
+        failed = [v for v in violations if isinstance(v, dict) and v.get("issue") == LLM_FAILURE_ISSUE]
+        store.add(run_id, path, [v for v in violations if v not in failed], failed=bool(failed))
+        reviewed += 1
+    store.finish_run(run_id, len(paths), reviewed, time.time() - start)
+    return run_id
 
-    print_report(violations)
+if __name__ == "__main__":
+    store = ViolationStore(VIOLATION_STORE_PATH)
+    print_report(store, asyncio.run(main(store)))
@@ -0,0 +1,46 @@
+import time
+import asyncio
+
+import pytest
+
+from auth import github_app
+from agents.http_client import close_http_client
+from tools.fake_github_server import FakeGitHubServer
+
+
+@pytest.fixture
+def run():
+    """
+    Runs a coroutine on a fresh event loop, closing the shared HTTP client
+    (which is bound to that loop) afterwards.
+    """
+    def _run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await close_http_client()
+        return asyncio.run(main())
+    return _run
+
+
+@pytest.fixture
+def github():
+    server = FakeGitHubServer()
+    server.start()
+    server.tokens["test-token"] = time.time() + 3600
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def app_auth(github, monkeypatch):
+    """
+    Points the App's token requests at the fake server, with a fresh cache.
+    The fake accepts any JWT when it has no public key.
+    """
+    monkeypatch.setattr(github_app, "GITHUB_API_URL", github.url)
+    monkeypatch.setattr(github_app, "generate_jwt", lambda: "jwt")
+    cache = github_app.InstallationTokenCache()
+    monkeypatch.setattr(github_app, "_token_cache", cache)
+    return cache
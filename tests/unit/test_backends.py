@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from agents.backends import OllamaBackend, CONTEXT_RETRY_MIN
+from tools.mock_llm_server import MockConfig, MockLLMServer
+from tools.stub_server import StubServer
+
+SYSTEM = "You are a code reviewer. " * 20
+
+
+@pytest.fixture
+def mock_llm():
+    server = MockLLMServer(MockConfig(latency_dist="fixed", latency_mean=0.0))
+    server.start()
+    yield server
+    server.stop()
+
+
+class NoContextServer(StubServer):
+    """
+    Fails every system prompt context fetch (with a 500, or a 200 whose body
+    is not JSON) and answers reviews with [].
+    """
+
+    def __init__(self, garbled: bool = False):
+        super().__init__()
+        self.garbled = garbled
+        self.context_fetches = 0
+
+    async def handle(self, method, path, query, headers, body, writer):
+        payload = json.loads(body or b"{}")
+        if payload.get("options", {}).get("num_predict") == 1:
+            self.context_fetches += 1
+            if self.garbled:
+                await self.send(writer, 200, b"<html>", content_type="text/html")
+            else:
+                await self.send_json(writer, 500, {"error": "no"})
+            return
+        await self.send_json(writer, 200, {"response": "[]", "done": True, "prompt_eval_count": 7,
+                                           "prompt_eval_duration": 700})
+
+
+def test_context_savings_come_from_the_servers_own_counts(mock_llm, run):
+    backend = OllamaBackend(mock_llm.url, stream=False, prompt_cache="context")
+
+    async def review_twice():
+        for _ in range(2):
+            await backend.generate("Filename: a.py\nx = 1", system=SYSTEM)
+    run(review_twice())
+
+    context = backend._contexts[SYSTEM]
+    stats = backend.prompt_stats.summary()
+    assert stats["requests"] == 2
+    assert stats["reused_tokens"] == 2 * context["tokens"]
+    assert stats["prompt_eval_seconds_saved"] == round(2 * context["ns"] / 1e9, 3)
+
+
+@pytest.mark.parametrize("garbled", [False, True])
+def test_failed_context_fetch_backs_off(garbled, run):
+    server = NoContextServer(garbled)
+    server.start()
+    try:
+        backend = OllamaBackend(server.url, stream=False, prompt_cache="context")
+
+        async def review(times):
+            for _ in range(times):
+                assert await backend.generate("x = 1", system=SYSTEM) == "[]"
+        run(review(3))
+        assert server.context_fetches == 1
+
+        _, delay = backend._context_failures[SYSTEM]
+        assert delay == CONTEXT_RETRY_MIN
+        backend._context_failures[SYSTEM] = (0.0, delay)
+        run(review(1))
+        assert server.context_fetches == 2
+        assert backend._context_failures[SYSTEM][1] == 2 * CONTEXT_RETRY_MIN
+    finally:
+        server.stop()
+
+
+class PrefixCacheServer(StubServer):
+    """
+    /api/chat that evaluates the system message only on its first request,
+    as Ollama's KV prefix cache does.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.warm = False
+
+    async def handle(self, method, path, query, headers, body, writer):
+        count = 10 if self.warm else 110
+        self.warm = True
+        await self.send_json(writer, 200, {"message": {"content": "[]"}, "done": True,
+                                           "prompt_eval_count": count, "prompt_eval_duration": count * 1000})
+
+
+def test_chat_savings_are_the_gap_to_the_first_request(run):
+    server = PrefixCacheServer()
+    server.start()
+    try:
+        backend = OllamaBackend(server.url, stream=False, prompt_cache="chat")
+
+        async def review(times):
+            for _ in range(times):
+                await backend.generate("x = 1", system=SYSTEM)
+        run(review(3))
+    finally:
+        server.stop()
+    stats = backend.prompt_stats.summary()
+    assert (stats["requests"], stats["evaluated_tokens"], stats["reused_tokens"]) == (3, 130, 200)
+    assert backend.prompt_stats.saved_ns == 200_000
+
+
+@pytest.mark.parametrize("prompt_cache", ["chat", "context"])
+def test_streamed_reviews_record_prompt_eval(mock_llm, prompt_cache, run):
+    backend = OllamaBackend(mock_llm.url, stream=True, prompt_cache=prompt_cache)
+
+    async def review_twice():
+        for _ in range(2):
+            found = json.loads(await backend.generate("Filename: a.py\nx = 1", system=SYSTEM))
+            assert found and all("issue" in v for v in found)
+    run(review_twice())
+
+    stats = backend.prompt_stats.summary()
+    assert stats["requests"] == 2
+    assert stats["evaluated_tokens"] > 0
@@ -0,0 +1,65 @@
+import json
+
+from agents import rule_engine_agent
+from agents.batcher import pack_batches, route_violations
+from agents.review_cache import ReviewCache
+
+
+def test_packing_stays_within_budget_and_file_limit():
+    items = [(f"f{n}.py", tokens) for n, tokens in enumerate([900, 700, 600, 400, 300, 200, 100, 100])]
+    batches = pack_batches(items, budget=1000, max_files=3)
+    assert sorted(item for batch in batches for item in batch) == sorted(items)
+    assert all(sum(tokens for _, tokens in batch) <= 1000 and len(batch) <= 3 for batch in batches)
+    assert len(batches) == 4
+
+
+def test_packing_keeps_filenames_unique_per_batch():
+    batches = pack_batches([("a/x.py", 10), ("a/x.py", 10), ("y.py", 10)], budget=1000)
+    assert all(len({name for name, _ in batch}) == len(batch) for batch in batches)
+
+
+def test_violations_are_routed_by_filename_or_basename():
+    routed = route_violations([{"filename": "a.py", "line": 1}, {"filename": "src/b.py", "line": 2},
+                               {"filename": "b.py", "line": 3}], ["a.py", "src/b.py"])
+    assert [v["line"] for v in routed["a.py"]] == [1]
+    assert [(v["filename"], v["line"]) for v in routed["src/b.py"]] == [("src/b.py", 2), ("src/b.py", 3)]
+    assert route_violations([{"filename": "c.py", "line": 1}], ["a.py"]) is None
+
+
+def test_unroutable_reply_splits_the_batch_and_caches_apart(tmp_path, monkeypatch, run):
+    cache = ReviewCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(rule_engine_agent, "get_review_cache", lambda: cache)
+    prompts = []
+
+    async def respond(prompt, filename="unknown", **kwargs):
+        prompts.append(filename)
+        if filename == "batch[a.py, b.py, c.py]":
+            return json.dumps([{"filename": "elsewhere.py", "line": 1, "issue": "?", "severity": 2}])
+        names = [name for name in ("a.py", "b.py", "c.py") if name in filename]
+        return json.dumps([{"filename": name, "line": 1, "issue": f"Issue in {name}", "severity": 2}
+                           for name in names])
+
+    monkeypatch.setattr(rule_engine_agent, "get_llm_response_async", respond)
+    files = [("a.py", "x = 1\n"), ("b.py", "y = 2\n"), ("c.py", "z = 3\n")]
+    results = run(rule_engine_agent.get_violations_for_batch(files))
+
+    assert prompts == ["batch[a.py, b.py, c.py]", "a.py", "batch[b.py, c.py]"]
+    for name, _ in files:
+        assert [v["issue"] for v in json.loads(results[name])] == [f"Issue in {name}"]
+    # a.py was reviewed on its own; the batch answers for b.py and c.py do not
+    # pass for whole-file reviews but still answer the next batch
+    assert rule_engine_agent.cached_review("x = 1\n", "a.py") is not None
+    assert rule_engine_agent.cached_review("y = 2\n", "b.py") is None
+    run(rule_engine_agent.get_violations_for_batch(files))
+    assert len(prompts) == 3
+    cache.close()
+
+
+def test_colliding_basenames_are_packed_apart_and_never_guessed():
+    batches = pack_batches([("a/utils.py", 10), ("b/utils.py", 10), ("c.py", 10)], budget=1000)
+    assert all(len({name.rsplit("/", 1)[-1] for name, _ in batch}) == len(batch) for batch in batches)
+
+    both = ["a/utils.py", "b/utils.py"]
+    assert route_violations([{"filename": "utils.py", "line": 1}], both) is None
+    routed = route_violations([{"filename": "b/utils.py", "line": 1}], both)
+    assert routed == {"a/utils.py": [], "b/utils.py": [{"filename": "b/utils.py", "line": 1}]}
@@ -0,0 +1,82 @@
+import ast
+import json
+
+from agents.chunker import merge_chunk_results, split_into_chunks
+
+BUDGET = 60
+
+
+def _python_source() -> str:
+    parts = ["import os\n"]
+    for n in range(6):
+        parts.append(f"@decorate\ndef func_{n}(x):\n    y = x + {n}\n    # marker func_{n}\n    return y\n")
+        parts.append(f"class Thing{n}:\n    def a(self):\n        return {n}\n\n    def b(self):\n"
+                     f"        # marker Thing{n}\n        return self.a()\n")
+    return "\n".join(parts)
+
+
+def _java_source() -> str:
+    methods = [f"    public int m{n}(int x) {{\n        if (x > {n}) {{\n            return x; // marker m{n}\n"
+               f"        }}\n        return \"}}\".length();\n    }}\n" for n in range(8)]
+    return "package demo;\n\npublic class Demo {\n" + "\n".join(methods) + "}\n"
+
+
+def _chunk_of(chunks: list, line: int) -> int:
+    # Chunks are joined with "\n", so a chunk may end in blank lines
+    return next(i for i, (start, text) in enumerate(chunks) if start <= line < start + len(text.split("\n")))
+
+
+def _assert_rejoins(code: str, chunks: list):
+    assert "\n".join(text for _, text in chunks) == "\n".join(code.splitlines())
+    assert [start for start, _ in chunks] == sorted({start for start, _ in chunks})
+    lines = code.splitlines()
+    for start, text in chunks:
+        assert text.split("\n") == lines[start - 1:start - 1 + len(text.split("\n"))]
+
+
+def test_python_chunks_never_split_a_definition():
+    code = _python_source()
+    chunks = split_into_chunks(code, "python", BUDGET)
+    assert len(chunks) > 3
+    _assert_rejoins(code, chunks)
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            assert _chunk_of(chunks, first) == _chunk_of(chunks, node.end_lineno), node.name
+
+
+def test_java_chunks_never_split_a_method():
+    code = _java_source()
+    chunks = split_into_chunks(code, "java", BUDGET)
+    assert len(chunks) > 3
+    _assert_rejoins(code, chunks)
+    lines = code.splitlines()
+    for n in range(8):
+        first = lines.index(f"    public int m{n}(int x) {{") + 1
+        last = next(i for i in range(first, len(lines)) if lines[i] == "    }") + 1
+        assert _chunk_of(chunks, first) == _chunk_of(chunks, last), f"m{n}"
+
+
+def test_merged_lines_match_the_original_file():
+    for code, language in ((_python_source(), "python"), (_java_source(), "java")):
+        lines = code.splitlines()
+        chunks = split_into_chunks(code, language, BUDGET)
+        replies = []
+        for start, text in chunks:
+            found = [{"line": n, "issue": line.split("marker ")[1]}
+                     for n, line in enumerate(text.split("\n"), start=1) if "marker" in line]
+            replies.append((start, json.dumps(found)))
+        merged = json.loads(merge_chunk_results(replies))
+        assert merged and all(lines[v["line"] - 1].endswith("marker " + v["issue"]) for v in merged)
+        assert [v["line"] for v in merged] == sorted(v["line"] for v in merged)
+
+
+def test_merge_drops_duplicates_by_line_and_normalized_issue():
+    replies = [
+        (1, json.dumps([{"line": 3, "issue": "Missing docstring"}, {"line": 0, "issue": "File too long"}])),
+        (1, json.dumps([{"line": 3, "issue": "  missing   DOCSTRING "}, {"line": 3, "issue": "Bad name"}])),
+        (11, json.dumps([{"line": 0, "issue": "file too long"}, {"line": 2, "issue": "Missing docstring"}])),
+        (20, "not json"),
+    ]
+    merged = [(v["line"], v["issue"]) for v in json.loads(merge_chunk_results(replies))]
+    assert merged == [(0, "File too long"), (3, "Missing docstring"), (3, "Bad name"), (12, "Missing docstring")]
@@ -0,0 +1,58 @@
+import subprocess
+
+import pytest
+
+from agents.diff_agent import git_changed_lines, parse_unified_diff
+
+
+def test_marker_like_lines_inside_a_hunk_are_content():
+    diff = (
+        "diff --git a/notes.md b/notes.md\n"
+        "--- a/notes.md\n"
+        "+++ b/notes.md\n"
+        "@@ -1,3 +1,3 @@\n"
+        " intro\n"
+        "--- old rule\n"
+        "+++ new rule\n"
+        " outro\n"
+        "--- a/app.py\n"
+        "+++ b/app.py\n"
+        "@@ -10,0 +11,2 @@\n"
+        "+x = 1\n"
+        "+y = 2\n"
+        "@@ -20 +21,0 @@\n"
+        "-gone = True\n"
+    )
+    assert parse_unified_diff(diff) == {"notes.md": [2], "app.py": [11, 12, 21]}
+
+
+def test_deleted_file_hunks_are_skipped():
+    diff = (
+        "--- a/old.py\n"
+        "+++ /dev/null\n"
+        "@@ -1,2 +0,0 @@\n"
+        "-+++ b/fake.py\n"
+        "-x = 1\n"
+    )
+    assert parse_unified_diff(diff) == {}
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=True,
+                   capture_output=True)
+
+
+def test_head_ref_must_match_the_working_tree(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "app.py").write_text("a = 1\n")
+    _git(tmp_path, "add", "app.py")
+    _git(tmp_path, "commit", "-qm", "base")
+    (tmp_path / "app.py").write_text("a = 1\nb = 2\n")
+    _git(tmp_path, "commit", "-qam", "head")
+
+    expected = {str(tmp_path / "app.py"): [2]}
+    assert git_changed_lines("HEAD~1", "HEAD", cwd=str(tmp_path)) == expected
+    (tmp_path / "app.py").write_text("# moved\na = 1\nb = 2\n")
+    with pytest.raises(ValueError, match="app.py"):
+        git_changed_lines("HEAD~1", "HEAD", cwd=str(tmp_path))
+    assert git_changed_lines("HEAD~1", cwd=str(tmp_path)) == {str(tmp_path / "app.py"): [1, 3]}
@@ -0,0 +1,37 @@
+import os
+import time
+
+from agents.discovery import FileDiscovery, MTIME_SLACK_NS
+
+
+def test_file_edited_in_place_is_reclassified(tmp_path):
+    root = tmp_path / "src"
+    root.mkdir()
+    source = root / "app.py"
+    source.write_text("x = 1\n")
+    index = str(tmp_path / "index.json")
+    # Age the directory past the slack window so the next scan reuses its listing
+    old = time.time_ns() - 2 * MTIME_SLACK_NS
+    os.utime(root, ns=(old, old))
+    assert [path for path, _ in FileDiscovery(str(root), index_path=index).scan()] == [str(source)]
+
+    source.write_text("# @generated by protoc\nx = 1\n")
+    os.utime(root, ns=(old, old))
+    discovery = FileDiscovery(str(root), index_path=index)
+    assert discovery.scan() == []
+    assert discovery.stats["dirs_reused"] == 1
+    assert discovery.stats["files_changed_in_place"] == 1
+    assert discovery.stats["skipped"] == {"generated": 1}
+
+
+def test_defaults_keep_project_folders_and_read_the_roots_ignore_file(tmp_path):
+    for rel in ("unit/a.py", "lib/b.py", "build/c.py"):
+        (tmp_path / rel).parent.mkdir(exist_ok=True)
+        (tmp_path / rel).write_text("x = 1\n")
+    index = str(tmp_path / ".reviewbot" / "index.json")
+    found = sorted(os.path.relpath(p, tmp_path) for p, _ in FileDiscovery(str(tmp_path), index_path=index).scan())
+    assert found == ["lib/b.py", "unit/a.py"]
+
+    (tmp_path / ".reviewbotignore").write_text("/unit/\n")
+    found = [os.path.relpath(p, tmp_path) for p, _ in FileDiscovery(str(tmp_path), index_path=index).scan()]
+    assert found == ["lib/b.py"]
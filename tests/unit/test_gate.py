@@ -0,0 +1,101 @@
+import io
+import json
+import time
+import asyncio
+
+import pytest
+
+from agents import gate
+from agents.llm_agent import LLM_FAILURE_ISSUE
+
+
+def test_history_is_keyed_by_relative_path(tmp_path):
+    for folder in ("api", "web"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "utils.py").write_text("x = 1\n")
+    history = {"api/utils.py": {"reviews": 1, "violations": 5, "max_severity": 9}}
+
+    def score(folder):
+        path = str(tmp_path / folder / "utils.py")
+        return gate.risk_score(path, 6, history, 8, True, time.time(), root=str(tmp_path))
+
+    assert gate.history_key(str(tmp_path / "api" / "utils.py"), str(tmp_path)) == "api/utils.py"
+    assert score("api") - score("web") == pytest.approx(4 * 5 + 30)
+
+
+def test_cache_is_only_peeked_for_files_with_blocking_history(tmp_path, monkeypatch):
+    peeked = []
+    monkeypatch.setattr(gate, "cached_review", lambda code, key: peeked.append(key) or '[{"severity": 9}]')
+    for name in ("risky.py", "clean.py", "new.py"):
+        (tmp_path / name).write_text("x = 1\n")
+    history = {
+        "risky.py": {"reviews": 1, "violations": 1, "max_severity": 9},
+        "clean.py": {"reviews": 2, "violations": 1, "max_severity": 3},
+    }
+    scores = {name: gate.risk_score(str(tmp_path / name), 6, history, 8, False, time.time(), root=str(tmp_path))
+              for name in ("risky.py", "clean.py", "new.py")}
+    assert peeked == ["risky.py"]
+    assert scores["risky.py"] > 1000 > max(scores["clean.py"], scores["new.py"])
+
+
+def _gate_files(tmp_path, names):
+    for name in names:
+        (tmp_path / name).write_text("x = 1\n")
+    return [(str(tmp_path / name), 0.0) for name in names]
+
+
+def _stub_reviews(monkeypatch, replies: dict, slow: float = 30):
+    """
+    replies maps a file name to its violations; "slow" files sleep first.
+    Returns the names whose reviews ran to completion.
+    """
+    finished = []
+
+    async def review(code, filename, changed_lines=None, on_violation=None):
+        if filename.startswith("slow"):
+            await asyncio.sleep(slow)
+        for v in replies.get(filename, []):
+            on_violation(v)
+        finished.append(filename)
+        return json.dumps(replies.get(filename, []))
+    monkeypatch.setattr(gate, "get_violations_from_llm", review)
+    return finished
+
+
+def test_first_blocking_finding_cancels_outstanding_reviews(tmp_path, monkeypatch, run):
+    finished = _stub_reviews(monkeypatch, {"bad.py": [{"line": 1, "issue": "SQL injection", "severity": 9}]})
+    ordered = _gate_files(tmp_path, ["slow.py", "bad.py"])
+    out = io.StringIO()
+
+    start = time.monotonic()
+    result = run(gate.Gate(threshold=8, out=out, root=str(tmp_path)).run(ordered))
+
+    assert time.monotonic() - start < 5
+    assert finished == ["bad.py"]
+    assert result["verdict"] == "blocked" and gate.exit_code(result) == gate.EXIT_BLOCKED
+    assert (result["reviewed"], result["skipped"]) == (1, 1)
+    assert [v["issue"] for v in result["blocking"]] == ["SQL injection"]
+    assert "BLOCKING 9" in out.getvalue()
+
+
+def test_without_cancel_every_review_finishes(tmp_path, monkeypatch, run):
+    finished = _stub_reviews(monkeypatch, {"bad.py": [{"line": 1, "issue": "Leak", "severity": 8}]}, slow=0.05)
+    ordered = _gate_files(tmp_path, ["slow.py", "bad.py"])
+    result = run(gate.Gate(threshold=8, cancel_on_block=False, out=io.StringIO(), root=str(tmp_path)).run(ordered))
+    assert sorted(finished) == ["bad.py", "slow.py"]
+    assert result["verdict"] == "blocked" and (result["reviewed"], result["skipped"]) == (2, 0)
+
+
+def test_pass_and_incomplete_verdicts(tmp_path, monkeypatch, run):
+    _stub_reviews(monkeypatch, {
+        "minor.py": [{"line": 1, "issue": "Naming", "severity": 7}],
+        "broken.py": [{"line": 0, "issue": LLM_FAILURE_ISSUE, "severity": 10}],
+    })
+    passed = run(gate.Gate(threshold=8, out=io.StringIO(), root=str(tmp_path)).run(
+        _gate_files(tmp_path, ["minor.py"])))
+    assert passed["verdict"] == "pass" and gate.exit_code(passed) == gate.EXIT_PASS
+
+    incomplete = run(gate.Gate(threshold=8, out=io.StringIO(), root=str(tmp_path)).run(
+        _gate_files(tmp_path, ["minor.py", "broken.py"])))
+    assert incomplete["verdict"] == "incomplete" and gate.exit_code(incomplete) == gate.EXIT_INCOMPLETE
+    assert incomplete["failed"] == [str(tmp_path / "broken.py")] and incomplete["blocking"] == []
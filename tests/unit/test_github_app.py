@@ -0,0 +1,52 @@
+import asyncio
+
+from auth import github_app
+from agents.http_client import get_http_client
+
+
+def test_concurrent_callers_share_one_refresh(github, app_auth, run):
+    github.token_latency = 0.2
+
+    async def many():
+        return await asyncio.gather(*(github_app.get_installation_token(1) for _ in range(10)))
+
+    tokens = run(many())
+    assert len(set(tokens)) == 1
+    assert github.token_requests[1] == 1
+    assert app_auth.stats()["refreshes"] == 1
+
+
+def test_token_is_refreshed_near_expiry(github, app_auth, run):
+    github.token_ttl = 60
+    app_auth.refresh_margin = 30
+    first = run(github_app.get_installation_token(1))
+    assert run(github_app.get_installation_token(1)) == first
+
+    app_auth.refresh_margin = 120  # the cached token is now inside the margin
+    assert run(github_app.get_installation_token(1)) != first
+    assert github.token_requests[1] == 2
+
+
+def test_invalidate_only_drops_the_rejected_token(github, app_auth, run):
+    token = run(github_app.get_installation_token(1))
+    app_auth.invalidate(1, "some-older-token")
+    assert run(github_app.get_installation_token(1)) == token
+    app_auth.invalidate(1, token)
+    assert run(github_app.get_installation_token(1)) != token
+
+
+def test_revoked_token_is_replaced_and_the_request_retried_once(github, app_auth, run):
+    github.add_pull("octo/repo", 7, {"a.py": "x = 1\n"})
+    revoked = run(github_app.get_installation_token(1))
+    del github.tokens[revoked]
+    seen = []
+
+    async def send(token):
+        seen.append(token)
+        return await get_http_client().get(f"{github.url}/repos/octo/repo/pulls/7/files",
+                                           headers={"Authorization": f"Bearer {token}"})
+
+    response = run(github_app.with_installation_token(1, send))
+    assert response.status_code == 200
+    assert len(seen) == 2 and seen[0] == revoked
+    assert github.token_requests[1] == 2
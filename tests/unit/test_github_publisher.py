@@ -0,0 +1,99 @@
+import pytest
+
+from agents import github_publisher
+from agents.github_publisher import GitHubPublisher, diff_positions
+from agents.llm_agent import LLM_FAILURE_ISSUE
+
+REPO = "octo/repo"
+CODE = "".join(f"line {n}\n" for n in range(1, 11))
+# Lines 3-5 are in the diff (4 added), everything else is outside it
+PATCH = "@@ -3,2 +3,3 @@\n line 3\n+line 4\n line 5"
+
+
+def _violation(line: int, issue: str, severity: int = 5) -> dict:
+    return {"line": line, "issue": issue, "recommendation": "Fix it.", "severity": severity}
+
+
+@pytest.fixture(autouse=True)
+def empty_etag_cache():
+    github_publisher._etag_cache.clear()
+
+
+def _publisher(github, max_comments: int = 50) -> GitHubPublisher:
+    return GitHubPublisher(REPO, 1, "head", "test-token", api_url=github.url, max_comments=max_comments)
+
+
+def test_diff_positions_count_later_hunk_headers():
+    patch = "@@ -1,2 +1,2 @@\n a\n-b\n+B\n@@ -10,1 +10,2 @@\n j\n+k"
+    # Removed lines have no head line; the second header takes a position of its own
+    assert diff_positions(patch) == {1: 1, 2: 3, 10: 5, 11: 6}
+
+
+def test_publish_places_comments_and_skips_failure_placeholder(github, run):
+    github.add_pull(REPO, 1, {"a.py": CODE}, patches={"a.py": PATCH})
+    files = [{"path": "a.py", "patch": PATCH, "code": CODE, "violations": [
+        _violation(4, "Inside the diff"), _violation(9, "Outside the diff"),
+        _violation(0, LLM_FAILURE_ISSUE, 10),
+    ]}]
+
+    stats = run(_publisher(github).publish(files))
+
+    assert stats["reviews"] == 1 and stats["comments"] == 1 and stats["outside_diff"] == 1
+    assert stats["failed"] == ["a.py"]
+    [comment] = github.review_comments[(REPO, 1)]
+    assert comment["position"] == 2 and "Inside the diff" in comment["body"]
+    [review] = github.reviews[(REPO, 1)]
+    assert "Outside the diff" in review["body"]
+    assert LLM_FAILURE_ISSUE not in review["body"]
+
+
+def test_republish_dedups_by_fingerprint_and_reuses_etags(github, run):
+    github.add_pull(REPO, 1, {"a.py": CODE}, patches={"a.py": PATCH})
+    files = [{"path": "a.py", "patch": PATCH, "code": CODE,
+              "violations": [_violation(4, "Inside the diff"), _violation(9, "Outside the diff")]}]
+
+    first = run(_publisher(github).publish(files))
+    second = run(_publisher(github).publish(files))
+    third = run(_publisher(github).publish(files))
+
+    assert first["reviews"] == 1
+    assert second["reviews"] == 0 and second["duplicates"] == 2
+    # The listings changed after the first post, then stayed the same
+    assert second["not_modified"] == 0
+    assert third["not_modified"] == 2 and github.not_modified == 2
+    assert github.reviews_posted == 1
+
+
+def test_findings_are_batched_by_file_up_to_max_comments(github, run):
+    patch = "@@ -0,0 +1,10 @@\n" + "\n".join(f"+line {n}" for n in range(1, 11))
+    github.add_pull(REPO, 1, {"a.py": CODE, "b.py": CODE}, patches={"a.py": patch, "b.py": patch})
+    files = [
+        {"path": "a.py", "patch": patch, "code": CODE,
+         "violations": [_violation(n, f"Issue {n}") for n in (1, 2, 3)]},
+        {"path": "b.py", "patch": patch, "code": CODE, "violations": [_violation(1, "Issue 1")]},
+    ]
+
+    stats = run(_publisher(github, max_comments=2).publish(files))
+
+    assert stats["reviews"] == 2 and stats["comments"] == 4
+    per_review = {}
+    for comment in github.review_comments[(REPO, 1)]:
+        per_review.setdefault(comment["pull_request_review_id"], []).append(comment["path"])
+    # a.py is split because it alone exceeds the cap; its remainder shares a review with b.py
+    assert sorted(per_review.values()) == [["a.py", "a.py"], ["a.py", "b.py"]]
+
+
+def test_same_issue_on_identical_lines_is_posted_once_per_line(github, run):
+    code = "try:\n    a()\nexcept Exception:\n    pass\ntry:\n    b()\nexcept Exception:\n    pass\n"
+    patch = "@@ -0,0 +1,8 @@\n" + "".join(f"+{line}\n" for line in code.splitlines()).rstrip("\n")
+    github.add_pull(REPO, 1, {"a.py": code}, patches={"a.py": patch})
+    files = [{"path": "a.py", "patch": patch, "code": code, "violations": [
+        _violation(7, "Broad except"), _violation(3, "Broad except"), _violation(3, "Broad  except"),
+    ]}]
+
+    first = run(_publisher(github).publish(files))
+    second = run(_publisher(github).publish(files))
+
+    assert first["comments"] == 2 and first["duplicates"] == 1
+    assert sorted(c["position"] for c in github.review_comments[(REPO, 1)]) == [3, 7]
+    assert second["comments"] == 0 and second["duplicates"] == 3
@@ -0,0 +1,69 @@
+import io
+import shutil
+import subprocess
+
+import pytest
+
+from agents.inline_comment_agent import annotate_file_with_comments, annotate_lines, diff_lines
+
+SYNTAX = ("#", "")
+
+
+def _v(line: int, issue: str = "Issue") -> dict:
+    return {"line": line, "issue": issue, "recommendation": "Fix it.", "severity": 4}
+
+
+def _annotate(source: str, violations: list) -> str:
+    return "".join(annotate_lines(io.StringIO(source, newline=""), violations, SYNTAX))
+
+
+def test_comments_reuse_the_annotated_lines_ending_and_indent():
+    out = _annotate("def f():\r\n    return 1\r\n", [_v(2)])
+    assert out == ("def f():\r\n"
+                   "    # 🚩 Recommendation (Severity 4): Issue\r\n"
+                   "    # 💡 Fix it.\r\n"
+                   "    return 1\r\n")
+
+
+def test_missing_final_newline_is_kept():
+    out = _annotate("a = 1\nb = 2", [_v(2)])
+    assert out.endswith("# 💡 Fix it.\nb = 2")
+
+
+def test_byte_order_mark_stays_first():
+    out = _annotate("\ufeffa = 1\nb = 2\n", [_v(1)])
+    assert out.startswith("\ufeff# 🚩") and out.endswith("a = 1\nb = 2\n")
+    assert out.count("\ufeff") == 1
+
+
+def test_annotated_file_keeps_encoding_and_bytes(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_bytes("x = 1\r\ny = 'é'".encode("utf-16"))
+    path = annotate_file_with_comments(str(source), [_v(2)], output_dir=str(tmp_path / "out"))
+    data = open(path, "rb").read()
+    assert data.startswith(b"\xff\xfe") and data.decode("utf-16").endswith("# 💡 Fix it.\r\ny = 'é'")
+
+
+SOURCES = {
+    "lf": "".join(f"line {n}\n" for n in range(1, 31)),
+    "crlf": "".join(f"line {n}\r\n" for n in range(1, 31)),
+    "no_final_newline": "".join(f"line {n}\n" for n in range(1, 31)).rstrip("\n"),
+    "bom": "\ufeff" + "".join(f"line {n}\n" for n in range(1, 31)),
+}
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("kind", sorted(SOURCES))
+@pytest.mark.parametrize("lines", [[1, 2, 30], [4, 9, 20], [15]])
+def test_diff_applies_to_give_the_annotated_file(tmp_path, kind, lines):
+    source = SOURCES[kind]
+    violations = [_v(n, f"Issue {n}") for n in lines]
+    target = tmp_path / "mod.py"
+    target.write_bytes(source.encode("utf-8"))
+    patch = tmp_path / "mod.diff"
+    patch.write_bytes("".join(diff_lines(io.StringIO(source, newline=""), violations, SYNTAX, "mod.py"))
+                      .encode("utf-8"))
+
+    subprocess.run(["git", "apply", "--whitespace=nowarn", str(patch)], cwd=tmp_path, check=True,
+                   capture_output=True)
+    assert target.read_bytes() == _annotate(source, violations).encode("utf-8")
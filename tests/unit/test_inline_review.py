@@ -0,0 +1,41 @@
+import json
+
+import test_inline_engine as engine
+from agents import gate, tracing
+from agents.llm_agent import LLM_FAILURE_ISSUE
+
+
+def test_failed_llm_reviews_are_reported(tmp_path, monkeypatch, run):
+    for name in ("good.py", "bad.py"):
+        (tmp_path / name).write_text("x = 1\n")
+
+    async def review(code, filename, changed_lines=None):
+        if filename.endswith("bad.py"):
+            return json.dumps([{"filename": filename, "line": 0, "issue": LLM_FAILURE_ISSUE, "severity": 0}])
+        return "[]"
+    monkeypatch.setattr(engine, "get_violations_from_llm", review)
+    monkeypatch.setattr(engine, "BATCHING_ENABLED", False)
+    monkeypatch.setattr(engine, "get_violation_store", lambda: None)
+    monkeypatch.setattr(tracing, "write_telemetry", lambda: [])
+
+    files = [(str(tmp_path / name), 6) for name in ("good.py", "bad.py")]
+    result = run(engine.run_inline_review_on_tests(files=files))
+    assert result["reviewed"] == 2
+    assert result["failed"] == [str(tmp_path / "bad.py")]
+
+
+def test_files_are_reviewed_under_the_gate_history_key(tmp_path, monkeypatch, run):
+    (tmp_path / "api").mkdir()
+    path = tmp_path / "api" / "utils.py"
+    path.write_text("x = 1\n")
+    seen = []
+
+    async def review(code, filename, changed_lines=None):
+        seen.append(filename)
+        return "[]"
+    monkeypatch.setattr(engine, "get_violations_from_llm", review)
+    monkeypatch.setattr(engine, "TEST_FOLDER", str(tmp_path))
+    monkeypatch.setattr(engine, "get_violation_store", lambda: None)
+
+    run(engine.review_file(str(path)))
+    assert seen == [gate.history_key(str(path), str(tmp_path))] == ["api/utils.py"]
@@ -0,0 +1,64 @@
+import pytest
+
+from app import job_queue
+from app.job_queue import JobQueue, CANCELLED, DONE, FAILED, QUEUED, RUNNING
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs.sqlite"))
+    yield q
+    q.close()
+
+
+def test_same_head_is_deduplicated(queue):
+    first = queue.enqueue("o/r", 1, "aaa", installation_id=7)
+    again = queue.enqueue("o/r", 1, "aaa", installation_id=7)
+    other_pr = queue.enqueue("o/r", 2, "aaa", installation_id=7)
+    assert first["deduplicated"] is False and again == {"job_id": first["job_id"], "deduplicated": True,
+                                                         "cancelled": []}
+    assert other_pr["job_id"] != first["job_id"]
+    assert queue.stats()[QUEUED] == 2
+
+
+def test_newer_head_cancels_the_prs_older_jobs(queue):
+    old = queue.enqueue("o/r", 1, "aaa")["job_id"]
+    assert queue.claim()["id"] == old
+    newer = queue.enqueue("o/r", 1, "bbb")
+    other = queue.enqueue("o/r", 2, "ccc")["job_id"]
+    assert newer["cancelled"] == [old]
+    assert queue.enqueue("o/r", 1, "ddd")["cancelled"] == [newer["job_id"]]
+    assert queue.get(old)["status"] == CANCELLED and queue.is_cancelled(old)
+    assert queue.get(other)["status"] == QUEUED
+    # A cancelled job cannot be finished by the worker still holding it
+    assert not queue.complete(old, {"comments": 1})
+    assert queue.get(old)["status"] == CANCELLED
+
+
+def test_closing_a_pr_cancels_its_active_jobs(queue):
+    running = queue.enqueue("o/r", 1, "aaa")["job_id"]
+    queue.claim()
+    queue.complete(running)
+    active = queue.enqueue("o/r", 1, "bbb")["job_id"]
+    assert queue.cancel_pr("o/r", 1) == [active]
+    assert queue.get(running)["status"] == DONE
+    # Reopening with the same head reviews it again
+    assert queue.enqueue("o/r", 1, "bbb") == {"job_id": active, "deduplicated": False, "cancelled": []}
+
+
+def test_claim_takes_the_oldest_queued_job_once(queue):
+    ids = [queue.enqueue("o/r", n, f"sha{n}")["job_id"] for n in (3, 1, 2)]
+    claimed = [queue.claim() for _ in range(4)]
+    assert [job["id"] for job in claimed[:3]] == ids and claimed[3] is None
+    assert all(job["status"] == RUNNING and job["attempts"] == 1 for job in claimed[:3])
+
+
+def test_recover_requeues_running_jobs_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_ATTEMPTS", 2)
+    job_id = queue.enqueue("o/r", 1, "aaa")["job_id"]
+    queue.claim()
+    assert queue.recover() == 1 and queue.get(job_id)["status"] == QUEUED
+    assert queue.claim()["attempts"] == 2
+    assert queue.recover() == 0
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["error"] == "too many attempts"
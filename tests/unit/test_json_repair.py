@@ -0,0 +1,57 @@
+import pytest
+
+from agents.json_repair import repair_violations, validate_violation
+
+V = '{"line": 3, "issue": "Broad except", "recommendation": "Catch ValueError", "severity": 6}'
+
+
+@pytest.mark.parametrize("text", [
+    f"[{V}]",
+    f"```json\n[{V}]\n```",
+    f"Here are the violations:\n[{V}]\nLet me know if you need more.",
+    f"[\n  // the only finding\n  {V}, /* end */\n]",
+    "[" + V[:-1] + ",},]",
+])
+def test_repairable_outputs(text):
+    assert repair_violations(text, "x.py") == [{
+        "filename": "x.py", "line": 3, "issue": "Broad except", "recommendation": "Catch ValueError", "severity": 6,
+    }]
+
+
+def test_comment_markers_and_commas_inside_strings_are_kept():
+    text = '[{"line": 1, "issue": "URL http://a.b/*c*/ is hardcoded, ]", "severity": 2},]'
+    assert repair_violations(text)[0]["issue"] == "URL http://a.b/*c*/ is hardcoded, ]"
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "No violations found.",
+    '{"issue": "not an array"}',
+    '[{"issue": "unterminated", "line": 1',
+    '[{"issue": "a" "line": 1}]',
+])
+def test_unrepairable_outputs(text):
+    assert repair_violations(text) is None
+
+
+@pytest.mark.parametrize("element, expected", [
+    ({"issue": "  Padded  ", "line": "7", "severity": "11"}, {"issue": "Padded", "line": 7, "severity": 10}),
+    ({"issue": "Bad numbers", "line": "n/a", "severity": None}, {"line": 0, "severity": 5}),
+    ({"issue": "Negative", "line": -4, "severity": 0}, {"line": 0, "severity": 1}),
+    ({"issue": "No fix", "recommendation": ""}, {"recommendation": "Consider refactoring."}),
+    ({"issue": "x" * 400, "extra": True}, {"issue": "x" * 150}),
+    ({"issue": "Named", "filename": "other.py"}, {"filename": "other.py"}),
+])
+def test_elements_are_coerced_to_the_schema(element, expected):
+    violation = validate_violation(element, "x.py")
+    assert set(violation) == {"filename", "line", "issue", "recommendation", "severity"}
+    assert {key: violation[key] for key in expected} == expected
+
+
+@pytest.mark.parametrize("element", [None, "text", [1], {"line": 1}, {"issue": "   "}, {"issue": 5}])
+def test_unsalvageable_elements_are_dropped(element):
+    assert validate_violation(element) is None
+
+
+def test_invalid_elements_do_not_discard_the_array():
+    assert [v["issue"] for v in repair_violations(f'[{V}, 1, {{"line": 2}}]')] == ["Broad except"]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from agents.json_repair import clean_json_text
+from agents.json_stream import InvalidStreamError, ViolationStreamParser
+
+TEXT = ('```json\n[\n  {"line": 1, "issue": "Uses \\"eval\\" // unsafe", "severity": 9},\n'
+        '  // second finding\n  {"line": 2, "issue": "Nested {braces} [here]", "meta": {"a": [1, 2]},},\n]\n```')
+
+
+def _feed(parser: ViolationStreamParser, text: str, step: int) -> list:
+    completed = []
+    for i in range(0, len(text), step):
+        completed.extend(parser.feed(text[i:i + step]))
+    return completed
+
+
+@pytest.mark.parametrize("step", [1, 2, 3, 7, len(TEXT)])
+def test_split_anywhere_yields_the_same_objects(step):
+    parser = ViolationStreamParser()
+    completed = _feed(parser, TEXT, step)
+    assert [v["issue"] for v in completed] == ['Uses "eval" // unsafe', "Nested {braces} [here]"]
+    assert parser.done
+    assert json.loads(parser.result()) == completed
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = ViolationStreamParser()
+    assert parser.feed('[{"line": 1, "issue": "a"}, {"line": 2, "iss') == [{"line": 1, "issue": "a"}]
+    assert parser.feed('ue": "b"}]') == [{"line": 2, "issue": "b"}]
+
+
+def test_text_after_the_array_is_ignored():
+    parser = ViolationStreamParser()
+    assert parser.feed('[]\nThat is all. {"not": "parsed"}') == []
+    assert parser.done and parser.result() == "[]"
+
+
+@pytest.mark.parametrize("step", [1, 2, 5])
+def test_block_comments_are_skipped_like_repair_strips_them(step):
+    text = ('[/* findings */ {"line": 1, /* a ** b */ "issue": "keep /* this */"}, /**/\n'
+            '  {"line": 2 /* multi\n line */, "issue": "b"} /* trailing */]')
+    parser = ViolationStreamParser()
+    completed = _feed(parser, text, step)
+    assert completed == json.loads(clean_json_text(text))
+    assert [v["issue"] for v in completed] == ["keep /* this */", "b"]
+
+
+@pytest.mark.parametrize("text", [
+    '{"issue": "object instead of array"}',
+    "x" * 400 + "[]",
+    '[{"line": 1} {"line": 2}]',
+    '[1, 2]',
+    '[{"line": 1},, {"line": 2}]',
+    '[/{"line": 1}]',
+    '[{"line": 1, "issue": "a" "b"}]',
+])
+def test_invalid_streams_abort(text):
+    with pytest.raises(InvalidStreamError):
+        _feed(ViolationStreamParser(), text, 1)
@@ -0,0 +1,106 @@
+import time
+import asyncio
+
+import pytest
+
+from agents import backends
+from agents.backends import MockBackend, backends_from_spec
+from agents.llm_errors import LLMCircuitOpenError, LLMServerError
+from agents.llm_router import LLMRouter
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(backends, "BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(backends, "BREAKER_COOLDOWN", 0.1)
+
+
+def failing(prompt):
+    return None
+
+
+def test_failover_to_the_next_backend():
+    router = LLMRouter([MockBackend("a", responder=failing), MockBackend("b", responder=lambda p: "[b]")],
+                       hedge_percentile=0)
+    assert asyncio.run(router.generate("prompt")) == "[b]"
+    assert router.failovers == 1
+
+
+def test_slow_request_is_hedged_on_a_second_backend():
+    slow = MockBackend("slow", responder=lambda p: "[slow]", latency=1.0)
+    fast = MockBackend("fast", responder=lambda p: "[fast]")
+    # slow has the better history, so it is picked first
+    slow.latencies.extend([0.01] * 5)
+    fast.latencies.extend([0.02] * 5)
+    router = LLMRouter([slow, fast], hedge_percentile=0.5, hedge_min_samples=10)
+
+    started = time.monotonic()
+    assert asyncio.run(router.generate("prompt")) == "[fast]"
+    assert time.monotonic() - started < 0.5
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+
+
+def test_breaker_opens_then_admits_a_single_probe(breaker):
+    backend = MockBackend("a", responder=failing)
+
+    async def fail_twice():
+        for _ in range(2):
+            with pytest.raises(LLMServerError):
+                await backend.generate("prompt")
+    asyncio.run(fail_twice())
+    assert not backend.is_available()
+    with pytest.raises(LLMCircuitOpenError):
+        asyncio.run(backend.generate("prompt"))
+
+    time.sleep(0.15)
+    assert backend.is_available()
+    backend.responder = lambda p: "[]"
+    backend.latency = 0.05
+
+    async def two_callers():
+        return await asyncio.gather(backend.generate("probe"), backend.generate("second"), return_exceptions=True)
+    probe, second = asyncio.run(two_callers())
+    assert probe == "[]"
+    assert isinstance(second, LLMCircuitOpenError)
+    assert backend.is_available() and not backend.open_until
+
+
+def test_failed_probe_reopens_the_circuit(breaker):
+    backend = MockBackend("a", responder=failing)
+
+    async def fail(times):
+        for _ in range(times):
+            with pytest.raises(LLMServerError):
+                await backend.generate("prompt")
+    asyncio.run(fail(2))
+    time.sleep(0.15)
+    asyncio.run(fail(1))
+    assert not backend.is_available()
+    assert backend.stats()["circuit_open"]
+
+
+def test_mock_latency_has_its_own_field():
+    mock, = backends_from_spec("mock|||2|0.25")
+    assert (mock.latency, mock.max_concurrency) == (0.25, 2)
+
+
+def test_cancelling_during_the_hedge_delay_cancels_the_request():
+    slow = MockBackend("slow", latency=5.0)
+    other = MockBackend("other")
+    slow.latencies.extend([0.01] * 5)
+    other.latencies.extend([0.02] * 5)
+    router = LLMRouter([slow, other], hedge_percentile=0.99, hedge_min_samples=10)
+    slow.latencies.append(1.0)  # hedge delay of about a second
+
+    async def cancel_early():
+        caller = asyncio.create_task(router.generate("prompt"))
+        await asyncio.sleep(0.05)
+        assert slow.in_flight == 1
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return slow.in_flight
+
+    assert asyncio.run(cancel_early()) == 0
+    assert router.hedges == 0
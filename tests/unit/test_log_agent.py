@@ -0,0 +1,95 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+from agents import log_agent
+from agents.log_agent import EventLog
+
+
+def test_events_logged_during_flushes_are_not_lost(tmp_path):
+    log = EventLog(str(tmp_path / "events.jsonl"))
+    done = threading.Event()
+
+    def flusher():
+        while not done.is_set():
+            log.flush()
+
+    thread = threading.Thread(target=flusher)
+    thread.start()
+    for n in range(20000):
+        log.log({"n": n})
+    done.set()
+    thread.join()
+    log.flush()
+
+    assert sum(1 for _ in log.events()) == 20000
+
+
+def test_age_rotation_uses_the_file_not_the_process_start(tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    old = (datetime.utcnow() - timedelta(days=2)).isoformat()
+    path.write_text(json.dumps({"timestamp": old, "key": "k", "status": "success"}) + "\n")
+    monkeypatch.setattr(log_agent, "EVENT_LOG_MAX_AGE", 24 * 3600)
+
+    # A fresh process (new EventLog) still rotates a file started two days ago
+    log = EventLog(str(path))
+    log.log({"timestamp": datetime.utcnow().isoformat(), "key": "k", "status": "success"})
+    log.flush()
+
+    files = log.files()
+    assert len(files) == 2
+    with open(files[-1]) as f:
+        assert len(f.readlines()) == 1
+
+
+def test_young_file_is_not_rotated(tmp_path):
+    log = EventLog(str(tmp_path / "events.jsonl"))
+    for _ in range(2):
+        log.log({"timestamp": datetime.utcnow().isoformat()})
+        log.flush()
+    assert log.files() == [str(tmp_path / "events.jsonl")]
+
+
+def test_batch_flushes_are_tracked_and_awaited_on_close(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_agent, "EVENT_LOG_BATCH", 2)
+    log = EventLog(str(tmp_path / "events.jsonl"))
+
+    async def main():
+        for n in range(4):
+            log.log({"n": n})
+        assert log._flushes
+        await log.aclose()
+        assert not log._flushes
+
+    asyncio.run(main())
+    assert sum(1 for _ in log.events()) == 4
+
+
+def test_only_one_batch_flush_is_pending_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_agent, "EVENT_LOG_BATCH", 2)
+    log = EventLog(str(tmp_path / "events.jsonl"))
+
+    async def main():
+        for n in range(10):
+            log.log({"n": n})
+        assert len(log._flushes) == 1
+        await log.aclose()
+
+    asyncio.run(main())
+    assert sum(1 for _ in log.events()) == 10
+
+
+def test_rotation_tolerates_backups_pruned_by_another_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_agent, "EVENT_LOG_MAX_BYTES", 1)
+    monkeypatch.setattr(log_agent, "EVENT_LOG_BACKUPS", 0)
+    log = EventLog(str(tmp_path / "events.jsonl"))
+    log.log({"n": 0})
+    log.flush()
+    stale = tmp_path / "events.20000101T000000000000.jsonl"
+    files = log.files
+    # Another process removes the backup between listing and pruning
+    monkeypatch.setattr(log, "files", lambda: [str(stale)] + files())
+    log.log({"n": 1})
+    log.flush()
+    assert [json.loads(line)["n"] for line in open(log.path)] == [1]
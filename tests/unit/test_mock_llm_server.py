@@ -0,0 +1,18 @@
+from tools.mock_llm_server import MockConfig, MockLLMServer
+
+PROMPTS = [f"Filename: f{i}.py\nx = {i}" for i in range(20)]
+
+
+def outcomes(order):
+    server = MockLLMServer(MockConfig(failure_rate=0.3, malformed_rate=0.3, seed=7))
+    return {prompt: server._reply(prompt, server._rng_for(prompt)) for prompt in order}
+
+
+def test_outcomes_do_not_depend_on_arrival_order():
+    assert outcomes(PROMPTS) == outcomes(list(reversed(PROMPTS)))
+
+
+def test_retried_prompt_draws_again():
+    server = MockLLMServer(MockConfig(failure_rate=0.5, seed=7))
+    statuses = {server._reply(PROMPTS[0], server._rng_for(PROMPTS[0]))[0] for _ in range(20)}
+    assert statuses == {200, 500}
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from agents import rule_engine_agent
+from agents.llm_agent import LLM_FAILURE_ISSUE
+from agents.review_cache import ReviewCache, make_cache_key
+
+
+def test_running_total_tracks_replacements_and_eviction(tmp_path):
+    cache = ReviewCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    cache.put("a", "1234")
+    cache.put("a", "12")
+    cache.put("b", "1234")
+    assert cache._total == 6 and cache.evictions == 0
+
+    cache.get("a")  # b is now least recently used
+    cache.put("c", "123456")
+    assert cache.peek("b") is None and cache.peek("a") == "12"
+    assert cache._total == 8 == cache.stats()["bytes"]
+    cache.close()
+
+
+class _Router:
+    def __init__(self, signature: str):
+        self.signature = signature
+
+    def model_signature(self) -> str:
+        return self.signature
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """
+    Routes reviews through a fresh cache to a stub LLM; returns the list of
+    filenames the stub was asked about.
+    """
+    cache = ReviewCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(rule_engine_agent, "get_review_cache", lambda: cache)
+    monkeypatch.setattr(rule_engine_agent, "get_router", lambda: _Router("llama3"))
+    calls = []
+
+    async def respond(prompt, filename="unknown", **kwargs):
+        calls.append(filename)
+        if filename.startswith("broken"):
+            return json.dumps([{"filename": filename, "line": 0, "issue": LLM_FAILURE_ISSUE, "severity": 0}])
+        return json.dumps([{"filename": filename, "line": 1, "issue": "Found", "severity": 3}])
+    monkeypatch.setattr(rule_engine_agent, "get_llm_response_async", respond)
+    yield calls
+    cache.close()
+
+
+CODE = "x = 1\n"
+
+
+def test_hit_skips_the_llm_even_under_another_name(llm, run):
+    first = json.loads(run(rule_engine_agent.get_violations_from_llm(CODE, "a.py")))
+    second = json.loads(run(rule_engine_agent.get_violations_from_llm(CODE, "b.py")))
+    assert llm == ["a.py"]
+    assert [v["issue"] for v in first] == [v["issue"] for v in second] == ["Found"]
+    assert second[0]["filename"] == "b.py"
+
+
+@pytest.mark.parametrize("change", ["code", "language", "prompt", "model"])
+def test_any_key_part_changing_misses(llm, change, monkeypatch, run):
+    run(rule_engine_agent.get_violations_from_llm(CODE, "a.py"))
+    code, filename = CODE, "a.py"
+    if change == "code":
+        code = "x = 2\n"
+    elif change == "language":
+        filename = "A.java"
+    elif change == "prompt":
+        monkeypatch.setattr(rule_engine_agent, "PROMPT_VERSION", "other-prompt")
+    else:
+        monkeypatch.setattr(rule_engine_agent, "get_router", lambda: _Router("llama3+mistral"))
+    run(rule_engine_agent.get_violations_from_llm(code, filename))
+    assert llm == ["a.py", filename]
+
+
+def test_failure_placeholder_is_never_cached(llm, run):
+    for _ in range(2):
+        run(rule_engine_agent.get_violations_from_llm(CODE, "broken.py"))
+    assert llm == ["broken.py", "broken.py"]
+    assert not rule_engine_agent._is_cacheable(
+        json.dumps([{"line": 0, "issue": LLM_FAILURE_ISSUE, "severity": 0}]))
+    assert not rule_engine_agent._is_cacheable("not json") and not rule_engine_agent._is_cacheable("{}")
+    assert rule_engine_agent._is_cacheable("[]")
+
+
+def test_review_variants_do_not_collide():
+    version = rule_engine_agent.PROMPT_VERSION
+    keys = {make_cache_key(CODE, "python", version + variant, "llama3") for variant in ("", "/diff", "/chunk", "/batch")}
+    assert len(keys) == 4
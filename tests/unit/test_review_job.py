@@ -0,0 +1,63 @@
+import json
+import asyncio
+
+import pytest
+
+from app import review_job
+from agents.llm_errors import get_retry_budget
+
+REPO = "octo/repo"
+
+
+@pytest.fixture
+def pull(github, app_auth, monkeypatch):
+    github.add_pull(REPO, 7, {"a.py": "x = 1\n", "b.py": "y = 2\n"})
+    monkeypatch.setattr(review_job, "GITHUB_API_URL", github.url)
+    monkeypatch.setattr(review_job, "SERVICE_PUBLISH", False)
+    return {"repo": REPO, "pr_number": 7, "head_sha": "head", "installation_id": 1}
+
+
+def test_job_fails_when_a_file_review_raises(pull, monkeypatch, run):
+    async def review(code, filename, changed_lines=None):
+        if filename == "b.py":
+            raise ValueError("backend exploded")
+        return "[]"
+    monkeypatch.setattr(review_job, "get_violations_from_llm", review)
+
+    with pytest.raises(RuntimeError, match="1 of 2 file review"):
+        run(review_job.run_review_job(pull))
+
+
+def test_each_job_gets_its_own_retry_budget(pull, monkeypatch, run):
+    budgets = []
+
+    async def review(code, filename, changed_lines=None):
+        budget = get_retry_budget()
+        budget.record_request()
+        budgets.append(budget)
+        return json.dumps([])
+    monkeypatch.setattr(review_job, "get_violations_from_llm", review)
+
+    async def two_jobs():
+        return await asyncio.gather(asyncio.create_task(review_job.run_review_job(pull)),
+                                    asyncio.create_task(review_job.run_review_job(pull)))
+
+    first, second = run(two_jobs())
+    assert len({id(b) for b in budgets}) == 2
+    assert first["retry_budget"]["requests"] == 2 and second["retry_budget"]["requests"] == 2
+    assert first["failed"] == []
+
+
+def test_job_retries_with_a_fresh_token_after_a_401(pull, github, app_auth, monkeypatch, run):
+    async def review(code, filename, changed_lines=None):
+        return "[]"
+    monkeypatch.setattr(review_job, "get_violations_from_llm", review)
+
+    run(review_job.run_review_job(pull))
+    revoked = app_auth._tokens[1][0]
+    del github.tokens[revoked]
+
+    result = run(review_job.run_review_job(pull))
+    assert result["failed"] == []
+    assert github.token_requests[1] == 2
+    assert app_auth._tokens[1][0] != revoked
@@ -0,0 +1,49 @@
+from agents import scheduler
+from agents.scheduler import ReviewScheduler, report_backpressure
+
+
+def test_window_shrinks_on_backpressure_and_grows_on_success(monkeypatch, run):
+    monkeypatch.setattr(scheduler, "REVIEW_DECREASE_COOLDOWN", 0)
+    limits = []
+
+    async def handler(item):
+        report_backpressure("429")
+        limits.append(int(sched.limit))
+
+    sched = ReviewScheduler(handler, max_workers=4, min_workers=1, target_latency=60)
+    run(sched.run([("only", 1)]))
+    assert limits == [2] and sched.backpressure_events == 1
+    # The finished job counted as a success: additive increase of 1/limit
+    assert sched.limit == 2.5
+
+    for _ in range(8):
+        sched._adjust(0.1, True)
+    assert sched.limit == 4
+
+
+def test_jobs_are_dequeued_largest_first(run):
+    order = []
+
+    async def handler(item):
+        order.append(item)
+        return item
+
+    sched = ReviewScheduler(handler, max_workers=1)
+    results = run(sched.run([("small", 10), ("large", 300), ("medium", 50)]))
+    assert order == results == ["large", "medium", "small"]
+
+
+def test_raised_exception_is_counted_as_a_failure(monkeypatch, run):
+    monkeypatch.setattr(scheduler, "REVIEW_DECREASE_COOLDOWN", 0)
+
+    async def handler(item):
+        if item == "bad":
+            raise ValueError("boom")
+        return item
+
+    sched = ReviewScheduler(handler, max_workers=2)
+    results = run(sched.run([("good", 2), ("bad", 1)]))
+    assert results == ["good", None]
+    assert sched.failures == 1 and sched.completed == 2
+    # A failed job shrinks the window like backpressure does
+    assert sched.limit < 2
@@ -0,0 +1,21 @@
+from agents.discovery import DISCOVERY_EXCLUDE, IgnoreRules
+from app.review_job import SERVICE_EXCLUDE
+
+PR_PATHS = ["app/reports/views.py", "services/target/Main.java", ".github/scripts/x.py", "build/gen.py"]
+
+
+def test_service_reviews_every_path_by_default():
+    assert not [path for path in PR_PATHS if SERVICE_EXCLUDE.ignored_path(path)]
+
+
+def test_local_defaults_still_exclude_output_folders():
+    rules = IgnoreRules(DISCOVERY_EXCLUDE)
+    assert rules.ignored_path("reports/x_review.md")
+    assert rules.ignored_path("annotated/sample.py")
+
+
+def test_service_exclude_patterns():
+    rules = IgnoreRules(["vendor/", "*_pb2.py"])
+    assert rules.ignored_path("third/vendor/lib.py")
+    assert rules.ignored_path("proto/api_pb2.py")
+    assert not rules.ignored_path("app/reports/views.py")
@@ -0,0 +1,69 @@
+import json
+import random
+
+import pytest
+
+import test_inline_engine as engine
+from agents import sharding, tracing
+
+FILES = [(f"/repo/pkg{n % 4}/mod{n}.py", (n * 7919) % 5000 + 1) for n in range(40)]
+
+
+@pytest.mark.parametrize("strategy", ["hash", "size"])
+def test_shards_are_disjoint_cover_every_file_and_are_stable(strategy):
+    shards = sharding.assign_shards(FILES, 3, strategy, root="/repo")
+    assigned = [item for shard in shards for item in shard]
+    assert sorted(assigned) == sorted(FILES)
+    assert len(set(assigned)) == len(FILES)
+
+    # Another machine lists the files in another order under another checkout path
+    moved = [(path.replace("/repo", "/ci/work"), size) for path, size in FILES]
+    random.Random(1).shuffle(moved)
+    again = sharding.assign_shards(moved, 3, strategy, root="/ci/work")
+    assert [sorted(p.replace("/repo", "") for p, _ in s) for s in shards] == \
+           [sorted(p.replace("/ci/work", "") for p, _ in s) for s in again]
+
+
+def test_size_shards_are_balanced():
+    loads = [sum(size for _, size in shard) for shard in sharding.assign_shards(FILES, 3, "size")]
+    assert max(loads) - min(loads) <= max(size for _, size in FILES)
+
+
+def test_merged_shards_match_a_single_process_run(tmp_path, monkeypatch, run):
+    root = tmp_path / "src"
+    for n in range(9):
+        (root / f"pkg{n % 3}").mkdir(parents=True, exist_ok=True)
+        (root / f"pkg{n % 3}" / f"mod{n}.py").write_text(f"x = {n}\n" * (n + 1))
+
+    async def review(code, filename, changed_lines=None):
+        lines = code.count("\n")
+        return json.dumps([{"filename": filename, "line": lines, "issue": f"{lines} lines", "severity": lines}])
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(engine, "get_violations_from_llm", review)
+    monkeypatch.setattr(engine, "BATCHING_ENABLED", False)
+    monkeypatch.setattr(engine, "TEST_FOLDER", str(root))
+    monkeypatch.setattr(engine, "get_violation_store", lambda: None)
+    monkeypatch.setattr(tracing, "write_telemetry", lambda: [])
+
+    single = run(engine.run_inline_review_on_tests())
+    paths = []
+    for index in (1, 2, 3):
+        result = run(sharding.run_shard(str(root), index, 3, "hash"))
+        paths.append(sharding.shard_output_path(index, 3, str(tmp_path / "shards")))
+        sharding.write_json(paths[-1], result)
+    report = sharding.merge(paths, fail_severity=9)
+
+    assert report["missing_shards"] == [] and report["duplicates"] == [] and report["files"] == 9
+    assert report["violations"] == single["violations"]
+    assert report["reviewed"] == single["reviewed"] == 9
+    assert report["blocking"] == 1 and report["verdict"] == "blocked"
+
+
+def test_missing_shard_makes_the_merge_incomplete(tmp_path):
+    path = sharding.shard_output_path(1, 2, str(tmp_path))
+    sharding.write_json(path, {"shard": 1, "count": 2, "strategy": "hash", "files": ["a.py"], "queued": 1,
+                               "reviewed": 1, "failed": [], "seconds": 0.1, "violations": {"a.py": []}})
+    report = sharding.merge([path, sharding.shard_output_path(2, 2, str(tmp_path))])
+    assert report["missing_shards"] == [2] and report["unreadable"] == [str(tmp_path / "shard-2-of-2.json")]
+    assert sharding.exit_code(report) == sharding.EXIT_INCOMPLETE
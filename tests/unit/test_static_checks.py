@@ -0,0 +1,123 @@
+import re
+
+from agents.rule_engine_agent import SYSTEM_PROMPT
+from agents.static_checks import check_java, check_python, strip_covered_rules
+
+
+def _rules(prompt: str, section: str) -> set:
+    lines = prompt.split(section, 1)[1].splitlines()[1:]
+    numbers = set()
+    for line in lines:
+        match = re.match(r"^(\d+)\.\s", line)
+        if not match:
+            break
+        numbers.add(int(match.group(1)))
+    return numbers
+
+
+def test_stripped_python_rules():
+    kept = _rules(strip_covered_rules(SYSTEM_PROMPT), "Python Guidelines")
+    assert kept == {1, 4, 5, 6, 7, 8}
+
+
+def test_stripped_java_rules():
+    kept = _rules(strip_covered_rules(SYSTEM_PROMPT), "Java Guidelines")
+    assert kept == {1, 2, 3, 4, 5, 6, 7, 8, 10}
+
+
+def test_pep8_rule_stays_in_prompt():
+    assert "Follow **PEP8** strictly" in strip_covered_rules(SYSTEM_PROMPT)
+
+
+def _issues(code: str) -> list:
+    return [v["issue"] for v in check_python(code, "x.py")]
+
+
+def test_visitor_and_unittest_overrides_are_not_flagged():
+    code = '''
+import ast
+import unittest
+
+
+class Finder(ast.NodeVisitor):
+    """Finds calls."""
+
+    def visit_Call(self, node):
+        """Visits a call."""
+
+
+class FinderTest(unittest.TestCase):
+    """Tests Finder."""
+
+    def setUp(self):
+        """Builds fixtures."""
+'''
+    assert not [i for i in _issues(code) if "snake_case" in i]
+
+
+def test_visit_function_outside_class_is_flagged():
+    assert any("visitCall" in i for i in _issues('def visitCall():\n    """Doc."""\n'))
+
+
+def test_type_aliases_are_not_flagged():
+    code = '''
+import pathlib
+from typing import TypeVar
+
+JsonDict = dict[str, object]
+MaybeInt = int | None
+Path = pathlib.Path
+T = TypeVar("T")
+'''
+    assert not [i for i in _issues(code) if "snake_case" in i]
+
+
+def test_non_alias_pascal_case_variable_is_flagged():
+    assert any("'Total'" in i for i in _issues("Total = 1 + 2\n"))
+
+
+def test_none_comparison_on_either_side():
+    issues = _issues("def f(x):\n    \"\"\"Doc.\"\"\"\n    return None == x or x != None\n")
+    assert issues.count("Comparison to None with an equality operator.") == 2
+
+
+def test_equals_without_hashcode_is_checked_per_class():
+    code = """class Outer {
+    public boolean equals(Object o) { return true; }
+    public int hashCode() { return 1; }
+
+    static class Inner {
+        public boolean equals(Object o) { return false; }
+    }
+}
+
+class Sibling {
+    public boolean equals(final Object o) { return false; }
+}
+
+class Complete {
+    public boolean equals(Object o) { return true; }
+    public int hashCode() { return 2; }
+}
+"""
+    found = [v["line"] for v in check_java(code, "Outer.java") if "hashCode" in v["issue"]]
+    assert found == [6, 11]
+
+
+def test_nested_functions_need_no_docstring():
+    code = '''
+def outer():
+    """Doc."""
+    def helper(x):
+        return x
+    return helper
+
+
+class Thing:
+    """Doc."""
+
+    def method(self):
+        pass
+'''
+    issues = [i for i in _issues(code) if "docstring" in i]
+    assert issues == ["Public function 'method' has no docstring."]
@@ -0,0 +1,28 @@
+import asyncio
+
+from agents.tracing import Tracer
+
+
+def test_bucket_bounds_are_canonical_floats():
+    tracer = Tracer(enabled=True, trace_path="")
+    tracer.record("parse", 0.3, {})
+    text = tracer.openmetrics()
+    assert 'le="1.0"} 1' in text and 'le="0.001"} 0' in text and 'le="300.0"} 1' in text
+    assert 'le="1"}' not in text
+
+
+def test_trace_lanes_are_reused_after_tasks_finish():
+    tracer = Tracer(enabled=True, trace_path="trace.json")
+
+    async def work():
+        tracer.record("parse", 0.001, {})
+        await asyncio.sleep(0)
+
+    async def waves():
+        for _ in range(5):
+            await asyncio.gather(*(work() for _ in range(3)))
+            await asyncio.sleep(0)  # let done callbacks release the lanes
+    asyncio.run(waves())
+
+    assert {event["tid"] for event in tracer.events} == {1, 2, 3}
+    assert tracer._lanes == {}
@@ -0,0 +1,40 @@
+import io
+import json
+
+from agents.violation_store import ViolationStore, write_sarif, rule_id
+
+
+def test_sarif_streams_one_rule_per_distinct_issue(tmp_path):
+    store = ViolationStore(str(tmp_path / "violations.sqlite"))
+    run_id = store.start_run("test")
+    store.add(run_id, str(tmp_path / "a.py"), [
+        {"issue": "Broad except", "recommendation": "Catch ValueError", "line": 3, "severity": 6},
+        {"issue": "Broad except", "line": 9, "severity": 6},
+    ])
+    store.add(run_id, str(tmp_path / "b.py"), [{"issue": "Missing docstring", "line": 1, "severity": 3}])
+
+    out = io.StringIO()
+    write_sarif(store, out, run_id, root=str(tmp_path))
+    store.close()
+
+    sarif = json.loads(out.getvalue())["runs"][0]
+    rules = {rule["id"]: rule["fullDescription"]["text"] for rule in sarif["tool"]["driver"]["rules"]}
+    assert rules == {rule_id("Broad except"): "Broad except", rule_id("Missing docstring"): "Missing docstring"}
+    assert [(r["ruleId"], r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"])
+            for r in sarif["results"]] == [
+        (rule_id("Broad except"), "a.py"), (rule_id("Broad except"), "a.py"), (rule_id("Missing docstring"), "b.py")]
+    assert sarif["results"][0]["message"]["text"] == "Broad except Fix: Catch ValueError"
+
+
+def test_violations_across_runs_are_grouped_by_path_text(tmp_path):
+    store = ViolationStore(str(tmp_path / "violations.sqlite"))
+    first = store.start_run("first", ts=1000)
+    store.add(first, "z.py", [{"issue": "Late", "line": 2, "severity": 3}])
+    store.add(first, "a.py", [{"issue": "Old", "line": 5, "severity": 3}])
+    second = store.start_run("second", ts=2000)
+    store.add(second, "a.py", [{"issue": "New", "line": 1, "severity": 3}, {"issue": "New", "line": 5, "severity": 3}])
+    store.add(second, "z.py", [{"issue": "Late", "line": 2, "severity": 3}])
+
+    rows = [(path, line, issue) for path, line, _, issue, _, _ in store.iter_violations()]
+    store.close()
+    assert rows == [("a.py", 1, "New"), ("a.py", 5, "Old"), ("a.py", 5, "New"), ("z.py", 2, "Late"), ("z.py", 2, "Late")]
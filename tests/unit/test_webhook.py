@@ -0,0 +1,102 @@
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.job_queue import JobQueue
+from app.main import verify_signature
+
+
+def _sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_valid_signature_is_accepted():
+    assert verify_signature(b"{}", _sign(b"{}", "s3cret"), secret="s3cret")
+
+
+def test_wrong_or_missing_signature_is_rejected():
+    assert not verify_signature(b"{}", _sign(b"{}", "other"), secret="s3cret")
+    assert not verify_signature(b"{}", None, secret="s3cret")
+
+
+def test_missing_secret_fails_closed():
+    assert not verify_signature(b"{}", None, secret=None, allow_unsigned=False)
+    assert verify_signature(b"{}", None, secret=None, allow_unsigned=True)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(main, "JobQueue", lambda: JobQueue(path))
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_unconfigured_service_rejects_deliveries(client, monkeypatch):
+    monkeypatch.setattr(main, "GITHUB_WEBHOOK_SECRET", None)
+    monkeypatch.setattr(main, "WEBHOOK_ALLOW_UNSIGNED", False)
+    response = client.post("/webhook", content=b"{}", headers={"X-GitHub-Event": "ping"})
+    assert response.status_code == 503
+
+
+def test_signed_ping_is_accepted(client, monkeypatch):
+    monkeypatch.setattr(main, "GITHUB_WEBHOOK_SECRET", "s3cret")
+    response = client.post("/webhook", content=b"{}",
+                           headers={"X-GitHub-Event": "ping", "X-Hub-Signature-256": _sign(b"{}", "s3cret")})
+    assert response.status_code == 202
+    assert response.json() == {"status": "pong"}
+
+
+def test_pull_request_without_head_is_a_bad_request(client, monkeypatch):
+    monkeypatch.setattr(main, "GITHUB_WEBHOOK_SECRET", "s3cret")
+    body = b'{"action": "opened", "pull_request": {"number": 1}, "repository": {"full_name": "o/r"}}'
+    response = client.post("/webhook", content=body,
+                           headers={"X-GitHub-Event": "pull_request", "X-Hub-Signature-256": _sign(body, "s3cret")})
+    assert response.status_code == 400
+
+
+def _synchronize(client, head_sha: str):
+    body = json.dumps({
+        "action": "synchronize", "installation": {"id": 7}, "repository": {"full_name": "o/r"},
+        "pull_request": {"number": 1, "head": {"sha": head_sha}, "base": {"sha": "base"}},
+    }).encode()
+    return client.post("/webhook", content=body, headers={
+        "X-GitHub-Event": "pull_request", "X-Hub-Signature-256": _sign(body, "s3cret")})
+
+
+def _wait_for_status(client, job_id: int, status: str):
+    deadline = time.monotonic() + 5
+    while client.get(f"/jobs/{job_id}").json()["status"] != status:
+        assert time.monotonic() < deadline, f"job {job_id} never became {status}"
+        time.sleep(0.01)
+
+
+def test_new_push_cancels_the_running_review_and_redelivery_is_a_duplicate(tmp_path, monkeypatch):
+    async def slow_review(job):
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(main, "GITHUB_WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setattr(main, "run_review_job", slow_review)
+    monkeypatch.setattr(main, "JobQueue", lambda: JobQueue(str(tmp_path / "jobs.sqlite")))
+    with TestClient(main.app) as client:
+        first = _synchronize(client, "aaa").json()
+        assert first["status"] == "queued"
+        _wait_for_status(client, first["job_id"], "running")
+
+        second = _synchronize(client, "bbb").json()
+        assert second["status"] == "queued" and second["cancelled"] == [first["job_id"]]
+        assert client.get(f"/jobs/{first['job_id']}").json()["status"] == "cancelled"
+        _wait_for_status(client, second["job_id"], "running")
+        deadline = time.monotonic() + 5
+        while client.get("/health").json()["workers"]["cancelled"] != 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        again = _synchronize(client, "bbb").json()
+        assert again["status"] == "duplicate" and again["job_id"] == second["job_id"]
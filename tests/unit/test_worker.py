@@ -0,0 +1,68 @@
+import asyncio
+
+from app.job_queue import JobQueue, CANCELLED, DONE, FAILED, RUNNING
+from app.worker import WorkerPool
+
+
+def test_cancelled_running_job_is_stopped_and_not_marked_done(tmp_path, run):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    started = {}
+    finished = []
+
+    async def handler(job):
+        started[job["head_sha"]].set()
+        if job["head_sha"] == "bad":
+            raise RuntimeError("boom")
+        await asyncio.sleep(0 if job["head_sha"] == "new" else 30)
+        finished.append(job["head_sha"])
+        return {"sha": job["head_sha"]}
+
+    async def scenario():
+        pool = WorkerPool(queue, handler, size=1, poll_interval=0.01)
+        for sha in ("old", "new", "bad"):
+            started[sha] = asyncio.Event()
+        pool.start()
+        old = queue.enqueue("o/r", 1, "old")["job_id"]
+        pool.notify()
+        await asyncio.wait_for(started["old"].wait(), 5)
+
+        newer = queue.enqueue("o/r", 1, "new")
+        pool.cancel(newer["cancelled"])
+        bad = queue.enqueue("o/r", 2, "bad")["job_id"]
+        pool.notify()
+        await asyncio.wait_for(started["bad"].wait(), 5)
+        while pool.failed == 0:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return old, newer["job_id"], bad, pool.stats()
+
+    old, new, bad, stats = run(scenario())
+    assert finished == ["new"]
+    assert queue.get(old)["status"] == CANCELLED and queue.get(old)["result"] is None
+    assert queue.get(new)["status"] == DONE and queue.get(new)["result"] == {"sha": "new"}
+    assert queue.get(bad)["status"] == FAILED and "boom" in queue.get(bad)["error"]
+    assert (stats["completed"], stats["failed"], stats["cancelled"]) == (1, 1, 1)
+    queue.close()
+
+
+def test_stop_leaves_the_running_job_for_recovery(tmp_path, run):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    started = asyncio.Event()
+
+    async def handler(job):
+        started.set()
+        await asyncio.sleep(30)
+
+    async def scenario():
+        pool = WorkerPool(queue, handler, size=2, poll_interval=30)
+        pool.start()
+        job_id = queue.enqueue("o/r", 1, "aaa")["job_id"]
+        pool.notify()
+        await asyncio.wait_for(started.wait(), 5)
+        await asyncio.wait_for(pool.stop(), 5)
+        return job_id, pool.stats()
+
+    job_id, stats = run(scenario())
+    assert queue.get(job_id)["status"] == RUNNING and stats["cancelled"] == 0
+    assert queue.recover() == 1
+    queue.close()
@@ -0,0 +1,253 @@
+"""
+End-to-end benchmark of the review pipeline against the mock LLM server.
+
+    python -m tools.bench --files 200 --latency-mean 0.3 --malformed-rate 0.05
+
+Builds a synthetic corpus, points the pipeline at a local MockLLMServer and
+runs test_inline_engine.run_inline_review_on_tests on it. Throughput, per-file
+latency percentiles, retries, peak memory and event-loop lag are printed and
+saved as JSON.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.mock_llm_server import MockLLMServer, add_mock_arguments, config_from_args  # noqa: E402
+
+BENCH_OUTPUT_DIR = os.path.join(".reviewbot", "bench")
+LOOP_LAG_INTERVAL = 0.01
+
+
+def _python_file(rng: random.Random, lines: int) -> str:
+    out = ["import os", ""]
+    n = 0
+    while len(out) < lines:
+        n += 1
+        # Mix clean functions with ones the static checks and the mock both flag
+        if rng.random() < 0.3:
+            out += [f"def ComputeValue{n}(items=[]):", "    for i in items:", "        if i == None:",
+                    "            continue", "    return len(items)", ""]
+        else:
+            out += [f"def compute_value_{n}(items):", f'    """Returns the sum of items plus {n}."""',
+                    "    total = 0", "    for item in items:", "        total += item", f"    return total + {n}", ""]
+    return "\n".join(out[:lines]) + "\n"
+
+
+def _java_file(rng: random.Random, lines: int, index: int) -> str:
+    out = ["package com.example.bench;", "", f"public class Sample{index} {{"]
+    n = 0
+    while len(out) < lines - 1:
+        n += 1
+        if rng.random() < 0.3:
+            out += [f"    public int Compute_{n}(int[] values) {{", "        int Total = 0;",
+                    "        for (int v : values) { Total += v; }", "        return Total;", "    }", ""]
+        else:
+            out += [f"    public int compute{n}(int[] values) {{", "        int total = 0;",
+                    "        for (int v : values) { total += v; }", f"        return total + {n};", "    }", ""]
+    return "\n".join(out[:lines - 1] + ["}"]) + "\n"
+
+
+def build_corpus(folder: str, files: int, mean_lines: int, sigma: float, java_fraction: float,
+                 seed: int) -> dict:
+    """
+    Writes files Python/Java sources whose line counts follow a lognormal
+    distribution around mean_lines. Returns a summary of what was written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    total_bytes = 0
+    sizes = []
+    for i in range(files):
+        lines = max(5, int(rng.lognormvariate(0, sigma) * mean_lines))
+        if rng.random() < java_fraction:
+            path, code = os.path.join(folder, f"Sample{i}.java"), _java_file(rng, lines, i)
+        else:
+            path, code = os.path.join(folder, f"sample_{i}.py"), _python_file(rng, lines)
+        with open(path, "w") as f:
+            f.write(code)
+        total_bytes += len(code)
+        sizes.append(lines)
+    sizes.sort()
+    return {"files": files, "bytes": total_bytes, "max_lines": sizes[-1] if sizes else 0,
+            "median_lines": sizes[len(sizes) // 2] if sizes else 0}
+
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples) if samples else 0.0,
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples, default=0.0),
+    }
+
+
+async def _watch_loop_lag(samples: list):
+    # How late the loop wakes us up is how long something else blocked it
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL))
+
+
+async def run_pipeline(engine, latencies: list, loop_lag: list, quiet: bool) -> dict:
+    review_file, review_batch = engine.review_file, engine.review_batch
+
+    async def timed_file(file_path, changed_lines=None):
+        start = time.perf_counter()
+        result = await review_file(file_path, changed_lines)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    async def timed_batch(file_paths):
+        start = time.perf_counter()
+        results = await review_batch(file_paths)
+        # Every file in a batch waits for the whole batch
+        latencies.extend([time.perf_counter() - start] * len(file_paths))
+        return results
+
+    engine.review_file, engine.review_batch = timed_file, timed_batch
+    watcher = asyncio.create_task(_watch_loop_lag(loop_lag))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            return await engine.run_inline_review_on_tests()
+    finally:
+        watcher.cancel()
+        engine.review_file, engine.review_batch = review_file, review_batch
+
+
+def attempt_counts() -> dict:
+    from agents.log_agent import get_event_log
+
+    counts = {"attempts": 0, "retries": 0, "failures": 0, "repaired": 0}
+    for event in get_event_log().events():
+        counts["attempts"] += 1
+        counts["retries"] += event.get("attempt", 1) > 1
+        counts["failures"] += event.get("status") == "failure"
+        counts["repaired"] += bool(event.get("repaired"))
+    return counts
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark the review pipeline against a mock LLM")
+    parser.add_argument("--files", type=int, default=100, help="Number of files in the synthetic corpus")
+    parser.add_argument("--mean-lines", type=int, default=80, help="Typical file length in lines")
+    parser.add_argument("--size-sigma", type=float, default=0.8, help="Lognormal spread of file sizes")
+    parser.add_argument("--java-fraction", type=float, default=0.5)
+    parser.add_argument("--corpus", help="Review this folder instead of generating a corpus")
+    parser.add_argument("--retry-delay", type=float, help="Override LLM_BACKOFF_BASE for the run")
+    parser.add_argument("--cache", action="store_true", help="Keep the review cache enabled")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the tracemalloc peak (slows the run down)")
+    parser.add_argument("--output", help="JSON report path (default .reviewbot/bench/bench-<timestamp>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="reviewbot-bench-")
+    corpus_dir = args.corpus or os.path.join(workdir, "corpus")
+    corpus = None
+    if not args.corpus:
+        corpus = build_corpus(corpus_dir, args.files, args.mean_lines, args.size_sigma,
+                              args.java_fraction, args.seed)
+
+    server = MockLLMServer(config_from_args(args))
+    url = server.start()
+
+    # The agents read their configuration at import time, so set it before importing them
+    os.environ.update({
+        "OLLAMA_URL": url,
+        "LLM_BACKENDS": "",
+        "TEST_FOLDER": corpus_dir,
+        "LOG_FOLDER": os.path.join(workdir, "logs"),
+        "METRICS_PATH": os.path.join(workdir, "metrics.prom"),
+        "REVIEW_CACHE_PATH": os.path.join(workdir, "review_cache.sqlite"),
+        "DISCOVERY_INDEX_PATH": os.path.join(workdir, "index.json"),
+        "VIOLATION_STORE_PATH": os.path.join(workdir, "violations.sqlite"),
+    })
+    os.environ.pop("REVIEW_DIFF_BASE", None)
+    os.environ.pop("REVIEW_DIFF_FILE", None)
+    if not args.cache:
+        os.environ["REVIEW_CACHE_ENABLED"] = "0"
+    if args.retry_delay is not None:
+        os.environ["LLM_BACKOFF_BASE"] = str(args.retry_delay)
+
+    import test_inline_engine as engine
+
+    latencies, loop_lag = [], []
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        run = asyncio.run(run_pipeline(engine, latencies, loop_lag, quiet=not args.verbose))
+    finally:
+        server.stop()
+    elapsed = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "verbose")},
+        "corpus": corpus,
+        "files": run["files"],
+        "jobs": run["jobs"],
+        "reviewed": run["reviewed"],
+        "seconds": elapsed,
+        "files_per_sec": run["files"] / elapsed if elapsed else 0.0,
+        "latency": summarize(latencies),
+        "llm": dict(attempt_counts(), server_requests=server.requests, server_outcomes=server.outcomes,
+                    retry_budget=run["retry_budget"]),
+        "memory": {
+            # ru_maxrss is kilobytes on Linux
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "traced_peak_bytes": traced_peak,
+        },
+        "event_loop_lag": summarize(loop_lag),
+        "discovery": run["discovery"],
+        "scheduler": run["scheduler"],
+        "router": run["router"],
+        "cache": run["cache"],
+        "stages": run["stages"],
+    }
+
+    output = args.output or os.path.join(
+        BENCH_OUTPUT_DIR, f"bench-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    latency = report["latency"]
+    print(f"{run['files']} files in {elapsed:.2f}s ({report['files_per_sec']:.1f} files/sec)")
+    print(f"Per-file latency p50={latency['p50']:.3f}s p95={latency['p95']:.3f}s p99={latency['p99']:.3f}s")
+    print(f"LLM attempts={report['llm']['attempts']} retries={report['llm']['retries']} "
+          f"failures={report['llm']['failures']} repaired={report['llm']['repaired']}")
+    print(f"Peak RSS {report['memory']['peak_rss_bytes'] / 2**20:.1f} MiB, "
+          f"event-loop lag p99={report['event_loop_lag']['p99'] * 1000:.1f}ms")
+    print(f"Report saved to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
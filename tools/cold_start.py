@@ -0,0 +1,78 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Commands timed in a fresh interpreter each run; "python" is the floor
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "reviewbot --help": ["reviewbot.py", "--help"],
+    "reviewbot gate --help": ["reviewbot.py", "gate", "--help"],
+    "import agents.gate": ["-c", "import agents.gate"],
+    "import test_inline_engine": ["-c", "import test_inline_engine"],
+    "import app.main": ["-c", "import app.main"],
+}
+
+
+def time_command(args: list, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(samples), 1), "min_ms": round(min(samples), 1)}
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """
+    MODULE's direct imports by cumulative import time (python -X importtime).
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    totals, children = {}, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # One leading space, then two per nesting level; children are listed
+        # before the import that pulled them in
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == module:
+                totals = children
+            children = {}
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Measure interpreter and import start-up time")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per command")
+    parser.add_argument("--imports", metavar="MODULE", help="Also list the slowest imports of MODULE")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = {"python": sys.version.split()[0], "commands": {}}
+    for name, command in COMMANDS.items():
+        report["commands"][name] = time_command(command, args.runs)
+    if args.imports:
+        report["imports"] = slowest_imports(args.imports, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, timing in report["commands"].items():
+            print(f"{name:<28} median {timing['median_ms']:>7.1f} ms   min {timing['min_ms']:>7.1f} ms")
+        for module, ms in report.get("imports", []):
+            print(f"  {module:<40} {ms:>7.1f} ms")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import re
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+import itertools
+from datetime import datetime, timezone
+from urllib.parse import unquote
+from tools.stub_server import StubServer
+
+
+class FakeGitHubServer(StubServer):
+    """
+    In-memory stand-in for the parts of the GitHub REST API ReviewBot uses.
+    Point GITHUB_API_URL at url. Tokens it issues are the only ones accepted
+    on repository routes; set token_ttl to exercise expiry and refresh.
+    """
+
+    thread_name = "fake-github-server"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token_ttl: float = 3600,
+                 token_latency: float = 0.0, public_key: str | None = None):
+        super().__init__(host, port)
+        self.token_ttl = token_ttl
+        self.token_latency = token_latency
+        self.public_key = public_key
+        self.token_requests = {}
+        self.tokens = {}
+        self.pulls = {}
+        self.contents = {}
+        self.review_comments = {}
+        self.reviews = {}
+        self.reviews_posted = 0
+        self.not_modified = 0
+        self._token_ids = itertools.count(1)
+        self._comment_ids = itertools.count(1)
+        self.routes = [
+            ("POST", re.compile(r"^/app/installations/(\d+)/access_tokens$"), self.create_token),
+            ("GET", re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/files$"), self.list_pr_files),
+            ("GET", re.compile(r"^/repos/([^/]+/[^/]+)/contents/(.+)$"), self.get_contents),
+            ("GET", re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/comments$"), self.list_review_comments),
+            ("GET", re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/reviews$"), self.list_reviews),
+            ("POST", re.compile(r"^/repos/([^/]+/[^/]+)/pulls/(\d+)/reviews$"), self.create_review),
+        ]
+
+    def add_pull(self, repo: str, number: int, files: dict, head_sha: str = "head", patches: dict | None = None):
+        """
+        files maps path -> content at head_sha; patches maps path -> unified
+        diff hunks (defaults to every line added).
+        """
+        patches = patches or {}
+        entries = []
+        for path, text in files.items():
+            lines = text.splitlines()
+            patch = patches.get(path) or f"@@ -0,0 +1,{len(lines)} @@\n" + "\n".join("+" + line for line in lines)
+            entries.append({"filename": path, "status": "modified", "changes": len(lines), "patch": patch})
+            self.contents[(repo, path, head_sha)] = text
+        self.pulls[(repo, number)] = {"head_sha": head_sha, "files": entries}
+        self.review_comments.setdefault((repo, number), [])
+        self.reviews.setdefault((repo, number), [])
+
+    async def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes, writer):
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                await handler(match, query, headers, body, writer)
+                return
+        await self.send_json(writer, 404, {"message": "Not Found"})
+
+    def authorized(self, headers: dict) -> bool:
+        token = headers.get("authorization", "").removeprefix("Bearer ").removeprefix("token ")
+        expires = self.tokens.get(token)
+        return expires is not None and time.time() < expires
+
+    async def create_token(self, match, query, headers, body, writer):
+        installation_id = int(match.group(1))
+        bearer = headers.get("authorization", "").removeprefix("Bearer ")
+        if not bearer:
+            await self.send_json(writer, 401, {"message": "A JSON web token could not be decoded"})
+            return
+        if self.public_key is not None:
+            import jwt
+            try:
+                jwt.decode(bearer, self.public_key, algorithms=["RS256"])
+            except jwt.PyJWTError as e:
+                await self.send_json(writer, 401, {"message": str(e)})
+                return
+        self.token_requests[installation_id] = self.token_requests.get(installation_id, 0) + 1
+        if self.token_latency:
+            await asyncio.sleep(self.token_latency)
+        token = f"ghs_fake{installation_id}x{next(self._token_ids)}"
+        expires = time.time() + self.token_ttl
+        self.tokens[token] = expires
+        await self.send_json(writer, 201, {
+            "token": token,
+            "expires_at": datetime.fromtimestamp(expires, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+
+    async def list_pr_files(self, match, query, headers, body, writer):
+        if not self.authorized(headers):
+            await self.send_json(writer, 401, {"message": "Bad credentials"})
+            return
+        pull = self.pulls.get((match.group(1), int(match.group(2))))
+        if pull is None:
+            await self.send_json(writer, 404, {"message": "Not Found"})
+            return
+        per_page, page = int(query.get("per_page", 30)), int(query.get("page", 1))
+        await self.send_json(writer, 200, pull["files"][(page - 1) * per_page:page * per_page])
+
+    async def get_contents(self, match, query, headers, body, writer):
+        if not self.authorized(headers):
+            await self.send_json(writer, 401, {"message": "Bad credentials"})
+            return
+        text = self.contents.get((match.group(1), unquote(match.group(2)), query.get("ref")))
+        if text is None:
+            await self.send_json(writer, 404, {"message": "Not Found"})
+            return
+        await self.send(writer, 200, text.encode(), content_type="application/vnd.github.raw")
+
+    async def list_review_comments(self, match, query, headers, body, writer):
+        await self._send_page(self.review_comments, match, query, headers, writer)
+
+    async def list_reviews(self, match, query, headers, body, writer):
+        await self._send_page(self.reviews, match, query, headers, writer)
+
+    async def _send_page(self, store: dict, match, query, headers, writer):
+        """
+        Paginated listing with an ETag; a matching If-None-Match gets a 304.
+        """
+        if not self.authorized(headers):
+            await self.send_json(writer, 401, {"message": "Bad credentials"})
+            return
+        items = store.get((match.group(1), int(match.group(2))))
+        if items is None:
+            await self.send_json(writer, 404, {"message": "Not Found"})
+            return
+        per_page, page = int(query.get("per_page", 30)), int(query.get("page", 1))
+        data = json.dumps(items[(page - 1) * per_page:page * per_page]).encode()
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'
+        if headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            await self.send(writer, 304, headers={"ETag": etag})
+            return
+        await self.send(writer, 200, data, headers={"ETag": etag})
+
+    async def create_review(self, match, query, headers, body, writer):
+        if not self.authorized(headers):
+            await self.send_json(writer, 401, {"message": "Bad credentials"})
+            return
+        key = (match.group(1), int(match.group(2)))
+        pull = self.pulls.get(key)
+        if pull is None:
+            await self.send_json(writer, 404, {"message": "Not Found"})
+            return
+        review = json.loads(body or b"{}")
+        patches = {f["filename"]: f["patch"] for f in pull["files"]}
+        for comment in review.get("comments", []):
+            patch = patches.get(comment.get("path"))
+            position = comment.get("position")
+            # Position 0 is the first hunk header, which cannot be commented on
+            if patch is None or not isinstance(position, int) or not 0 < position < len(patch.splitlines()):
+                await self.send_json(writer, 422, {"message": "Unprocessable Entity",
+                                                   "errors": ["Pull request review thread position is invalid"]})
+                return
+        self.reviews_posted += 1
+        review_id = self.reviews_posted
+        for comment in review.get("comments", []):
+            self.review_comments[key].append({
+                "id": next(self._comment_ids), "pull_request_review_id": review_id,
+                "path": comment["path"], "position": comment["position"], "body": comment["body"],
+                "commit_id": review.get("commit_id"), "user": {"login": "reviewbot[bot]", "type": "Bot"},
+            })
+        created = {"id": review_id, "state": "COMMENTED", "body": review.get("body", ""),
+                   "commit_id": review.get("commit_id"), "user": {"login": "reviewbot[bot]", "type": "Bot"}}
+        self.reviews[key].append(created)
+        await self.send_json(writer, 200, created)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory fake of the GitHub REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token-ttl", type=float, default=3600, help="Installation token lifetime in seconds")
+    args = parser.parse_args()
+
+    server = FakeGitHubServer(args.host, args.port, token_ttl=args.token_ttl)
+    print(f"Fake GitHub API listening on {server.start()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
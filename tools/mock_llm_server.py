@@ -0,0 +1,205 @@
+import re
+import math
+import json
+import time
+import random
+import asyncio
+import argparse
+import hashlib
+from dataclasses import dataclass
+from tools.stub_server import StubServer
+
+
+@dataclass
+class MockConfig:
+    """
+    Behaviour of the mock Ollama server. Latency is the delay before the
+    first token; tokens_per_sec paces the generation after that.
+    """
+    latency_dist: str = "lognormal"  # fixed | uniform | lognormal
+    latency_mean: float = 0.2
+    latency_sigma: float = 0.5
+    failure_rate: float = 0.0  # HTTP 500
+    rejection_rate: float = 0.0  # HTTP 429
+    malformed_rate: float = 0.0  # reply that is not valid JSON
+    fenced_rate: float = 0.0  # valid JSON wrapped in a markdown fence (locally repairable)
+    tokens_per_sec: float = 0.0  # 0 means instant generation
+    violations_per_file: int = 3
+    prompt_eval_ns_per_token: int = 200_000
+    seed: int = 0
+
+
+FILE_MARKER = re.compile(r"===== BEGIN FILE: (\S+) =====")
+FILENAME_LINE = re.compile(r"^Filename: (\S+)", re.M)
+
+
+class MockLLMServer(StubServer):
+    """
+    Implements Ollama's /api/generate and /api/chat (streaming and
+    non-streaming) with deterministic, seeded behaviour. Each request draws
+    from its own generator, seeded by the seed, the prompt and how often that
+    prompt was seen, so outcomes do not depend on request arrival order.
+    """
+
+    thread_name = "mock-llm-server"
+
+    def __init__(self, config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(host, port)
+        self.config = config or MockConfig()
+        self.outcomes = {"ok": 0, "failure": 0, "rejected": 0, "malformed": 0, "fenced": 0}
+        self._seen = {}
+
+    def _rng_for(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8", "surrogateescape")).hexdigest()
+        # A retried prompt gets a fresh draw rather than repeating its failure
+        self._seen[digest] = self._seen.get(digest, 0) + 1
+        return random.Random(f"{self.config.seed}:{digest}:{self._seen[digest]}")
+
+    def _latency(self, rng: random.Random) -> float:
+        c = self.config
+        if c.latency_dist == "fixed":
+            return c.latency_mean
+        if c.latency_dist == "uniform":
+            return rng.uniform(0, 2 * c.latency_mean)
+        # lognormal with the requested mean
+        mu = math.log(max(c.latency_mean, 1e-6)) - c.latency_sigma ** 2 / 2
+        return rng.lognormvariate(mu, c.latency_sigma)
+
+    def _violations(self, prompt: str) -> list:
+        names = FILE_MARKER.findall(prompt) or FILENAME_LINE.findall(prompt) or ["unknown"]
+        violations = []
+        for name in names:
+            digest = int(hashlib.sha256(name.encode()).hexdigest(), 16)
+            for i in range(self.config.violations_per_file):
+                violations.append({
+                    "filename": name,
+                    "line": (digest >> (8 * i)) % 40 + 1,
+                    "issue": f"Synthetic issue {i + 1} in {name}",
+                    "recommendation": "Synthetic recommendation",
+                    "severity": (digest >> (4 * i)) % 10 + 1,
+                })
+        return violations
+
+    def _reply(self, prompt: str, rng: random.Random) -> tuple:
+        """
+        Returns (status, text) for one request, drawing the outcome from the configured rates.
+        """
+        c = self.config
+        roll = rng.random()
+        if roll < c.failure_rate:
+            self.outcomes["failure"] += 1
+            return 500, ""
+        roll -= c.failure_rate
+        if roll < c.rejection_rate:
+            self.outcomes["rejected"] += 1
+            return 429, ""
+        roll -= c.rejection_rate
+        text = json.dumps(self._violations(prompt), indent=1)
+        if roll < c.malformed_rate:
+            self.outcomes["malformed"] += 1
+            return 200, "Here are the violations I found:\n" + text[: len(text) // 2]
+        roll -= c.malformed_rate
+        if roll < c.fenced_rate:
+            self.outcomes["fenced"] += 1
+            return 200, f"```json\n{text}\n```"
+        self.outcomes["ok"] += 1
+        return 200, text
+
+    async def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes, writer):
+        if method != "POST" or path not in ("/api/generate", "/api/chat"):
+            await self.send_json(writer, 404, {})
+            return
+
+        payload = json.loads(body or b"{}")
+        chat = path == "/api/chat"
+        if chat:
+            messages = payload.get("messages", [])
+            prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+            system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        else:
+            prompt = payload.get("prompt", "")
+            system = ""
+        evaluated = (len(prompt) + (0 if chat else len(system))) // 4 + 1
+        stats = {
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": evaluated * self.config.prompt_eval_ns_per_token,
+        }
+
+        rng = self._rng_for(system + "\0" + prompt)
+        await asyncio.sleep(self._latency(rng))
+        status, text = self._reply(prompt, rng)
+        if status != 200:
+            await self.send_json(writer, status, {"error": "mock failure"})
+            return
+
+        def frame(fragment: str, done: bool) -> dict:
+            content = {"message": {"role": "assistant", "content": fragment}} if chat else {"response": fragment}
+            if done and not chat:
+                content["context"] = [evaluated]
+            return dict(content, done=done, **(stats if done else {}))
+
+        if not payload.get("stream", True):
+            if self.config.tokens_per_sec:
+                await asyncio.sleep(len(text) / 4 / self.config.tokens_per_sec)
+            await self.send_json(writer, 200, frame(text, True))
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        step = 16
+        for i in range(0, len(text), step):
+            if self.config.tokens_per_sec:
+                await asyncio.sleep(step / 4 / self.config.tokens_per_sec)
+            self._write_chunk(writer, json.dumps(frame(text[i:i + step], False)) + "\n")
+            await writer.drain()
+        self._write_chunk(writer, json.dumps(frame("", True)) + "\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer, data: str):
+        raw = data.encode()
+        writer.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.2, help="Mean seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal shape parameter")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of HTTP 500 replies")
+    parser.add_argument("--rejection-rate", type=float, default=0.0, help="Fraction of HTTP 429 replies")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of truncated, invalid replies")
+    parser.add_argument("--fenced-rate", type=float, default=0.0, help="Fraction of replies wrapped in a code fence")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Generation speed; 0 is instant")
+    parser.add_argument("--violations-per-file", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(
+        latency_dist=args.latency_dist,
+        latency_mean=args.latency_mean,
+        latency_sigma=args.latency_sigma,
+        failure_rate=args.failure_rate,
+        rejection_rate=args.rejection_rate,
+        malformed_rate=args.malformed_rate,
+        fenced_rate=args.fenced_rate,
+        tokens_per_sec=args.tokens_per_sec,
+        violations_per_file=args.violations_per_file,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockLLMServer(config_from_args(args), args.host, args.port)
+    print(f"Mock LLM server listening on {server.start()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()